@@ -1,21 +1,14 @@
-import os
-import json
 import pandas as pd
+from covid_scraping import release
 
 def main():
   path="schema_v0.1/"
+  # The counts come from the release manifest, only sources changed since the last run are read.
+  manifest = release.update_manifest(path)
+  print("%d sources read" % len(manifest['changed']))
   source2stats = {}
-  for filename in os.listdir(path):
-    answer_count, question_count = 0, 0
-    print(filename)
-    if filename.endswith(".jsonl"):
-      for line in open(path+filename):
-        obj = json.loads(line)
-        if obj['answerText']:
-          answer_count += 1
-        if obj['questionText']:
-          question_count += 1
-    source2stats[filename.split("_v0.1")[0]] = (question_count, answer_count)
+  for filename, entry in sorted(manifest['sources'].items()):
+    source2stats[filename.split("_v0.1")[0]] = (entry['questions'], entry['answers'])
 
   print(source2stats)
   df = pd.DataFrame.from_dict(source2stats).T
@@ -16,15 +16,15 @@ __email__ = "covidqa@jhu.edu"
 __status__ = "Development"
 
 import json
-from urllib.request import urlopen
 from bs4 import BeautifulSoup
+from covid_scraping import fetch
 from crawler import Schema, MyBeautifulSoup, Crawler
 
 
 class General_page():
     def __init__(self):
         url = 'https://www.cdc.gov/coronavirus/2019-ncov/hcp/faq.html'
-        html = urlopen(url)
+        html = fetch.get(url).content
         soup = BeautifulSoup(html, "lxml")
 
         crw = Crawler()
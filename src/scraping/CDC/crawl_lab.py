@@ -20,8 +20,8 @@ import datetime
 import time
 import pprint
 from urllib import request, response, error, parse
-from urllib.request import urlopen
 from bs4 import BeautifulSoup, NavigableString, CData, Tag
+from covid_scraping import fetch
 import jsonlines
 import re
 import pandas as pd
@@ -33,7 +33,7 @@ from covid_scraping import test_jsonlines
 
 
 def crawl_helper(name, url):
-    html = urlopen(url)
+    html = fetch.get(url).content
     soup = BeautifulSoup(html, "lxml")
 
     main = soup.find("main", {"class": "col-lg-9"}
@@ -15,14 +15,17 @@ __maintainer__ = "JHU-COVID-QA"
 __email__ = "covidqa@jhu.edu"
 __status__ = "Development"
 
+import collections
+import copy
 import datetime
 import time
 import json
 import pprint
 import subprocess
 import uuid
-from urllib.request import urlopen
 from bs4 import BeautifulSoup, NavigableString, CData, Tag
+from covid_scraping import fetch
+from urllib.parse import urldefrag
 import re
 
 
@@ -59,9 +62,13 @@ class Schema():
 
 class Crawler():
     def __init__(self):
+        # Parsed pages of this crawl keyed on the url without its #fragment,
+        # most topics are anchors into the same faq.html.
+        self.documents = {}
+        self.cache_stats = collections.Counter()
+
         url = 'https://www.cdc.gov/coronavirus/2019-ncov/faq.html'
-        html = urlopen(url)
-        soup = BeautifulSoup(html, "lxml")
+        soup = self.document(url)
 
         respons_auth = soup.find(
             'div', class_='d-none d-lg-block content-source')
@@ -89,10 +96,32 @@ class Crawler():
 
         return sourcedate
 
+    def document(self, url, mutable=False):
+        '''
+        Returns the parsed page at url, downloading and parsing it only the
+        first time it is asked for in this crawl. Pass mutable=True to get a
+        private copy for code that edits the tree.
+        '''
+        page = urldefrag(url)[0]
+        if page in self.documents:
+            self.cache_stats['fetches_avoided'] += 1
+            if not mutable:
+                self.cache_stats['parses_avoided'] += 1
+        else:
+            html = fetch.get(page).content
+            self.documents[page] = BeautifulSoup(html, "lxml")
+            self.cache_stats['fetches'] += 1
+            self.cache_stats['parses'] += 1
+        soup = self.documents[page]
+        if mutable:
+            # Copying the tree costs about as much as parsing it again, it only saves the download.
+            self.cache_stats['copies'] += 1
+            return copy.copy(soup)
+        return soup
+
     def target_body(self, url, target_tag: str,
                     target_attr: str, target_attr_string: str):
-        html = urlopen(url)
-        soup = BeautifulSoup(html, "lxml")
+        soup = self.document(url)
         topics = soup.find_all(
             target_tag, attrs={
                 target_attr: target_attr_string})
@@ -225,8 +254,7 @@ class Crawler():
     def extract_from_accordian(self, topic, i=1):
         extradata = {}
         url = topic['sourceUrl']
-        html = urlopen(url)
-        soup = BeautifulSoup(html, "lxml")
+        soup = self.document(url)
 
         id_index = 'accordion-' + str(i)
         subtopic_body = soup.find_all('div', id=id_index)
@@ -265,8 +293,8 @@ class Crawler():
     def extract_from_page(self, topic, class_name, header_type, mixed=False):
         extradata = {}
         url = topic['sourceUrl']
-        html = urlopen(url)
-        soup = BeautifulSoup(html, "lxml")
+        # get_content_between_blocks edits the tree when it retrieves questions
+        soup = self.document(url, mutable=mixed)
 
         subtopic_body = soup.find_all('div', class_=class_name)
 
@@ -307,8 +335,7 @@ class Crawler():
             self, topic, class_name, header_type, subheader_type):
         extradata = {}
         url = topic['sourceUrl']
-        html = urlopen(url)
-        soup = BeautifulSoup(html, "lxml")
+        soup = self.document(url, mutable=True)
 
         subtopic_body = soup.find_all('div', class_=class_name)
 
@@ -466,6 +493,9 @@ if __name__ == '__main__':
 
     ''' for the CDC other frequently QA'''
     crw.other_QA()
+    print("Documents fetched %d, fetches avoided %d, parses avoided %d, copies %d" % (
+        crw.cache_stats['fetches'], crw.cache_stats['fetches_avoided'],
+        crw.cache_stats['parses_avoided'], crw.cache_stats['copies']))
 
     ''' for the FAQs_HP '''
     # subprocess.call("python3 FAQs_HP.py", shell=True)
@@ -32,21 +32,40 @@ echo "Downloading google spreadsheet" >> $log_file
 echo "####################" >> $log_file
 echo "####################" >> $log_file
 echo "Running all scrapers" >> $log_file
-python scrape_all.py >> $log_file 2>&1
-python deepsetAI_scraper.py  >> $log_file 2>&1
+#Jobs go to the warm worker (worker.py serve) when it runs, otherwise each starts a fresh python.
+#With COVID_SCRAPING_SCRAPE_QUEUE set, the scrapers run on the machines running scrapers/scrape_worker.py on that queue.
+scrape_args=""
+if [ -n "$COVID_SCRAPING_SCRAPE_QUEUE" ]; then
+    scrape_args="--queue $COVID_SCRAPING_SCRAPE_QUEUE"
+fi
+python $base_dir/worker.py submit scrape --log $log_file -- --metrics $base_dir/autoscrape_logs/metrics-scrape_all-$date.json $scrape_args
+python $base_dir/worker.py submit deepset --log $log_file -- --metrics $base_dir/autoscrape_logs/metrics-deepsetAI-$date.json
+if [ -n "$COVID_SCRAPING_GOLD_STORE" ]; then
+    #The scrapers wrote to the gold store, the release and the commit still use the JSONL files.
+    echo "Exporting the gold store" >> $log_file
+    python $base_dir/worker.py submit export --log $log_file -- export --store $COVID_SCRAPING_GOLD_STORE --path $base_dir/../../data/scraping/schema_v0.3/
+fi
 echo "####################"  >> $log_file
 echo "*********************"  >> $log_file
 echo "Current scraping stats" >> $log_file
-python make_public.py --path $base_dir/../../data/scraping/schema_v0.3/ >> $log_file 2>&1
+python $base_dir/worker.py submit release --log $log_file -- --path $base_dir/../../data/scraping/schema_v0.3/
 echo "*********************" >> $log_file
 
-cd $base_dir/../../data/scraping
-git add schema_v0.3/* 2>> $log_file 1>/dev/null
-git commit -m $(date +"autoscrape-$date") 2>> $log_file 1>/dev/null
-git push origin $branch_name 2>> $log_file 1>/dev/null
+cd $base_dir
+echo "####################" >> $log_file
+echo "Validating scraped data" >> $log_file
+if python worker.py submit validate --log $log_file -- --path $base_dir/../../data/scraping/schema_v0.3/ --output $base_dir/autoscrape_logs/validate-$date.json; then
+    cd $base_dir/../../data/scraping
+    git add -A schema_v0.3 2>> $log_file 1>/dev/null
+    git commit -m $(date +"autoscrape-$date") 2>> $log_file 1>/dev/null
+    git push origin $branch_name 2>> $log_file 1>/dev/null
+else
+    echo "Validation failed, see autoscrape_logs/validate-$date.json. Nothing was committed." >> $log_file
+fi
+echo "####################" >> $log_file
 
 cd $base_dir
-python log_to_json.py $log_file
+python log_to_json.py $log_file $base_dir/autoscrape_logs/metrics-scrape_all-$date.json $base_dir/autoscrape_logs/metrics-deepsetAI-$date.json
 #We are also redacting the webhook for our slack bot. 
 #curl -X POST -H 'Content-type: application/json' --data @tmp.json slackbothook.com
 rm tmp.json
@@ -11,24 +11,48 @@ __maintainer__ = "JHU-COVID-QA"
 __email__ = "covidqa@jhu.edu"
 __status__ = "Development"
 
-import jsonlines
+import os
 import time
-from bs4 import BeautifulSoup
-from covid_scraping import utils, test_jsonlines
+from covid_scraping import instrument, utils
+from covid_scraping.gold_store import GoldStore
+
+# Part of the examples fingerprint. Bump it whenever a change here would write the
+# same scraped examples differently, or write() keeps skipping unchanged sources.
+_conversion_version = 1
+# SQLite gold store every Conversion writes to instead of the JSONL files, set
+# COVID_SCRAPING_GOLD_STORE to its path to use it. Empty keeps the JSONL files.
+gold_store_path = ''
+
+
+def read_environment():
+    """
+    Sets gold_store_path from COVID_SCRAPING_GOLD_STORE, done on import and by worker.py for every job.
+    """
+    global gold_store_path
+    gold_store_path = os.environ.get('COVID_SCRAPING_GOLD_STORE', '')
+
+
+read_environment()
 
 
 class Conversion():
-    def __init__(self, file_prefix, path):
+    def __init__(self, file_prefix, path, workers=1, store=None):
         """
         This is the constructor for Conversion, the file_prefix should be the name
         of the file you want i.e. if your scraping 'American Veterinarian
         Medical Association', and approptiate file prefix would be 'AVMA'.
         The path should be the path from the directory your working in to
         Covid-19-infobot/data/scraping
+        Scrapers with many examples can set workers to clean the html of
+        the examples in that many processes.
+        store is the GoldStore to write to instead of the schema_v0.3 JSONL
+        file, by default the one at gold_store_path if that is set.
         """
         self._examples = []
         self._file_prefix = file_prefix
         self._path = path
+        self._workers = workers
+        self._store = store
 
     def _check_example(self, example):
         required_keys_to_type = {'sourceUrl': str,
@@ -81,6 +105,18 @@ class Conversion():
         """
         self._check_example(dict)
         self._examples.append(dict)
+        instrument.count('examples')
+
+    def _clean_examples(self):
+        """
+        Returns the cleaned questions and the cleaned answers of the examples,
+        as two lists of (text, link dict) in example order.
+        """
+        strings = [example['question'] for example in self._examples]
+        strings += [example['answer'] for example in self._examples]
+        with instrument.timed('convert'):
+            cleaned = utils.clean_texts(strings, workers=self._workers)
+        return cleaned[:len(self._examples)], cleaned[len(self._examples):]
 
     def _writeV2(self):
         v2_requirements_from_scraper = ['sourceUrl',
@@ -106,11 +142,10 @@ class Conversion():
                                            'answerContainsURLs',
                                            'answerToks2URL']
         path = self._path + '/schema_v0.2/' + self._file_prefix + '_v0.2.jsonl'
+        questions, answers = self._clean_examples()
         qas = []
-        for example in self._examples:
-            questionText, question_link_dict = utils.clean_text(
-                example['question'])
-            answerText, answer_link_dict = utils.clean_text(example['answer'])
+        for example, (questionText, question_link_dict), (answerText, answer_link_dict) in zip(
+                self._examples, questions, answers):
             pairs_from_scraper = dict(zip(v2_requirements_from_scraper, list(
                 map(example.get, v2_requirements_from_scraper))))
             v2_conversion = [self._lastUpdateTime,
@@ -120,21 +155,24 @@ class Conversion():
                              questionText,
                              example['answer'],
                              answerText,
-                             example['sourceName'] + '|||' + str(hash(str(example['question']))),
+                             utils.example_id(example['sourceName'], example['question']),
                              bool(answer_link_dict),
                              answer_link_dict]
             pairs_from_conversion = dict(
                 zip(v2_requirements_from_conversion, v2_conversion))
             qas.append({**pairs_from_scraper, **pairs_from_conversion})
-        gold_data = utils.merge(path, qas)
+        with instrument.timed('merge'):
+            gold_data = utils.merge(path, qas)
         # Merging could add a exampleUUID for a new example.
         for example in gold_data:
             example.pop('exampleUUID', None)
-        with jsonlines.open(path, 'w') as writer:
-            writer.write_all(gold_data)
-        return test_jsonlines(path, 'v0.2')
+        with instrument.timed('write'):
+            written = utils.write_jsonlines(path, gold_data, 'v0.2')
+            utils.write_merge_index(path, gold_data, written=written)
+        instrument.count('rows', len(gold_data))
+        return True
 
-    def _writeV3(self):
+    def _writeV3(self, store):
         v3_requirements_from_scraper = ['sourceUrl',
                                         'sourceName',
                                         'needUpdate',
@@ -155,34 +193,61 @@ class Conversion():
                                            'answerContainsURLs',
                                            'answerToks2URL']
         path = self._path + '/schema_v0.3/' + self._file_prefix + '_v0.3.jsonl'
+        # Nothing to do when the file already holds the result for these exact examples.
+        fingerprint = utils.examples_fingerprint(self._examples, _conversion_version)
+        if store is not None:
+            # The first write to a store carries over the UUIDs of the existing gold file.
+            if not store.has_source(self._file_prefix) and os.path.exists(path):
+                store.import_file(self._file_prefix, path)
+            if store.is_unchanged(self._file_prefix, fingerprint):
+                return True
+        elif utils.is_unchanged(path, fingerprint):
+            return True
+        questions, answers = self._clean_examples()
         qas = []
-        for example in self._examples:
-            questionText, question_link_dict = utils.clean_text(example['question'])
-            answerText, answer_link_dict = utils.clean_text(example['answer'])
+        for example, (questionText, question_link_dict), (answerText, answer_link_dict) in zip(
+                self._examples, questions, answers):
             pairs_from_scraper = dict(zip(v3_requirements_from_scraper, list(
                 map(example.get, v3_requirements_from_scraper))))
             v3_conversion = [example['question'],
                              questionText,
                              example['answer'],
                              answerText,
-                             example['sourceName'] + '|||' + str(hash(str(example['question']))),
+                             utils.example_id(example['sourceName'], example['question']),
                              bool(answer_link_dict),
                              answer_link_dict]
             pairs_from_conversion = dict(
                 zip(v3_requirements_from_conversion, v3_conversion))
             qas.append({**pairs_from_scraper, **pairs_from_conversion})
-        gold_data = utils.merge(path, qas)
+        with instrument.timed('merge'):
+            if store is not None:
+                gold_data = store.merge(self._file_prefix, qas)
+            else:
+                gold_data = utils.merge(path, qas)
         # Merging could add a exampleUUID for a new example.
         for example in gold_data:
             example.pop('exampleUUID', None)
             example.pop('sourceDate', None)
             example.pop('lastUpdateTime', None)
             example.pop('dateScraped', None)
-        with jsonlines.open(path, 'w') as writer:
-            writer.write_all(gold_data)
-        return test_jsonlines(path, 'v0.3')
+        with instrument.timed('write'):
+            if store is not None:
+                saved = store.save(self._file_prefix, gold_data, 'v0.3', fingerprint)
+                instrument.count('rows', saved['written'])
+            else:
+                written = utils.write_jsonlines(path, gold_data, 'v0.3')
+                utils.write_merge_index(path, gold_data, fingerprint, written)
+                instrument.count('rows', len(gold_data))
+        return True
 
 
     def write(self):
         "Write all the added examples to the paths specified in the constructor"
-        return self._writeV3()
+        if self._store is None and gold_store_path:
+            # Opened for this write only, a store passed to the constructor stays open for its owner.
+            store = GoldStore(gold_store_path)
+            try:
+                return self._writeV3(store)
+            finally:
+                store.close()
+        return self._writeV3(self._store)
@@ -0,0 +1,304 @@
+# Copyright (c) Johns Hopkins University and its affiliates.
+# This source code is licensed under the Apache 2 license found in the
+# LICENSE file in the root directory of this source tree.
+"""
+Distributed.py
+Runs scrapers on workers on any number of machines. The coordinator puts a
+job per scraper on a queue from covid_scraping.jobqueue, at most per_host
+at a time against any host. Workers claim the jobs with a lease they renew
+while the scraper runs, so the job of a worker that dies goes to another
+worker once its lease runs out.
+
+Workers never write the gold data. The coordinator copies the gold file of
+each scraper into a staging directory that all machines share, a worker
+scrapes into its own copy of it and reports the instrument record of the
+run back. When every job is done the coordinator commits the files of the
+successful jobs in one step, into path/schema_v0.3 or the gold store.
+
+Example call: results = coordinate(open_queue(location), infos, path, location + '.staging')
+"""
+__author__ = "JHU-COVID-QA"
+__copyright__ = "Copyright 2020, Johns Hopkins University"
+__credits__ = ["JHU-COVID-QA"]
+__license__ = "Apache 2.0"
+__version__ = "0.1"
+__maintainer__ = "JHU-COVID-QA"
+__email__ = "covidqa@jhu.edu"
+__status__ = "Development"
+
+import collections
+import filecmp
+import json
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+from covid_scraping import conversion, instrument, registry, utils
+from covid_scraping.gold_store import GoldStore
+from covid_scraping.jobqueue import open_queue
+from covid_scraping.scheduler import ScrapeResult, run_scrapers
+
+_schema_dir = 'schema_v0.3'
+
+
+def _log(message):
+    print(time.strftime('%Y-%m-%d %H:%M:%S') + ' ' + message, flush=True)
+
+
+def _gold_path(path, prefix):
+    return os.path.join(path, _schema_dir, prefix + '_v0.3.jsonl')
+
+
+def _stage_input(info, path, store, directory):
+    # What the scraper would find under path: its gold file and the merge index sidecar.
+    os.makedirs(os.path.join(directory, _schema_dir))
+    if store is not None and store.has_source(info.prefix):
+        store.export(os.path.join(directory, _schema_dir), prefixes=[info.prefix])
+        return
+    gold_path = _gold_path(path, info.prefix)
+    for source in [gold_path, utils._merge_index_path(gold_path)]:
+        if os.path.exists(source):
+            shutil.copyfile(source, os.path.join(directory, _schema_dir, os.path.basename(source)))
+
+
+def _keep_lease(location, job_id, attempt, lease, done, lost):
+    # A thread of its own, with its own connection to the queue.
+    queue = open_queue(location)
+    while not done.wait(lease / 3.0):
+        if not queue.renew(job_id, attempt, lease):
+            _log("Job %s: lost the lease, stopping the scraper" % job_id)
+            lost.set()
+            return
+
+
+def run_job(location, job_id, job, lease):
+    """
+    Runs the scraper of a claimed job in a copy of the job's input, renewing
+    the lease of the job while the scraper runs. The scraper is stopped when
+    the lease is lost, the job then belongs to the coordinator or another worker.
+
+    Returns: the result of the job, for the queue, None when the lease was lost
+    """
+    os.makedirs(job['staging'], exist_ok=True)
+    directory = tempfile.mkdtemp(prefix=socket.gethostname() + '-', dir=job['staging'])
+    shutil.copytree(os.path.join(job['input'], _schema_dir), os.path.join(directory, _schema_dir))
+    done = threading.Event()
+    lost = threading.Event()
+    keeper = threading.Thread(target=_keep_lease, args=(location, job_id, job.get('attempts', 0), lease, done, lost),
+                              daemon=True)
+    keeper.start()
+    try:
+        info = registry.ScraperInfo(**job['scraper'])
+        try:
+            scraper = registry.load(info, directory)
+        except Exception as e:
+            return {'status': 'failed', 'seconds': 0.0, 'directory': directory,
+                    'record': instrument.empty_record(info.name, info.prefix, 'failed', 0.0,
+                                                      "could not load the scraper: %s" % e)}
+        result = run_scrapers([scraper], max_workers=1, timeout=job['timeout'], stop=lost)[0]
+    finally:
+        done.set()
+        keeper.join()
+    if lost.is_set():
+        shutil.rmtree(directory, ignore_errors=True)
+        return None
+    return {'status': result.status, 'seconds': result.seconds, 'record': result.record,
+            'directory': directory, 'worker': '%s:%d' % (socket.gethostname(), os.getpid())}
+
+
+def work(location, lease=60, interval=1.0, until_empty=False):
+    """
+    Takes scrape jobs from the queue at location one at a time, until the
+    queue is empty if until_empty, otherwise until stopped.
+
+    Parameters:
+    1. location: the queue, see covid_scraping.jobqueue.open_queue
+    2. lease: seconds a claim lasts, it is renewed every lease / 3 seconds
+    3. interval: seconds between looks at an empty queue
+    4. until_empty: return once no job is waiting
+
+    Returns: the number of jobs run
+    """
+    queue = open_queue(location)
+    # The coordinator commits the files, the scrapers must write them to the staging directory.
+    conversion.gold_store_path = ''
+    jobs = 0
+    while True:
+        claimed = queue.claim(lease)
+        if claimed is None:
+            if until_empty:
+                return jobs
+            time.sleep(interval)
+            continue
+        job_id, job = claimed
+        attempt = job.get('attempts', 0)
+        if job.get('kind') != 'scrape':
+            queue.finish(job_id, {'status': 'failed', 'error': 'unknown job kind %r' % job.get('kind')}, attempt)
+            continue
+        _log("Job %s: %s" % (job_id, job['scraper']['name']))
+        result = run_job(location, job_id, job, lease)
+        jobs += 1
+        if result is None:
+            continue
+        if not queue.finish(job_id, result, attempt):
+            # The lease ran out between two renewals.
+            _log("Job %s: lost the lease, the result is dropped" % job_id)
+            shutil.rmtree(result['directory'], ignore_errors=True)
+            continue
+        _log("Job %s: %s after %.1f seconds" % (job_id, result['status'], result['seconds']))
+
+
+def _staged_fingerprint(gold_path):
+    # The examples fingerprint the worker's write recorded in the merge index sidecar.
+    try:
+        with open(utils._merge_index_path(gold_path)) as fp:
+            return json.load(fp).get('examples')
+    except (OSError, ValueError):
+        return None
+
+
+def commit(staged, path, store=None):
+    """
+    Copies the files the workers wrote over the gold files, or saves them to
+    the store. Files the scraper left as they were are not touched.
+
+    Parameters:
+    1. staged: list of (ScraperInfo, input directory, worker directory) of the successful jobs
+    2. path: the directory holding schema_v0.3
+    3. store: the GoldStore to save to instead, if any
+
+    Returns: the prefixes whose gold data changed
+    """
+    changed = []
+    for info, input_directory, directory in staged:
+        filenames = sorted(os.listdir(os.path.join(directory, _schema_dir)))
+        modified = [filename for filename in filenames
+                    if not os.path.exists(os.path.join(input_directory, _schema_dir, filename))
+                    or not filecmp.cmp(os.path.join(input_directory, _schema_dir, filename),
+                                       os.path.join(directory, _schema_dir, filename), shallow=False)]
+        if not modified:
+            continue
+        changed.append(info.prefix)
+        if store is not None:
+            gold_path = _gold_path(directory, info.prefix)
+            with open(gold_path) as fp:
+                gold_data = [json.loads(line) for line in fp if line.strip()]
+            store.save(info.prefix, gold_data, 'v0.3', _staged_fingerprint(gold_path))
+            continue
+        os.makedirs(os.path.join(path, _schema_dir), exist_ok=True)
+        for filename in modified:
+            target = os.path.join(path, _schema_dir, filename)
+            shutil.copyfile(os.path.join(directory, _schema_dir, filename), target + '.tmp')
+            os.replace(target + '.tmp', target)
+    return changed
+
+
+def coordinate(queue, infos, path, staging, timeout=1800, per_host=1, max_attempts=3, interval=1.0,
+               claim_timeout=600, run_timeout=None):
+    """
+    Runs the scrapers on the workers of the queue and commits what they wrote.
+
+    Parameters:
+    1. queue: the queue the workers take jobs from, see covid_scraping.jobqueue
+    2. infos: the ScraperInfos of the scrapers to run, see covid_scraping.registry
+    3. path: the directory holding schema_v0.3, as passed to a Scraper
+    4. staging: a directory every worker can read and write
+    5. timeout: default wall-clock limit per scraper in seconds, as in run_scrapers
+    6. per_host: maximum number of jobs out at once against a host, on all workers together
+    7. max_attempts: claims per job before it fails as lost, a claim ends when the
+       worker finishes or its lease runs out
+    8. interval: seconds between looks at the queue
+    9. claim_timeout: seconds a job may wait for a worker before it fails as lost
+    10. run_timeout: seconds after which the jobs still out fail, None for no limit
+
+    Returns: list of ScrapeResult, in the same order as infos
+    """
+    if per_host < 1:
+        # No job could ever be submitted.
+        raise ValueError("per_host must be at least 1, got %r" % per_host)
+    store = GoldStore(conversion.gold_store_path) if conversion.gold_store_path else None
+    # Workers on other machines find it by this path.
+    staging = os.path.abspath(staging)
+    os.makedirs(staging, exist_ok=True)
+    run_directory = tempfile.mkdtemp(prefix=time.strftime('%Y%m%d-%H%M%S-'), dir=staging)
+    results = [None] * len(infos)
+    staged = []
+    pending = collections.deque(range(len(infos)))
+    submitted = {}
+    claimed = set()
+    host_load = collections.Counter()
+    run_start = time.time()
+    last_notice = run_start
+
+    def fail(i, status, seconds, error):
+        record = instrument.empty_record(infos[i].name, infos[i].prefix, status, seconds, error)
+        results[i] = ScrapeResult(infos[i].name, False, status, seconds, record)
+
+    try:
+        while pending or submitted:
+            now = time.time()
+            if run_timeout is not None and now - run_start > run_timeout:
+                for job_id, (i, start) in submitted.items():
+                    # A worker may still finish it, but nobody waits for the result.
+                    queue.withdraw(job_id, {'status': 'lost', 'error': 'the run timed out'})
+                    fail(i, 'timeout', now - start, 'the run timed out after %d seconds' % run_timeout)
+                for i in pending:
+                    fail(i, 'lost', 0.0, 'not started before the run timed out after %d seconds' % run_timeout)
+                _log("The run timed out with %d jobs out and %d not started" % (len(submitted), len(pending)))
+                break
+            for i in list(pending):
+                if any(host_load[host] >= per_host for host in infos[i].hosts):
+                    continue
+                pending.remove(i)
+                job_directory = os.path.join(run_directory, infos[i].prefix)
+                input_directory = os.path.join(job_directory, 'input')
+                _stage_input(infos[i], path, store, input_directory)
+                job_id = queue.submit({'kind': 'scrape', 'scraper': dict(infos[i]._asdict()),
+                                       'input': input_directory, 'staging': job_directory,
+                                       'timeout': timeout})
+                submitted[job_id] = (i, time.time())
+                for host in infos[i].hosts:
+                    host_load[host] += 1
+            for job_id in queue.expire(max_attempts):
+                if job_id in submitted:
+                    _log("Job %s of %s: the lease ran out" % (job_id, infos[submitted[job_id][0]].name))
+            for job_id, (i, start) in submitted.items():
+                if job_id in claimed:
+                    continue
+                if queue.state(job_id) != 'new':
+                    claimed.add(job_id)
+                elif now - start > claim_timeout:
+                    queue.withdraw(job_id, {'status': 'lost',
+                                            'error': 'no worker claimed the job in %d seconds' % claim_timeout})
+            if submitted and not claimed and now - last_notice >= 60:
+                _log("No worker claimed a job in %d seconds, is scrape_worker.py running on this queue?"
+                     % (now - run_start))
+                last_notice = now
+            for job_id, (i, start) in list(submitted.items()):
+                result = queue.result(job_id)
+                if result is None:
+                    continue
+                del submitted[job_id]
+                for host in infos[i].hosts:
+                    host_load[host] -= 1
+                seconds = result.get('seconds', time.time() - start)
+                if result.get('record') is None:
+                    fail(i, result['status'], seconds, result.get('error'))
+                    continue
+                results[i] = ScrapeResult(infos[i].name, result['status'] == 'ok', result['status'],
+                                          seconds, result['record'])
+                if result['status'] == 'ok':
+                    staged.append((infos[i], os.path.join(run_directory, infos[i].prefix, 'input'),
+                                   result['directory']))
+            if submitted:
+                time.sleep(interval)
+        changed = commit(staged, path, store)
+        _log("Committed %d of %d sources, %d changed" % (len(staged), len(infos), len(changed)))
+    finally:
+        if store is not None:
+            store.close()
+    # Left in place when the commit failed, to look into.
+    shutil.rmtree(run_directory, ignore_errors=True)
+    return results
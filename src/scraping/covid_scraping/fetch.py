@@ -0,0 +1,232 @@
+# Copyright (c) Johns Hopkins University and its affiliates.
+# This source code is licensed under the Apache 2 license found in the
+# LICENSE file in the root directory of this source tree.
+"""
+Fetch.py
+Shared HTTP client for the scrapers. Every request goes through one pooled
+keep-alive session per process with a default timeout. Responses are cached on
+disk with their ETag and Last-Modified headers, so the next download of the
+same page is a conditional request and an unchanged page (304) is served from
+the cache.
+In 'record' mode every response is also saved to a fixture store, and in
+'replay' mode responses come only from that store, so scrapers can run and
+be benchmarked offline.
+
+Example call: html = fetch.get(url).text
+"""
+__author__ = "JHU-COVID-QA"
+__copyright__ = "Copyright 2020, Johns Hopkins University"
+__credits__ = ["JHU-COVID-QA"]
+__license__ = "Apache 2.0"
+__version__ = "0.1"
+__maintainer__ = "JHU-COVID-QA"
+__email__ = "covidqa@jhu.edu"
+__status__ = "Development"
+
+import collections
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+from urllib.parse import urldefrag
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from covid_scraping import instrument
+
+# Seconds to wait for the server before giving up, unless a call passes timeout.
+default_timeout = 60
+# Directory of the conditional GET cache, set COVID_SCRAPING_HTTP_CACHE to an empty string to disable it.
+cache_dir = None
+# 'live' downloads, 'record' also saves every response to the fixture store and
+# 'replay' serves every response from the fixture store without any network.
+# Set with COVID_SCRAPING_FETCH_MODE.
+mode = None
+# Directory of the fixture store, COVID_SCRAPING_FIXTURES. Bodies are kept once per content
+# under objects/, gzip compressed and named by their digest, responses/ maps each url to one.
+fixture_dir = None
+# Counts of 'requests', 'not_modified' (served from the cache), 'replayed' and 'bytes' downloaded in this process.
+stats = collections.Counter()
+
+_session = None
+_session_pid = None
+
+
+def read_environment():
+    """
+    Sets cache_dir, mode and fixture_dir from the COVID_SCRAPING_* environment
+    variables, done on import and by worker.py for every job.
+    """
+    global cache_dir, mode, fixture_dir
+    cache_dir = os.environ.get('COVID_SCRAPING_HTTP_CACHE',
+                               os.path.join(os.path.expanduser('~'), '.cache', 'covid_scraping', 'http'))
+    mode = os.environ.get('COVID_SCRAPING_FETCH_MODE', 'live')
+    fixture_dir = os.environ.get('COVID_SCRAPING_FIXTURES',
+                                 os.path.join(os.path.expanduser('~'), '.cache', 'covid_scraping', 'fixtures'))
+
+
+read_environment()
+
+
+def session():
+    """
+    Returns the requests.Session shared by this process. A forked child gets
+    its own session instead of reusing the parent's pooled connections.
+    """
+    global _session, _session_pid
+    if _session is None or _session_pid != os.getpid():
+        _session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=16)
+        _session.mount('http://', adapter)
+        _session.mount('https://', adapter)
+        _session_pid = os.getpid()
+    return _session
+
+
+def _url_key(url):
+    # The fragment is never sent to the server, so page.html#a and page.html#b share an entry.
+    return hashlib.blake2b(urldefrag(url)[0].encode('utf-8'), digest_size=16).hexdigest()
+
+
+def _cache_paths(url):
+    key = _url_key(url)
+    base = os.path.join(cache_dir, key[:2], key)
+    return base + '.json', base + '.body'
+
+
+def _atomic_write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+    with os.fdopen(fd, 'wb') as fp:
+        fp.write(data)
+    os.replace(tmp, path)
+
+
+def _read_cache(url):
+    if not cache_dir:
+        return None
+    meta_path, body_path = _cache_paths(url)
+    try:
+        with open(meta_path) as fp:
+            meta = json.load(fp)
+        with open(body_path, 'rb') as fp:
+            body = fp.read()
+    except (OSError, ValueError):
+        return None
+    return meta, body
+
+
+def _write_cache(url, response):
+    if not cache_dir:
+        return
+    if 'ETag' not in response.headers and 'Last-Modified' not in response.headers:
+        return
+    meta_path, body_path = _cache_paths(url)
+    meta = {'url': response.url, 'headers': dict(response.headers)}
+    # Body first, so a metadata file always has a complete body next to it.
+    _atomic_write(body_path, response.content)
+    _atomic_write(meta_path, json.dumps(meta).encode('utf-8'))
+
+
+def _cached_response(meta, body):
+    response = requests.models.Response()
+    response.status_code = 200
+    response.url = meta['url']
+    response.headers = CaseInsensitiveDict(meta['headers'])
+    response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+    response._content = body
+    response._content_consumed = True
+    return response
+
+
+def _fixture_paths(url):
+    key = _url_key(url)
+    return os.path.join(fixture_dir, 'responses', key[:2], key + '.json')
+
+
+def _object_path(digest):
+    return os.path.join(fixture_dir, 'objects', digest[:2], digest + '.gz')
+
+
+def record(url, response):
+    """
+    Saves response as the fixture for url. The body is stored only if no
+    fixture holds the same bytes yet.
+    """
+    digest = hashlib.blake2b(response.content).hexdigest()
+    object_path = _object_path(digest)
+    if not os.path.exists(object_path):
+        _atomic_write(object_path, gzip.compress(response.content))
+    fixture = {'url': response.url,
+               'status': response.status_code,
+               'headers': dict(response.headers),
+               'body': digest}
+    _atomic_write(_fixture_paths(url), json.dumps(fixture).encode('utf-8'))
+
+
+def replay(url):
+    """
+    Returns the recorded response for url as a requests.Response, raises
+    LookupError when nothing was recorded for it.
+    """
+    try:
+        with open(_fixture_paths(url)) as fp:
+            fixture = json.load(fp)
+        with open(_object_path(fixture['body']), 'rb') as fp:
+            body = gzip.decompress(fp.read())
+    except (OSError, ValueError):
+        raise LookupError("no recorded response for %s in %s" % (url, fixture_dir)) from None
+    response = _cached_response(fixture, body)
+    response.status_code = fixture['status']
+    return response
+
+
+def get(url, headers=None, use_cache=True, **kwargs):
+    """
+    Downloads url with a GET request through the shared session.
+
+    Parameters:
+    1. url: the page to download
+    2. headers: extra request headers
+    3. use_cache: False to skip the conditional GET cache for this call
+    4. kwargs: passed on to requests, e.g. verify=False
+
+    Returns: requests.Response, rebuilt from the cache when the server answers 304 Not Modified
+    and from the fixture store in 'replay' mode
+    """
+    with instrument.timed('fetch'):
+        instrument.count('pages')
+        if mode == 'replay':
+            response = replay(url)
+            stats['replayed'] += 1
+            stats['bytes'] += len(response.content)
+            instrument.count('bytes', len(response.content))
+            return response
+        response = _get(url, headers, use_cache, **kwargs)
+        if mode == 'record':
+            record(url, response)
+        return response
+
+
+def _get(url, headers, use_cache, **kwargs):
+    kwargs.setdefault('timeout', default_timeout)
+    headers = dict(headers or {})
+    cached = _read_cache(url) if use_cache else None
+    if cached is not None:
+        meta, body = cached
+        cached_headers = CaseInsensitiveDict(meta['headers'])
+        if 'ETag' in cached_headers:
+            headers['If-None-Match'] = cached_headers['ETag']
+        if 'Last-Modified' in cached_headers:
+            headers['If-Modified-Since'] = cached_headers['Last-Modified']
+    response = session().get(url, headers=headers, **kwargs)
+    stats['requests'] += 1
+    if response.status_code == 304 and cached is not None:
+        stats['not_modified'] += 1
+        return _cached_response(*cached)
+    stats['bytes'] += len(response.content)
+    instrument.count('bytes', len(response.content))
+    if use_cache and response.status_code == 200:
+        _write_cache(url, response)
+    return response
@@ -0,0 +1,191 @@
+# Copyright (c) Johns Hopkins University and its affiliates.
+# This source code is licensed under the Apache 2 license found in the
+# LICENSE file in the root directory of this source tree.
+"""
+Gold_store.py
+Keeps the gold QA pairs of every source in one SQLite database instead of a
+JSONL file per source. A merge then writes only the rows that changed, and
+export() writes the schema_v0.3 JSONL files for release, the same bytes the
+JSONL backend would have written.
+
+Example call: store = GoldStore('../../data/scraping/gold.sqlite')
+"""
+__author__ = "JHU-COVID-QA"
+__copyright__ = "Copyright 2020, Johns Hopkins University"
+__credits__ = ["JHU-COVID-QA"]
+__license__ = "Apache 2.0"
+__version__ = "0.1"
+__maintainer__ = "JHU-COVID-QA"
+__email__ = "covidqa@jhu.edu"
+__status__ = "Development"
+
+import json
+import os
+import sqlite3
+from covid_scraping import utils
+from covid_scraping.test_dump_to_schema import check_example
+
+# Each row keeps its example as the exact line jsonlines writes for it.
+_dumps = json.JSONEncoder(ensure_ascii=False).encode
+# Seconds a connection waits for another writer to finish.
+_busy_timeout = 60
+
+_schema = '''
+CREATE TABLE IF NOT EXISTS examples (
+    prefix TEXT NOT NULL,
+    ID TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    questionUUID TEXT,
+    sourceName TEXT,
+    questionKey TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (prefix, ID)
+);
+CREATE INDEX IF NOT EXISTS examples_ID ON examples (ID);
+CREATE INDEX IF NOT EXISTS examples_questionUUID ON examples (questionUUID);
+CREATE INDEX IF NOT EXISTS examples_sourceName ON examples (sourceName);
+CREATE INDEX IF NOT EXISTS examples_position ON examples (prefix, position);
+CREATE TABLE IF NOT EXISTS sources (
+    prefix TEXT PRIMARY KEY,
+    fingerprint TEXT
+);
+'''
+
+
+class _StoredRows():
+    """
+    The gold rows of one source, each parsed the first time it is used.
+    Rows appended after loading are kept as they are.
+    """
+
+    def __init__(self, lines):
+        self._lines = lines
+        self._rows = [None] * len(lines)
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __getitem__(self, i):
+        if self._rows[i] is None:
+            self._rows[i] = json.loads(self._lines[i])
+        return self._rows[i]
+
+    def append(self, row):
+        self._rows.append(row)
+
+
+class GoldStore():
+    def __init__(self, path):
+        """
+        Opens the SQLite database at path, creating it when it does not exist.
+        The file prefix a scraper passes to Conversion names its source in the store.
+        """
+        self._path = path
+        self._db = sqlite3.connect(path, timeout=_busy_timeout)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.executescript(_schema)
+
+    def close(self):
+        self._db.close()
+
+    def prefixes(self):
+        return [prefix for prefix, in self._db.execute('SELECT prefix FROM sources ORDER BY prefix')]
+
+    def has_source(self, prefix):
+        return self._db.execute('SELECT 1 FROM sources WHERE prefix = ?', (prefix,)).fetchone() is not None
+
+    def is_unchanged(self, prefix, fingerprint):
+        """
+        Returns True when the rows of prefix were saved from scraped examples with this fingerprint.
+        """
+        row = self._db.execute('SELECT fingerprint FROM sources WHERE prefix = ?', (prefix,)).fetchone()
+        return row is not None and row[0] == fingerprint
+
+    def _lines(self, prefix):
+        return [data for data, in self._db.execute(
+            'SELECT data FROM examples WHERE prefix = ? ORDER BY position', (prefix,))]
+
+    def rows(self, prefix):
+        """
+        Returns the gold examples of prefix in file order.
+        """
+        return [json.loads(line) for line in self._lines(prefix)]
+
+    def merge(self, prefix, list_of_qa_objects):
+        """
+        utils.merge against the rows of prefix in the store. Nothing is written,
+        pass the result to save().
+
+        Returns: modified list of JSON type QA objects after merge
+        """
+        questions = {}
+        for key, position in self._db.execute(
+                'SELECT questionKey, position FROM examples WHERE prefix = ? ORDER BY position', (prefix,)):
+            questions.setdefault(key, position)
+        return utils._merge_rows(_StoredRows(self._lines(prefix)), questions, list_of_qa_objects)
+
+    def save(self, prefix, gold_data, version='v0.3', fingerprint=None):
+        """
+        Makes gold_data the rows of prefix, checking each example against the
+        schema version first. Only new rows, changed rows and rows that moved
+        are written, and rows that are no longer in gold_data are deleted, all
+        in one transaction.
+
+        Parameters:
+        1. prefix: the file prefix of the source
+        2. gold_data: list of JSON type QA objects, with unique IDs, in file order
+        3. version: schema version the examples are checked against
+        4. fingerprint: examples_fingerprint of the scraped examples gold_data came from
+
+        Returns: dict with the number of rows 'written', 'deleted' and 'unchanged'
+        """
+        for idx, example in enumerate(gold_data):
+            check_example(idx, example, version)
+        stored = {example_id: (position, data) for example_id, position, data in self._db.execute(
+            'SELECT ID, position, data FROM examples WHERE prefix = ?', (prefix,))}
+        upserts = []
+        for position, example in enumerate(gold_data):
+            data = _dumps(example)
+            if stored.pop(example['ID'], None) != (position, data):
+                upserts.append((prefix, example['ID'], position, example.get('questionUUID'),
+                                example.get('sourceName'), utils._question_key(example['questionText']), data))
+        with self._db:
+            self._db.executemany(
+                'INSERT INTO examples (prefix, ID, position, questionUUID, sourceName, questionKey, data) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT (prefix, ID) DO UPDATE SET position = excluded.position, '
+                'questionUUID = excluded.questionUUID, sourceName = excluded.sourceName, '
+                'questionKey = excluded.questionKey, data = excluded.data', upserts)
+            self._db.executemany('DELETE FROM examples WHERE prefix = ? AND ID = ?',
+                                 [(prefix, example_id) for example_id in stored])
+            self._db.execute('INSERT INTO sources (prefix, fingerprint) VALUES (?, ?) '
+                             'ON CONFLICT (prefix) DO UPDATE SET fingerprint = excluded.fingerprint',
+                             (prefix, fingerprint))
+        return {'written': len(upserts), 'deleted': len(stored),
+                'unchanged': len(gold_data) - len(upserts)}
+
+    def import_file(self, prefix, gold_jsonl_path, version='v0.3'):
+        """
+        Loads an existing gold JSONL file as the rows of prefix.
+        """
+        with open(gold_jsonl_path) as fp:
+            gold_data = [json.loads(line) for line in fp if line.strip()]
+        return self.save(prefix, gold_data, version)
+
+    def export(self, directory, version='v0.3', prefixes=None):
+        """
+        Writes <prefix>_<version>.jsonl and its merge index sidecar in directory
+        for every source, or for the given prefixes, byte for byte what the JSONL
+        backend writes for the same examples.
+
+        Returns: list of the paths written
+        """
+        paths = []
+        for prefix in (self.prefixes() if prefixes is None else prefixes):
+            row = self._db.execute('SELECT fingerprint FROM sources WHERE prefix = ?', (prefix,)).fetchone()
+            gold_data = self.rows(prefix)
+            path = os.path.join(directory, '%s_%s.jsonl' % (prefix, version))
+            written = utils.write_jsonlines(path, gold_data, version)
+            utils.write_merge_index(path, gold_data, row[0] if row else None, written)
+            paths.append(path)
+        return paths
@@ -0,0 +1,171 @@
+# Copyright (c) Johns Hopkins University and its affiliates.
+# This source code is licensed under the Apache 2 license found in the
+# LICENSE file in the root directory of this source tree.
+"""
+Instrument.py
+Measures a scrape in this process. Wall time is kept per phase: 'fetch' in
+fetch.get, 'convert' for cleaning the html of the examples, 'merge' with the
+gold data and 'write' of the gold file. Whatever else the scraper spends is
+its own 'parse' time. Alongside are the counts of bytes fetched, pages
+fetched for parsing, examples added, fuzzy merge comparisons and rows written.
+
+run() wraps one Scraper.scrape() call and returns its JSON record, and
+aggregate() sums the records of a whole run.
+
+Example call: record = instrument.run(scraper)
+"""
+__author__ = "JHU-COVID-QA"
+__copyright__ = "Copyright 2020, Johns Hopkins University"
+__credits__ = ["JHU-COVID-QA"]
+__license__ = "Apache 2.0"
+__version__ = "0.1"
+__maintainer__ = "JHU-COVID-QA"
+__email__ = "covidqa@jhu.edu"
+__status__ = "Development"
+
+import collections
+import contextlib
+import threading
+import time
+import traceback
+
+phases = ['fetch', 'convert', 'merge', 'write']
+count_names = ['bytes', 'pages', 'examples', 'comparisons', 'rows']
+# Seconds spent in each phase in this process.
+seconds = collections.Counter()
+# Counts of count_names in this process.
+counts = collections.Counter()
+
+
+# Guards seconds, counts and the bookkeeping of timed() against threads of the same run.
+_lock = threading.Lock()
+# Number of timed() blocks of each phase running right now, and since when one has been.
+_active = collections.Counter()
+_active_since = {}
+
+
+@contextlib.contextmanager
+def timed(phase):
+    """
+    Adds the time spent in the block to seconds[phase]. Blocks of one phase
+    running at once, e.g. downloads in several threads, count as the wall time
+    of their union rather than the sum of their times.
+    """
+    with _lock:
+        if _active[phase] == 0:
+            _active_since[phase] = time.perf_counter()
+        _active[phase] += 1
+    try:
+        yield
+    finally:
+        with _lock:
+            _active[phase] -= 1
+            if _active[phase] == 0:
+                seconds[phase] += time.perf_counter() - _active_since.pop(phase)
+
+
+def count(name, n=1):
+    """
+    Adds n to counts[name], safe to call from several threads.
+    """
+    with _lock:
+        counts[name] += n
+
+
+def reset():
+    with _lock:
+        seconds.clear()
+        counts.clear()
+
+
+def record(name, filename, status, total, error=None):
+    """
+    Returns the JSON record of one scraper run from the phase times and counts
+    collected since the last reset().
+    """
+    times = {phase: seconds[phase] for phase in phases}
+    times['parse'] = max(0.0, total - sum(times.values()))
+    times['total'] = total
+    result = {'scraper': name,
+              'file': filename,
+              'status': status,
+              'seconds': times}
+    for count in count_names:
+        result[count] = counts[count]
+    if error is not None:
+        result['error'] = error
+    return result
+
+
+def empty_record(name, filename, status, total, error=None):
+    """
+    Returns the record of a run nothing was measured of, e.g. one that timed out.
+    """
+    times = {phase: 0.0 for phase in phases + ['parse']}
+    times['total'] = total
+    result = {'scraper': name,
+              'file': filename,
+              'status': status,
+              'seconds': times}
+    for count in count_names:
+        result[count] = 0
+    if error is not None:
+        result['error'] = error
+    return result
+
+
+def run(scraper):
+    """
+    Runs scraper.scrape() in this process. An exception is printed and
+    recorded rather than raised.
+
+    Returns: the JSON record of the run, with 'status' 'ok' or 'failed'
+    """
+    reset()
+    start = time.perf_counter()
+    error = None
+    try:
+        success = scraper.scrape()
+    except Exception as e:
+        traceback.print_exc()
+        success = False
+        error = '%s: %s' % (e.__class__.__name__, e)
+    return record(scraper.__class__.__name__, getattr(scraper, '_filename', None),
+                  'ok' if success else 'failed', time.perf_counter() - start, error)
+
+
+def aggregate(records):
+    """
+    Sums the records of many scraper runs.
+
+    Returns: dict with the number of 'scrapers', the names of the 'failed'
+    ones, the summed 'seconds' per phase and counts, and the 'records' themselves
+    """
+    times = collections.Counter()
+    totals = collections.Counter()
+    for result in records:
+        times.update(result.get('seconds', {}))
+        for name in count_names:
+            totals[name] += result.get(name, 0)
+    summary = {'scrapers': len(records),
+               'failed': [result['scraper'] for result in records if result['status'] != 'ok'],
+               'seconds': {phase: times[phase] for phase in phases + ['parse', 'total']}}
+    for name in count_names:
+        summary[name] = totals[name]
+    summary['records'] = list(records)
+    return summary
+
+
+def format_summary(summary, slowest=5):
+    """
+    Returns a few lines of text describing an aggregate().
+    """
+    lines = ["%d scrapers, %d failed%s" % (summary['scrapers'], len(summary['failed']),
+                                           (": " + ", ".join(summary['failed'])) if summary['failed'] else "")]
+    lines.append("seconds: " + ", ".join("%s %.1f" % (phase, summary['seconds'][phase])
+                                         for phase in ['fetch', 'parse', 'convert', 'merge', 'write', 'total']))
+    lines.append(", ".join("%d %s" % (summary[name], name) for name in count_names))
+    by_time = sorted(summary['records'], key=lambda result: result['seconds'].get('total', 0), reverse=True)
+    for result in by_time[:slowest]:
+        lines.append("%-32s %-8s %9.1f" % (result['scraper'], result['status'], result['seconds'].get('total', 0)))
+    return "\n".join(lines)
@@ -0,0 +1,383 @@
+# Copyright (c) Johns Hopkins University and its affiliates.
+# This source code is licensed under the Apache 2 license found in the
+# LICENSE file in the root directory of this source tree.
+"""
+Jobqueue.py
+Job queues for handing jobs to worker processes. A job is a JSON object.
+
+FileQueue keeps the queue in a directory. A job waits in new/ until a worker
+claims it by renaming it into running/, and its result is written to done/.
+Renames are atomic, so any number of workers can claim from the same queue
+and each job goes to exactly one of them, also from other machines when the
+directory is on a shared file system. SQLiteQueue keeps the same queue in a
+SQLite database, for workers on the machine that holds the database file.
+
+A worker may claim a job with a lease and must then renew it before it runs
+out. expire() puts the jobs of workers that died back in the queue. Every
+claim is known by the 'attempts' field of the job it returns, and renew()
+and finish() only act for the current claim, so a worker whose lease ran
+out can no longer touch the job another worker took over.
+
+Example call: job_id = open_queue(location).submit({'kind': 'validate', 'args': []})
+"""
+__author__ = "JHU-COVID-QA"
+__copyright__ = "Copyright 2020, Johns Hopkins University"
+__credits__ = ["JHU-COVID-QA"]
+__license__ = "Apache 2.0"
+__version__ = "0.1"
+__maintainer__ = "JHU-COVID-QA"
+__email__ = "covidqa@jhu.edu"
+__status__ = "Development"
+
+import json
+import os
+import sqlite3
+import time
+import uuid
+
+# Seconds a SQLiteQueue connection waits for another writer to finish.
+_busy_timeout = 60
+
+
+def _write_json(path, obj):
+    tmp_path = '%s.%d.tmp' % (path, os.getpid())
+    with open(tmp_path, 'w') as fp:
+        json.dump(obj, fp)
+    os.replace(tmp_path, path)
+
+
+def _read_json(path):
+    try:
+        with open(path) as fp:
+            return json.load(fp)
+    except (OSError, ValueError):
+        return None
+
+
+def _new_job_id():
+    # Sorts in submission order.
+    return '%017.6f-%s' % (time.time(), uuid.uuid4().hex[:8])
+
+
+def _lost_result(attempts):
+    return {'status': 'lost', 'attempts': attempts,
+            'error': 'the lease ran out %d times, the workers running the job stopped' % attempts}
+
+
+class _JobQueue():
+    def wait(self, job_id, timeout=None, interval=0.5):
+        """
+        Waits for the job to finish, at most timeout seconds if given.
+
+        Returns: the result of the job, None on timeout
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            result = self.result(job_id)
+            if result is not None or (deadline is not None and time.time() >= deadline):
+                return result
+            time.sleep(interval)
+
+
+class FileQueue(_JobQueue):
+    def __init__(self, directory):
+        self._directory = directory
+        for state in ['new', 'running', 'done']:
+            os.makedirs(os.path.join(directory, state), exist_ok=True)
+
+    def _path(self, state, job_id):
+        return os.path.join(self._directory, state, job_id + '.json')
+
+    def _lease_path(self, job_id, attempt):
+        # The deadline of the lease is the modification time of the file.
+        return os.path.join(self._directory, 'running', '%s.%d.lease' % (job_id, attempt))
+
+    def submit(self, job):
+        """
+        Adds job to the queue.
+
+        Returns: the id of the job, ids sort in submission order
+        """
+        job_id = _new_job_id()
+        # Written aside first, a worker must never see half a job.
+        tmp_path = os.path.join(self._directory, job_id + '.json.tmp')
+        with open(tmp_path, 'w') as fp:
+            json.dump(job, fp)
+        os.replace(tmp_path, self._path('new', job_id))
+        return job_id
+
+    def claim(self, lease=None):
+        """
+        Takes the oldest waiting job, for lease seconds if given, otherwise until it is finished.
+
+        Returns: (job id, job), or None when no job is waiting
+        """
+        for filename in sorted(os.listdir(os.path.join(self._directory, 'new'))):
+            if not filename.endswith('.json'):
+                continue
+            job_id = filename[:-len('.json')]
+            try:
+                os.rename(self._path('new', job_id), self._path('running', job_id))
+            except FileNotFoundError:
+                # Another worker was first.
+                continue
+            job = _read_json(self._path('running', job_id))
+            if job is not None:
+                if lease is not None:
+                    # Dated before it is renamed into place, expire() must never see it undated.
+                    lease_path = self._lease_path(job_id, job.get('attempts', 0))
+                    open(lease_path + '.tmp', 'w').close()
+                    deadline = time.time() + lease
+                    os.utime(lease_path + '.tmp', (deadline, deadline))
+                    os.rename(lease_path + '.tmp', lease_path)
+                return job_id, job
+        return None
+
+    def renew(self, job_id, attempt, lease):
+        """
+        Extends the lease of a claimed job to lease seconds from now.
+
+        Parameters:
+        1. job_id: the id of the job
+        2. attempt: the 'attempts' field of the claimed job, 0 for the first claim
+        3. lease: seconds from now
+
+        Returns: False when the claim is over, e.g. after its lease ran out
+        """
+        deadline = time.time() + lease
+        try:
+            os.utime(self._lease_path(job_id, attempt), (deadline, deadline))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def expire(self, max_attempts=None):
+        """
+        Puts the claimed jobs whose lease ran out back in the queue, counting
+        the claims in the 'attempts' field of the job. A job that already had
+        max_attempts claims finishes with status 'lost' instead.
+
+        Returns: the ids of the expired jobs
+        """
+        expired = []
+        now = time.time()
+        for filename in sorted(os.listdir(os.path.join(self._directory, 'running'))):
+            if not filename.endswith('.lease'):
+                continue
+            job_id, attempt = filename[:-len('.lease')].rsplit('.', 1)
+            lease_path = self._lease_path(job_id, int(attempt))
+            try:
+                if os.stat(lease_path).st_mtime > now:
+                    continue
+                # Whoever removes the lease file owns the job, finish() does the same.
+                os.remove(lease_path)
+            except FileNotFoundError:
+                # The worker finished it meanwhile.
+                continue
+            job = _read_json(self._path('running', job_id))
+            if job is None:
+                continue
+            attempts = job.get('attempts', 0) + 1
+            if max_attempts is not None and attempts >= max_attempts:
+                self.finish(job_id, _lost_result(attempts))
+            else:
+                job['attempts'] = attempts
+                _write_json(self._path('running', job_id), job)
+                # Last, as in claim(): once the job is in new/ another worker may take it.
+                os.rename(self._path('running', job_id), self._path('new', job_id))
+            expired.append(job_id)
+        return expired
+
+    def withdraw(self, job_id, result):
+        """
+        Finishes a job no worker claimed yet with result, e.g. one that waited too long.
+
+        Returns: False when the job was already claimed or finished
+        """
+        try:
+            os.rename(self._path('new', job_id), self._path('running', job_id))
+        except FileNotFoundError:
+            return False
+        self.finish(job_id, result)
+        return True
+
+    def state(self, job_id):
+        """
+        Returns 'new', 'running' or 'done', None for an unknown job.
+        """
+        for state in ['done', 'running', 'new']:
+            if os.path.exists(self._path(state, job_id)):
+                return state
+        return None
+
+    def finish(self, job_id, result, attempt=None):
+        """
+        Records the result of a claimed job, a JSON object.
+
+        Parameters:
+        1. job_id: the id of the job
+        2. result: the result
+        3. attempt: for a claim with a lease, the 'attempts' field of the claimed job
+
+        Returns: False when the claim is over and the result was dropped
+        """
+        if attempt is not None:
+            try:
+                os.remove(self._lease_path(job_id, attempt))
+            except FileNotFoundError:
+                return False
+        _write_json(self._path('done', job_id), result)
+        try:
+            os.remove(self._path('running', job_id))
+        except FileNotFoundError:
+            pass
+        return True
+
+    def result(self, job_id):
+        """
+        Returns the result of the job, None while it is not finished.
+        """
+        return _read_json(self._path('done', job_id))
+
+
+class SQLiteQueue(_JobQueue):
+    def __init__(self, path):
+        """
+        Opens the queue in the SQLite database at path, creating it when it does not exist.
+        """
+        self._path = path
+        self._db = sqlite3.connect(path, timeout=_busy_timeout)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        with self._db:
+            self._db.execute('CREATE TABLE IF NOT EXISTS jobs ('
+                             'id TEXT PRIMARY KEY, state TEXT NOT NULL, job TEXT NOT NULL, '
+                             'result TEXT, lease_until REAL, attempts INTEGER NOT NULL DEFAULT 0)')
+            self._db.execute('CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, id)')
+            # Queues made before claims were counted.
+            if 'attempts' not in [row[1] for row in self._db.execute('PRAGMA table_info(jobs)')]:
+                self._db.execute('ALTER TABLE jobs ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0')
+
+    def close(self):
+        self._db.close()
+
+    def submit(self, job):
+        """
+        Adds job to the queue.
+
+        Returns: the id of the job, ids sort in submission order
+        """
+        job_id = _new_job_id()
+        with self._db:
+            self._db.execute("INSERT INTO jobs (id, state, job) VALUES (?, 'new', ?)", (job_id, json.dumps(job)))
+        return job_id
+
+    def claim(self, lease=None):
+        """
+        Takes the oldest waiting job, for lease seconds if given, otherwise until it is finished.
+
+        Returns: (job id, job), or None when no job is waiting
+        """
+        while True:
+            row = self._db.execute("SELECT id, job FROM jobs WHERE state = 'new' ORDER BY id LIMIT 1").fetchone()
+            if row is None:
+                return None
+            with self._db:
+                claimed = self._db.execute(
+                    "UPDATE jobs SET state = 'running', lease_until = ? WHERE id = ? AND state = 'new'",
+                    (None if lease is None else time.time() + lease, row[0])).rowcount
+            # Otherwise another worker was first.
+            if claimed:
+                return row[0], json.loads(row[1])
+
+    def renew(self, job_id, attempt, lease):
+        """
+        Extends the lease of a claimed job to lease seconds from now.
+
+        Parameters:
+        1. job_id: the id of the job
+        2. attempt: the 'attempts' field of the claimed job, 0 for the first claim
+        3. lease: seconds from now
+
+        Returns: False when the claim is over, e.g. after its lease ran out
+        """
+        with self._db:
+            return self._db.execute("UPDATE jobs SET lease_until = ? WHERE id = ? AND state = 'running' "
+                                    "AND attempts = ?", (time.time() + lease, job_id, attempt)).rowcount == 1
+
+    def expire(self, max_attempts=None):
+        """
+        Puts the claimed jobs whose lease ran out back in the queue, counting
+        the claims in the 'attempts' field of the job. A job that already had
+        max_attempts claims finishes with status 'lost' instead.
+
+        Returns: the ids of the expired jobs
+        """
+        expired = []
+        with self._db:
+            rows = self._db.execute("SELECT id, job FROM jobs WHERE state = 'running' AND lease_until < ? "
+                                    "ORDER BY id", (time.time(),)).fetchall()
+            for job_id, data in rows:
+                job = json.loads(data)
+                attempts = job.get('attempts', 0) + 1
+                if max_attempts is not None and attempts >= max_attempts:
+                    self._db.execute("UPDATE jobs SET state = 'done', result = ?, lease_until = NULL WHERE id = ?",
+                                     (json.dumps(_lost_result(attempts)), job_id))
+                else:
+                    job['attempts'] = attempts
+                    self._db.execute("UPDATE jobs SET state = 'new', job = ?, lease_until = NULL, attempts = ? "
+                                     "WHERE id = ?", (json.dumps(job), attempts, job_id))
+                expired.append(job_id)
+        return expired
+
+    def withdraw(self, job_id, result):
+        """
+        Finishes a job no worker claimed yet with result, e.g. one that waited too long.
+
+        Returns: False when the job was already claimed or finished
+        """
+        with self._db:
+            return self._db.execute("UPDATE jobs SET state = 'done', result = ? WHERE id = ? AND state = 'new'",
+                                    (json.dumps(result), job_id)).rowcount == 1
+
+    def state(self, job_id):
+        """
+        Returns 'new', 'running' or 'done', None for an unknown job.
+        """
+        row = self._db.execute('SELECT state FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return None if row is None else row[0]
+
+    def finish(self, job_id, result, attempt=None):
+        """
+        Records the result of a claimed job, a JSON object.
+
+        Parameters:
+        1. job_id: the id of the job
+        2. result: the result
+        3. attempt: for a claim with a lease, the 'attempts' field of the claimed job
+
+        Returns: False when the claim is over and the result was dropped
+        """
+        with self._db:
+            if attempt is None:
+                self._db.execute("UPDATE jobs SET state = 'done', result = ?, lease_until = NULL WHERE id = ?",
+                                 (json.dumps(result), job_id))
+                return True
+            return self._db.execute("UPDATE jobs SET state = 'done', result = ?, lease_until = NULL "
+                                    "WHERE id = ? AND state = 'running' AND attempts = ?",
+                                    (json.dumps(result), job_id, attempt)).rowcount == 1
+
+    def result(self, job_id):
+        """
+        Returns the result of the job, None while it is not finished.
+        """
+        row = self._db.execute("SELECT result FROM jobs WHERE id = ? AND state = 'done'", (job_id,)).fetchone()
+        return None if row is None else json.loads(row[0])
+
+
+def open_queue(location):
+    """
+    Returns a SQLiteQueue for a location ending in .sqlite or .db, a FileQueue otherwise.
+    """
+    if location.endswith(('.sqlite', '.db')):
+        return SQLiteQueue(location)
+    return FileQueue(location)
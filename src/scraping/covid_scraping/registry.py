@@ -0,0 +1,139 @@
+# Copyright (c) Johns Hopkins University and its affiliates.
+# This source code is licensed under the Apache 2 license found in the
+# LICENSE file in the root directory of this source tree.
+"""
+Registry.py
+Finds the scrapers of a directory without importing them. A scraper class
+registers itself by declaring, as literals in its class body, the prefix of
+the files it writes and optionally its hosts and cost class:
+
+    class NewYorkTimesScraper(Scraper):
+        prefix = 'NYT'
+        hosts = ['www.nytimes.com']
+        cost = 'light'
+
+The modules are read with ast, so choosing what to run costs a few
+milliseconds and only the chosen scrapers, with their dependencies such as
+Selenium, are ever imported.
+
+Example call: scrapers = [load(info, path) for info in select(discover('.'), only=['NYT'])]
+"""
+__author__ = "JHU-COVID-QA"
+__copyright__ = "Copyright 2020, Johns Hopkins University"
+__credits__ = ["JHU-COVID-QA"]
+__license__ = "Apache 2.0"
+__version__ = "0.1"
+__maintainer__ = "JHU-COVID-QA"
+__email__ = "covidqa@jhu.edu"
+__status__ = "Development"
+
+import ast
+import collections
+import importlib
+import os
+import subprocess
+
+# name is the class name, module the module it is defined in and file the path of that module.
+ScraperInfo = collections.namedtuple('ScraperInfo', ['name', 'module', 'file', 'prefix', 'hosts', 'cost'])
+# Cost classes from cheapest to most expensive: a few pages, many pages, a web browser, a Scrapy crawl.
+cost_classes = ['light', 'heavy', 'browser', 'crawl']
+
+
+def _class_attributes(node):
+    # Literal assignments of a class body, e.g. prefix = 'NYT'.
+    attributes = {}
+    for statement in node.body:
+        if isinstance(statement, ast.Assign) and len(statement.targets) == 1 \
+                and isinstance(statement.targets[0], ast.Name):
+            try:
+                attributes[statement.targets[0].id] = ast.literal_eval(statement.value)
+            except ValueError:
+                pass
+    return attributes
+
+
+def discover(directory):
+    """
+    Reads the scraper declarations of the modules in directory.
+
+    Parameters:
+        1. directory: the directory of the scraper modules
+
+    Returns: a ScraperInfo for every registered scraper, by name
+    """
+    infos = {}
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith('.py'):
+            continue
+        path = os.path.join(directory, filename)
+        with open(path, 'rb') as fp:
+            tree = ast.parse(fp.read(), filename=path)
+        for node in tree.body:
+            if not isinstance(node, ast.ClassDef):
+                continue
+            attributes = _class_attributes(node)
+            if attributes.get('prefix') is None:
+                continue
+            cost = attributes.get('cost', 'light')
+            if cost not in cost_classes:
+                raise ValueError("%s in %s has unknown cost class '%s'" % (node.name, path, cost))
+            if node.name in infos:
+                raise ValueError("Scraper %s is defined in both %s and %s" % (node.name, infos[node.name].file, path))
+            infos[node.name] = ScraperInfo(name=node.name, module=filename[:-len('.py')], file=path,
+                                           prefix=attributes['prefix'], hosts=list(attributes.get('hosts', [])),
+                                           cost=cost)
+    return infos
+
+
+def changed_modules(directory, revision):
+    """
+    Returns the names of the modules in directory that differ from revision in git,
+    uncommitted changes included. Raises subprocess.CalledProcessError, with git's
+    message as its stderr, when git does not know revision.
+    """
+    output = subprocess.run(['git', 'diff', '--name-only', '--relative', revision, '--', '.'],
+                            cwd=directory, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True,
+                            universal_newlines=True).stdout
+    return {os.path.splitext(os.path.basename(line))[0] for line in output.split()
+            if line.endswith('.py') and os.path.dirname(line) == ''}
+
+
+def _matches(info, patterns):
+    return any(pattern in (info.name, info.prefix, info.cost) for pattern in patterns)
+
+
+def select(infos, only=None, exclude=None, modules=None, shard=None):
+    """
+    Chooses the scrapers of a run.
+
+    Parameters:
+        1. infos: the scrapers by name, as returned by discover
+        2. only: names, prefixes or cost classes to keep, None keeps all
+        3. exclude: names, prefixes or cost classes to drop
+        4. modules: keep only the scrapers defined in these modules, see changed_modules
+        5. shard: (index, count), keep the index-th of count disjoint shards, the same
+           for every machine running the same code
+
+    Returns: the chosen ScraperInfos, most expensive first
+    """
+    chosen = [info for info in infos.values()
+              if (only is None or _matches(info, only))
+              and not _matches(info, exclude or [])
+              and (modules is None or info.module in modules)]
+    # The expensive ones start first, so they do not hold up the end of the run.
+    chosen.sort(key=lambda info: (-cost_classes.index(info.cost), info.name))
+    if shard is not None:
+        index, count = shard
+        # Dealt out in cost order, every shard gets its share of each cost class.
+        chosen = chosen[index::count]
+    return chosen
+
+
+def load(info, path):
+    """
+    Imports the module of the scraper, which must be importable, and makes the scraper.
+
+    Returns: the scraper, writing info.prefix files under path
+    """
+    module = importlib.import_module(info.module)
+    return getattr(module, info.name)(path=path, filename=info.prefix)
@@ -0,0 +1,238 @@
+# Copyright (c) Johns Hopkins University and its affiliates.
+# This source code is licensed under the Apache 2 license found in the
+# LICENSE file in the root directory of this source tree.
+"""
+Release.py
+Builds the release files of a directory of scraped JSONL files incrementally.
+release_manifest.json in the directory records the digest, row, question and
+answer counts of every source file, and .release/<file>.json keeps the
+source's rows as released tsv lines. Only sources whose digest changed since
+the last build are read again.
+
+Example call: manifest = release.update_manifest(path)
+"""
+__author__ = "JHU-COVID-QA"
+__copyright__ = "Copyright 2020, Johns Hopkins University"
+__credits__ = ["JHU-COVID-QA"]
+__license__ = "Apache 2.0"
+__version__ = "0.1"
+__maintainer__ = "JHU-COVID-QA"
+__email__ = "covidqa@jhu.edu"
+__status__ = "Development"
+
+import csv
+import hashlib
+import io
+import json
+import os
+
+manifest_name = 'release_manifest.json'
+fragment_dir = '.release'
+# Bump whenever the fragments would come out differently, all of them are rebuilt then.
+_manifest_version = 1
+# Columns left out of the public release, questionText and answerText are released as question and answer.
+dropped_columns = {'needUpdate', 'extraData', 'isAnnotated', 'typeOfInfo',
+                   'responseAuthority', 'topic', 'targetEducationLevel', 'answerOriginal', 'questionOriginal',
+                   'questionText', 'answerText', 'answerToks2URL', 'answerContainsURLs', 'answerUUID', 'questionUUID'}
+
+
+def source_files(directory):
+    """
+    Returns the names of the jsonl files in directory, in name order.
+    """
+    return sorted(filename for filename in os.listdir(directory) if filename.endswith("jsonl"))
+
+
+def is_released(filename):
+    # Internal sources are counted but never published.
+    return "internal" not in filename
+
+
+def released_columns(example):
+    """
+    Returns the released columns, in the order of example's keys with
+    question and answer last.
+    """
+    return [key for key in example if key not in dropped_columns] + ['question', 'answer']
+
+
+def released_values(example, columns):
+    """
+    Returns the values of example in the released columns, None when missing.
+    """
+    values = []
+    for column in columns:
+        if column == 'question':
+            values.append(example.get('questionText'))
+        elif column == 'answer':
+            values.append(example.get('answerText'))
+        else:
+            values.append(example.get(column))
+    return values
+
+
+def read_released(paths):
+    """
+    Yields every example of the files as the list of its released values.
+    The columns come from the first example, a missing value is None.
+
+    Returns: generator of lists, the first one being the column names
+    """
+    columns = None
+    for path in paths:
+        with open(path) as fp:
+            for line in fp:
+                example = json.loads(line)
+                if columns is None:
+                    columns = released_columns(example)
+                    yield columns
+                yield released_values(example, columns)
+
+
+def _tsv_value(value):
+    # Formats a value the way pandas' to_csv did.
+    return '' if value is None else str(value)
+
+
+def file_digest(path):
+    digest = hashlib.blake2b()
+    with open(path, 'rb') as fp:
+        for block in iter(lambda: fp.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _atomic_write_text(path, text):
+    tmp_path = '%s.%d.tmp' % (path, os.getpid())
+    with open(tmp_path, 'w', newline='') as fp:
+        fp.write(text)
+    os.replace(tmp_path, path)
+
+
+def _fragment_path(directory, filename):
+    return os.path.join(directory, fragment_dir, filename + '.json')
+
+
+def _read_source(directory, filename, digest, columns):
+    """
+    Reads one source file, writes its fragment and returns its manifest entry.
+    columns is the header the rows are released under, None to use the
+    source's own columns.
+    """
+    own_columns = None
+    rows = []
+    urls = set()
+    counts = {'rows': 0, 'questions': 0, 'answers': 0, 'hasAnswer': 0}
+    line = io.StringIO()
+    writer = csv.writer(line, delimiter='\t', lineterminator='\n')
+    with open(os.path.join(directory, filename)) as fp:
+        for text in fp:
+            example = json.loads(text)
+            if own_columns is None:
+                own_columns = released_columns(example)
+                if columns is None:
+                    columns = own_columns
+            writer.writerow([_tsv_value(value) for value in released_values(example, columns)])
+            rows.append(line.getvalue())
+            line.seek(0)
+            line.truncate()
+            urls.add(example.get('sourceUrl'))
+            counts['rows'] += 1
+            counts['questions'] += bool(example.get('questionText'))
+            counts['answers'] += bool(example.get('answerText'))
+            counts['hasAnswer'] += bool(example.get('hasAnswer'))
+    os.makedirs(os.path.join(directory, fragment_dir), exist_ok=True)
+    _atomic_write_text(_fragment_path(directory, filename), json.dumps(rows))
+    entry = {'digest': digest,
+             'ownColumns': own_columns,
+             'columns': columns if own_columns is not None else None,
+             'urls': sorted(url for url in urls if url is not None)}
+    entry.update(counts)
+    return entry
+
+
+def load_manifest(directory):
+    try:
+        with open(os.path.join(directory, manifest_name)) as fp:
+            manifest = json.load(fp)
+    except (OSError, ValueError):
+        manifest = {}
+    if manifest.get('version') != _manifest_version:
+        manifest = {'version': _manifest_version, 'columns': None, 'sources': {}}
+    return manifest
+
+
+def update_manifest(directory):
+    """
+    Brings the manifest and the fragments of directory up to date, reading
+    only the sources that are new or changed since the last update.
+
+    Parameters:
+    1. directory: directory of the scraped jsonl files
+
+    Returns: the manifest dict, with 'columns' of the release, 'sources' mapping
+    each file name to its entry and 'changed' listing the files read this time
+    """
+    old = load_manifest(directory)
+    manifest = {'version': _manifest_version, 'columns': None, 'sources': {}, 'changed': []}
+    columns = None
+    for filename in source_files(directory):
+        digest = file_digest(os.path.join(directory, filename))
+        entry = old['sources'].get(filename)
+        unchanged = entry is not None and entry['digest'] == digest and os.path.exists(
+            _fragment_path(directory, filename))
+        # The first released source with rows decides the columns of the whole release.
+        if columns is None and unchanged and is_released(filename):
+            columns = entry['ownColumns']
+        reproject = is_released(filename) and unchanged and entry['ownColumns'] is not None and (
+            entry['columns'] != columns)
+        if not unchanged or reproject:
+            entry = _read_source(directory, filename, digest, columns if is_released(filename) else None)
+            manifest['changed'].append(filename)
+        if columns is None and is_released(filename):
+            columns = entry['ownColumns']
+        manifest['sources'][filename] = entry
+    manifest['columns'] = columns
+    for filename in set(old['sources']) - set(manifest['sources']):
+        if os.path.exists(_fragment_path(directory, filename)):
+            os.remove(_fragment_path(directory, filename))
+    stored = dict(manifest)
+    del stored['changed']
+    _atomic_write_text(os.path.join(directory, manifest_name), json.dumps(stored, indent=1, sort_keys=True))
+    return manifest
+
+
+def release_counts(manifest):
+    """
+    Returns (number of unique urls, number of questions, number of answers)
+    of the released sources.
+    """
+    urls = set()
+    questions = answers = 0
+    for filename, entry in manifest['sources'].items():
+        if is_released(filename):
+            urls.update(entry['urls'])
+            questions += entry['rows']
+            answers += entry['hasAnswer']
+    return len(urls), questions, answers
+
+
+def write_tsv(directory, manifest, tsv_path):
+    """
+    Writes the released sources to tsv_path from their fragments, one source
+    in memory at a time.
+    """
+    tmp_path = '%s.%d.tmp' % (tsv_path, os.getpid())
+    with open(tmp_path, 'w', newline='') as fp:
+        if manifest['columns'] is not None:
+            csv.writer(fp, delimiter='\t', lineterminator='\n').writerow([''] + manifest['columns'])
+        index = 0
+        for filename in sorted(manifest['sources']):
+            if not is_released(filename):
+                continue
+            with open(_fragment_path(directory, filename)) as fragment:
+                rows = json.load(fragment)
+            for row in rows:
+                fp.write('%d\t%s' % (index, row))
+                index += 1
+    os.replace(tmp_path, tsv_path)
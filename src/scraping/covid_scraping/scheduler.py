@@ -0,0 +1,140 @@
+# Copyright (c) Johns Hopkins University and its affiliates.
+# This source code is licensed under the Apache 2 license found in the
+# LICENSE file in the root directory of this source tree.
+"""
+Scheduler.py
+Runs Scraper.scrape() for many scrapers at once, each in its own process.
+Every child sends the instrument record of its run back to the scheduler.
+"""
+__author__ = "JHU-COVID-QA"
+__copyright__ = "Copyright 2020, Johns Hopkins University"
+__credits__ = ["JHU-COVID-QA"]
+__license__ = "Apache 2.0"
+__version__ = "0.1"
+__maintainer__ = "JHU-COVID-QA"
+__email__ = "covidqa@jhu.edu"
+__status__ = "Development"
+
+import collections
+import multiprocessing
+import multiprocessing.connection
+import sys
+import time
+import traceback
+from covid_scraping import instrument
+
+ScrapeResult = collections.namedtuple('ScrapeResult', ['name', 'success', 'status', 'seconds', 'record'])
+
+
+def _scrape_in_child(scraper, connection):
+    success = False
+    try:
+        record = instrument.run(scraper)
+        success = record['status'] == 'ok'
+        connection.send(record)
+    except BaseException:
+        traceback.print_exc()
+    connection.close()
+    sys.stdout.flush()
+    sys.stderr.flush()
+    sys.exit(0 if success else 1)
+
+
+def run_scrapers(scrapers, max_workers=8, timeout=1800, per_host=1, stop=None):
+    """
+    Runs every scraper's scrape() in a separate process, at most max_workers at
+    a time and at most per_host at a time against any host in scraper.hosts.
+    A scraper still running after its timeout (scraper.timeout if set,
+    otherwise timeout, in seconds; None for no limit) is terminated and counted
+    as a failure.
+
+    Parameters:
+    1. scrapers: list of Scraper instances
+    2. max_workers: maximum number of scrapers running at once
+    3. timeout: default wall-clock limit per scraper in seconds
+    4. per_host: maximum number of running scrapers sharing a host
+    5. stop: a threading.Event, once it is set the running scrapers are
+       terminated and the waiting ones not started, with status 'stopped'
+
+    Returns: list of ScrapeResult, in the same order as scrapers. The record
+    of a scraper that was stopped or crashed only has its status and total time.
+    """
+    # Below 1 nothing could ever start.
+    if max_workers < 1 or per_host < 1:
+        raise ValueError("max_workers and per_host must be at least 1, got %r and %r" % (max_workers, per_host))
+    results = [None] * len(scrapers)
+    pending = collections.deque(range(len(scrapers)))
+    running = {}
+    host_load = collections.Counter()
+
+    def can_start(i):
+        return all(host_load[host] < per_host for host in scrapers[i].hosts)
+
+    def finish(i, success, status):
+        process, start, connection = running.pop(i)
+        for host in scrapers[i].hosts:
+            host_load[host] -= 1
+        seconds = time.time() - start
+        record = None
+        if status not in ('timeout', 'stopped') and connection.poll():
+            record = connection.recv()
+        connection.close()
+        if record is None:
+            record = instrument.empty_record(scrapers[i].__class__.__name__,
+                                             getattr(scrapers[i], '_filename', None), status, seconds)
+        results[i] = ScrapeResult(scrapers[i].__class__.__name__, success, status, seconds, record)
+
+    while pending or running:
+        if stop is not None and stop.is_set():
+            for i, (process, _, _) in list(running.items()):
+                process.terminate()
+                process.join()
+                finish(i, False, 'stopped')
+            for i in pending:
+                record = instrument.empty_record(scrapers[i].__class__.__name__,
+                                                 getattr(scrapers[i], '_filename', None), 'stopped', 0.0)
+                results[i] = ScrapeResult(scrapers[i].__class__.__name__, False, 'stopped', 0.0, record)
+            break
+        for i in list(pending):
+            if len(running) >= max_workers:
+                break
+            if can_start(i):
+                pending.remove(i)
+                receiver, sender = multiprocessing.Pipe(duplex=False)
+                process = multiprocessing.Process(target=_scrape_in_child, args=(scrapers[i], sender))
+                process.start()
+                sender.close()
+                running[i] = (process, time.time(), receiver)
+                for host in scrapers[i].hosts:
+                    host_load[host] += 1
+
+        now = time.time()
+        deadlines = []
+        for i, (process, start, _) in list(running.items()):
+            limit = scrapers[i].timeout if scrapers[i].timeout is not None else timeout
+            if not process.is_alive():
+                process.join()
+                finish(i, process.exitcode == 0, 'ok' if process.exitcode == 0 else 'failed')
+            elif limit is not None and now - start > limit:
+                process.terminate()
+                process.join()
+                finish(i, False, 'timeout')
+            elif limit is not None:
+                deadlines.append(start + limit - now)
+        if running:
+            if stop is not None:
+                # Looks at stop at least once a second.
+                deadlines.append(1.0)
+            wait = min(deadlines) if deadlines else None
+            multiprocessing.connection.wait([process.sentinel for process, _, _ in running.values()], wait)
+    return results
+
+
+def format_report(results):
+    """
+    Returns a table of the per scraper status and wall time, slowest first.
+    """
+    lines = ["%-32s %-8s %9s" % ('scraper', 'status', 'seconds')]
+    for result in sorted(results, key=lambda r: r.seconds, reverse=True):
+        lines.append("%-32s %-8s %9.1f" % (result.name, result.status, result.seconds))
+    return "\n".join(lines)
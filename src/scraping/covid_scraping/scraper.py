@@ -16,6 +16,15 @@ import abc
 class Scraper(metaclass=abc.ABCMeta):  # abc.ABC):
     """Scraper class that scrapes a website for FAQs and stores the output to a file"""
 
+    # Prefix of the files the scraper writes, declaring it registers the scraper with covid_scraping.registry.
+    prefix = None
+    # Hosts the scraper downloads from, used to limit concurrent requests per host.
+    hosts = []
+    # Wall-clock limit in seconds when run by the scheduler, None for the scheduler default.
+    timeout = None
+    # Cost class, one of covid_scraping.registry.cost_classes.
+    cost = 'light'
+
     def __init__(self, *, path, filename):
         self._path = path
         self._filename = filename
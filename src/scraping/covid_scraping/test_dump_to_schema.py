@@ -1,228 +1,308 @@
+import collections
 import json
+import multiprocessing
+import operator
+import re
 import uuid
-import pdb
-
-def check_keys(idx, obj):
-    check_keys_v1(idx, obj)
-
-def check_values(idx, obj):
-    check_values_v1(idx, obj)
-
-def check_keys_v1(idx, obj):
-    assert 'topic' in obj, "'topic' in the %d example is missing" % idx
-    assert 'sourceUrl' in obj, "'source' in the %d example is missing" % idx
-    assert 'sourceName' in obj, "'sourceName' in the %d example is missing" % idx
-    assert 'dateScraped' in obj, "'dateScraped' in the %d example is missing" % idx
-    assert 'lastUpdateTime' in obj, "'lastUpdateTime' in the %d example is missing" % idx
-    assert 'needUpdate' in obj, "'needUpdate' in the %d example is missing" % idx
-    assert 'containsURLs' in obj, "'containsURLs' in the %d example is missing" % idx
-    assert 'typeOfInfo' in obj, "'typeOfInfo' in the %d example is missing" % idx
-    assert 'isAnnotated' in obj, "'isAnnotated' in the %d example is missing" % idx
-    assert 'responseAuthority' in obj, "'responseAuthority' in the %d example is missing" % idx
-    assert 'questionUUID' in obj, "'questionUUID' in the %d example is missing" % idx
-    assert 'answerUUID' in obj, "'answerUUID' in the %d example is missing" % idx
-    assert 'exampleUUID' in obj, "'exampleUUID' in the %d example is missing" % idx
-    assert 'questionText' in obj, "'questionText' in the %d example is missing" % idx
-    assert 'answerText' in obj, "'answerText' in the %d example is missing" % idx
-    assert 'hasAnswer' in obj, "'hasAnswer' in the %d example is missing" % idx
-    assert 'targetEducationLevel' in obj, "'targetEducationLevel' in the %d example is missing" % idx
-    assert 'topic' in obj, "'topic' in the %d example is missing" % idx
-    assert 'extraData' in obj, "'extraData' in the %d example is missing" % idx
-    assert 'sourceDate' in obj, "'sourceDate' in the %d example is missing" % idx
-    return True
 
-def check_keys_v2(idx, obj):
-    assert 'sourceUrl' in obj, "'source' in the %d example is missing" % idx
-    assert 'sourceName' in obj, "'sourceName' in the %d example is missing" % idx
-    assert 'dateScraped' in obj, "'dateScraped' in the %d example is missing" % idx
-    assert 'sourceDate' in obj, "'sourceDate' in the %d example is missing" % idx
-    assert 'lastUpdateTime' in obj, "'lastUpdateTime' in the %d example is missing" % idx
-    assert 'needUpdate' in obj, "'needUpdate' in the %d example is missing" % idx
-    assert 'typeOfInfo' in obj, "'typeOfInfo' in the %d example is missing" % idx
-    assert 'isAnnotated' in obj, "'isAnnotated' in the %d example is missing" % idx
-    assert 'responseAuthority' in obj, "'responseAuthority' in the %d example is missing" % idx
-    assert 'questionUUID' in obj, "'questionUUID' in the %d example is missing" % idx
-    assert 'answerUUID' in obj, "'answerUUID' in the %d example is missing" % idx
-    assert 'ID' in obj, "'exampleUUID' in the %d example is missing" % idx
-    assert 'questionText' in obj, "'questionText' in the %d example is missing" % idx
-    assert 'questionOriginal' in obj, "'questionOriginal' in the %d example is missing" % idx
-    assert 'answerText' in obj, "'answerText' in the %d example is missing" % idx
-    assert 'answerOriginal' in obj, "'answerOriginal' in the %d example is missing" % idx
-    assert 'answerContainsURLs' in obj, "'answerContainsURLs' in the %d example is missing" % idx
-    assert 'answerToks2URL' in obj, "'answerToks2URL' in the %d example is missing" % idx
-    assert 'hasAnswer' in obj, "'hasAnswer' in the %d example is missing" % idx
-    assert 'targetEducationLevel' in obj, "'targetEducationLevel' in the %d example is missing" % idx
-    assert 'targetLocation' in obj, "'targetLocation' in the %d example is missing" % idx
-    assert 'topic' in obj, "'topic' in the %d example is missing" % idx
-    assert 'language' in obj, "'language' in the %d example is missing" % idx
-    assert 'extraData' in obj, "'extraData' in the %d example is missing" % idx
-    return True
+# Marks a field that must be a str holding a UUID.
+UUID = 'uuid'
 
-def check_keys_v3(idx, obj):
-    assert 'sourceUrl' in obj, "'source' in the %d example is missing" % idx
-    assert 'sourceName' in obj, "'sourceName' in the %d example is missing" % idx
-    assert 'needUpdate' in obj, "'needUpdate' in the %d example is missing" % idx
-    assert 'typeOfInfo' in obj, "'typeOfInfo' in the %d example is missing" % idx
-    assert 'isAnnotated' in obj, "'isAnnotated' in the %d example is missing" % idx
-    assert 'responseAuthority' in obj, "'responseAuthority' in the %d example is missing" % idx
-    assert 'questionUUID' in obj, "'questionUUID' in the %d example is missing" % idx
-    assert 'answerUUID' in obj, "'answerUUID' in the %d example is missing" % idx
-    assert 'ID' in obj, "'exampleUUID' in the %d example is missing" % idx
-    assert 'questionText' in obj, "'questionText' in the %d example is missing" % idx
-    assert 'questionOriginal' in obj, "'questionOriginal' in the %d example is missing" % idx
-    assert 'answerText' in obj, "'answerText' in the %d example is missing" % idx
-    assert 'answerOriginal' in obj, "'answerOriginal' in the %d example is missing" % idx
-    assert 'answerContainsURLs' in obj, "'answerContainsURLs' in the %d example is missing" % idx
-    assert 'answerToks2URL' in obj, "'answerToks2URL' in the %d example is missing" % idx
-    assert 'hasAnswer' in obj, "'hasAnswer' in the %d example is missing" % idx
-    assert 'targetEducationLevel' in obj, "'targetEducationLevel' in the %d example is missing" % idx
-    assert 'targetLocation' in obj, "'targetLocation' in the %d example is missing" % idx
-    assert 'topic' in obj, "'topic' in the %d example is missing" % idx
-    assert 'language' in obj, "'language' in the %d example is missing" % idx
-    assert 'extraData' in obj, "'extraData' in the %d example is missing" % idx
-    assert 'dateLastChanged' in obj, "'dateLastChanged' in the %d example is missing" % idx
+'''
+Fields of each schema version as (key, type), type None when the key only
+has to be present.
 
-    return True
+v0.1:
+sourceUrl: Url for the source
+sourceName: name of the source (CDC, JHU, NYtimes, etc)
+dateScraped: POSIX time of what the data was scraped
+sourceDate: POSIX time of when this data was published
+lastUpdateTime (last time the story was updated): POSIX time
+needUpdate (does this need to be updated or is it static information): boolean
+containsURLs (does this contain urls): boolean
+typeOfInfo: QA, Fact, Opinion, etc?
+isAnnotated: boolean
+responseAuthority: str (if it is at JHU to know who the answer came from)
+questionUUID: UUID (stored as a string)
+answerUUID: UUID (stored as a string)
+exampleUUID: UUID (stored as a string)
+questionText: str
+answerText: str
+hasAnswer? boolean
+targetEducationLevel: "Elementary", "HS", "College", "NA"
+topic: str
+extraData (this contains any extra data that you think is useful): dictionary
+'''
+_fields = {
+    'v0.1': [('topic', str),
+             ('sourceUrl', str),
+             ('sourceName', str),
+             ('dateScraped', float),
+             ('lastUpdateTime', None),
+             ('needUpdate', bool),
+             ('containsURLs', bool),
+             ('typeOfInfo', str),
+             ('isAnnotated', bool),
+             ('responseAuthority', str),
+             ('questionUUID', UUID),
+             ('answerUUID', UUID),
+             ('exampleUUID', UUID),
+             ('questionText', str),
+             ('answerText', str),
+             ('hasAnswer', bool),
+             ('targetEducationLevel', str),
+             ('extraData', dict),
+             ('sourceDate', None)],
+    'v0.2': [('sourceUrl', str),
+             ('sourceName', str),
+             ('dateScraped', float),
+             ('sourceDate', None),
+             ('lastUpdateTime', None),
+             ('needUpdate', bool),
+             ('typeOfInfo', str),
+             ('isAnnotated', bool),
+             ('responseAuthority', str),
+             ('questionUUID', UUID),
+             ('answerUUID', UUID),
+             ('ID', str),
+             ('questionText', str),
+             ('questionOriginal', str),
+             ('answerText', str),
+             ('answerOriginal', str),
+             ('answerContainsURLs', bool),
+             ('answerToks2URL', dict),
+             ('hasAnswer', bool),
+             ('targetEducationLevel', str),
+             ('targetLocation', str),
+             ('topic', list),
+             ('language', None),
+             ('extraData', dict)],
+    'v0.3': [('sourceUrl', str),
+             ('sourceName', str),
+             ('needUpdate', bool),
+             ('typeOfInfo', str),
+             ('isAnnotated', bool),
+             ('responseAuthority', str),
+             ('questionUUID', UUID),
+             ('answerUUID', UUID),
+             ('ID', str),
+             ('questionText', str),
+             ('questionOriginal', str),
+             ('answerText', str),
+             ('answerOriginal', str),
+             ('answerContainsURLs', bool),
+             ('answerToks2URL', dict),
+             ('hasAnswer', bool),
+             ('targetEducationLevel', str),
+             ('targetLocation', str),
+             ('topic', list),
+             ('language', None),
+             ('extraData', dict),
+             ('dateLastChanged', float)],
+}
 
+# The schema versions, oldest first.
+versions = sorted(_fields)
 
-def check_values_v1(idx, obj):
-    '''
-    sourceUrl: Url for the source
-    sourceName: name of the source (CDC, JHU, NYtimes, etc)
-    dateScraped: POSIX time of what the data was scraped
-    sourceDate: POSIX time of when this data was published
-    lastUpdateTime (last time the story was updated): POSIX time
-    needUpdate (does this need to be updated or is it static information): boolean
-    containsURLs (does this contain urls): boolean
-    typeOfInfo: QA, Fact, Opinion, etc?
-    isAnnotated: boolean
-    responseAuthority: str (if it is at JHU to know who the answer came from)
-    questionUUID: UUID (stored as a string)
-    answerUUID: UUID (stored as a string)
-    exampleUUID: UUID (stored as a string)
-    questionText: str
-    answerText: str
-    hasAnswer? boolean
-    targetEducationLevel: "Elementary", "HS", "College", "NA"
-    topic: str
-    extraData (this contains any extra data that you think is useful): dictionary
-    '''
-    assert isinstance(obj['topic'], str), "'topic' in the %d example is not a string" % idx
-    assert isinstance(obj['sourceUrl'], str), "'source' in the %d example is not a string" % idx
-    assert isinstance(obj['sourceName'], str), "'sourceName' in the %d example is not a string" % idx
-    assert isinstance(obj['dateScraped'], float), "'dateScraped' in the %d example is not a float" % idx
-    assert isinstance(obj['needUpdate'], bool), "'needUpdate' in the %d example is not a boolean" % idx
-    assert isinstance(obj['containsURLs'], bool), "'containsURLs' in the %d example is not a boolean" % idx
-    assert isinstance(obj['typeOfInfo'], str), "'typeOfInfo' in the %d example is not a string" % idx
-    assert isinstance(obj['isAnnotated'], bool), "'isAnnotated' in the %d example is not a boolean" % idx
-    assert isinstance(obj['responseAuthority'], str), "'responseAuthority' in the %d example is not a string" % idx
-    assert isinstance(obj['questionUUID'], str), "'questionUUID' in the %d example is not a str" % idx
-    assert isinstance(uuid.UUID(obj['questionUUID']), uuid.UUID), "'questionUUID' in the %d example cannot be converted to UUID" % idx
-    assert isinstance(obj['answerUUID'], str), "'answerUUID' in the %d example is not a str" % idx
-    assert isinstance(uuid.UUID(obj['answerUUID']), uuid.UUID), "'answerUUID' in the %d example cannot be converted to UUID" % idx
-    assert isinstance(obj['exampleUUID'], str), "'exampleUUID' in the %d example is not a str" % idx
-    assert isinstance(uuid.UUID(obj['exampleUUID']), uuid.UUID), "'exampleUUID' in the %d example cannot be converted to UUID" % idx
-    assert isinstance(obj['questionText'], str), "'questionText' in the %d example is not a string" % idx
-    assert isinstance(obj['answerText'], str), "'answerText' in the %d example is not a string" % idx
-    assert isinstance(obj['hasAnswer'], bool), "'hasAnswer' in the %d example is not a boolean" % idx
-    assert isinstance(obj['targetEducationLevel'], str), "'targetEducationLevel' in the %d example is not a string" % idx
-    assert isinstance(obj['topic'], str), "'topic' in the %d example is not a string" % idx
-    assert isinstance(obj['extraData'], dict), "'extraData' in the %d example is not a dict" % idx
-    return True
 
-def check_values_v2(idx, obj):
-    assert isinstance(obj['sourceUrl'], str), "'source' in the %d example is not a string" % idx
-    assert isinstance(obj['sourceName'], str), "'sourceName' in the %d example is not a string" % idx
-    assert isinstance(obj['dateScraped'], float), "'dateScraped' in the %d example is not a float" % idx
-    assert isinstance(obj['needUpdate'], bool), "'needUpdate' in the %d example is not a boolean" % idx
-    assert isinstance(obj['typeOfInfo'], str), "'typeOfInfo' in the %d example is not a string" % idx
-    assert isinstance(obj['isAnnotated'], bool), "'isAnnotated' in the %d example is not a boolean" % idx
-    assert isinstance(obj['responseAuthority'], str), "'responseAuthority' in the %d example is not a string" % idx
-    assert isinstance(obj['questionUUID'], str), "'questionUUID' in the %d example is not a str" % idx
-    assert isinstance(uuid.UUID(obj['questionUUID']), uuid.UUID), "'questionUUID' in the %d example cannot be converted to UUID" % idx
-    assert isinstance(obj['answerUUID'], str), "'answerUUID' in the %d example is not a str" % idx
-    assert isinstance(uuid.UUID(obj['answerUUID']), uuid.UUID), "'answerUUID' in the %d example cannot be converted to UUID" % idx
-    assert isinstance(obj['ID'], str), "'ID' in the %d example is not a str" % idx
-    assert obj['ID'].split('|||')[0] == obj['sourceName'], "'ID' in the %d example does not have sourceName as a prefix"
-    assert isinstance(obj['questionOriginal'], str), "'questionOriginal' in the %d example is not a string" % idx
-    assert isinstance(obj['questionText'], str), "'questionText' in the %d example is not a string" % idx
-    assert isinstance(obj['answerOriginal'], str), "'questionOriginal' in the %d example is not a string" % idx
-    assert isinstance(obj['answerText'], str), "'answerText' in the %d example is not a string" % idx
-    assert isinstance(obj['answerContainsURLs'], bool), "'answerContainsURLs' in the %d example is not a boolean" % idx
-    assert isinstance(obj['answerToks2URL'], dict), "'answerToks2URLs' in the %d example is not a dict" % idx
-    assert isinstance(obj['hasAnswer'], bool), "'hasAnswer' in the %d example is not a boolean" % idx
-    assert isinstance(obj['targetEducationLevel'], str), "'targetEducationLevel' in the %d example is not a string" % idx
-    assert isinstance(obj['targetLocation'], str), "'targetLocation' in the %d example is not a string" % idx
-    assert isinstance(obj['topic'], list), "'topic' in the %d example is not a string" % idx
-    assert isinstance(obj['extraData'], dict), "'extraData' in the %d example is not a dict" % idx
-    return True
+def field_types(version):
+    """
+    Returns the fields of schema version as a list of (key, type), type being
+    str, float, bool, dict, list, UUID, or None when the key only has to be present.
+    """
+    if version not in _fields:
+        raise ValueError("field_types received invalid version %s" % version)
+    return list(_fields[version])
+
+
+_type_names = {str: 'string', float: 'float', bool: 'boolean', dict: 'dict', list: 'list', UUID: 'UUID'}
+# The usual spelling of a UUID, anything else is left to uuid.UUID to accept or refuse.
+_uuid_pattern = re.compile(r'[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\Z')
+
 
-def check_values_v3(idx, obj):
-    assert isinstance(obj['sourceUrl'], str), "'source' in the %d example is not a string" % idx
-    assert isinstance(obj['sourceName'], str), "'sourceName' in the %d example is not a string" % idx
-    assert isinstance(obj['needUpdate'], bool), "'needUpdate' in the %d example is not a boolean" % idx
-    assert isinstance(obj['typeOfInfo'], str), "'typeOfInfo' in the %d example is not a string" % idx
-    assert isinstance(obj['isAnnotated'], bool), "'isAnnotated' in the %d example is not a boolean" % idx
-    assert isinstance(obj['responseAuthority'], str), "'responseAuthority' in the %d example is not a string" % idx
-    assert isinstance(obj['questionUUID'], str), "'questionUUID' in the %d example is not a str" % idx
-    assert isinstance(uuid.UUID(obj['questionUUID']), uuid.UUID), "'questionUUID' in the %d example cannot be converted to UUID" % idx
-    assert isinstance(obj['answerUUID'], str), "'answerUUID' in the %d example is not a str" % idx
-    assert isinstance(uuid.UUID(obj['answerUUID']), uuid.UUID), "'answerUUID' in the %d example cannot be converted to UUID" % idx
-    assert isinstance(obj['ID'], str), "'ID' in the %d example is not a str" % idx
-    assert obj['ID'].split('|||')[0] == obj['sourceName'], "'ID' in the %d example does not have sourceName as a prefix"
-    assert isinstance(obj['questionOriginal'], str), "'questionOriginal' in the %d example is not a string" % idx
-    assert isinstance(obj['questionText'], str), "'questionText' in the %d example is not a string" % idx
-    assert isinstance(obj['answerOriginal'], str), "'questionOriginal' in the %d example is not a string" % idx
-    assert isinstance(obj['answerText'], str), "'answerText' in the %d example is not a string" % idx
-    assert isinstance(obj['answerContainsURLs'], bool), "'answerContainsURLs' in the %d example is not a boolean" % idx
-    assert isinstance(obj['answerToks2URL'], dict), "'answerToks2URLs' in the %d example is not a dict" % idx
-    assert isinstance(obj['hasAnswer'], bool), "'hasAnswer' in the %d example is not a boolean" % idx
-    assert isinstance(obj['targetEducationLevel'], str), "'targetEducationLevel' in the %d example is not a string" % idx
-    assert isinstance(obj['targetLocation'], str), "'targetLocation' in the %d example is not a string" % idx
-    assert isinstance(obj['topic'], list), "'topic' in the %d example is not a string" % idx
-    assert isinstance(obj['extraData'], dict), "'extraData' in the %d example is not a dict" % idx
-    assert isinstance(obj['dateLastChanged'], float), "'dateLastChanged' in the %d example is not a float" % idx
+def _is_uuid(value):
+    if _uuid_pattern.match(value):
+        return True
+    try:
+        uuid.UUID(value)
+    except ValueError:
+        return False
     return True
 
 
-def test_schema_v1(path):
-    data = []
-    with open(path) as fp:
-        for idx, line in enumerate(fp):
-            obj = json.loads(line.strip())
-            if not (check_keys_v1(idx, obj) and check_values_v1(idx, obj)):
-                return False
+def _check_id_prefix(obj):
+    if isinstance(obj.get('ID'), str) and obj['ID'].split('|||')[0] != obj.get('sourceName'):
+        return "'ID' does not have sourceName as a prefix"
+    return None
+
+
+def _compile(fields, rules):
+    """
+    Returns a function that checks a record against fields and rules and
+    returns the list of everything wrong with it, empty for a valid record.
+    """
+    keys = frozenset(key for key, _ in fields)
+    typed = [(key, kind, _type_names[kind]) for key, kind in fields if kind is not None]
+    # A valid record passes with one lookup of all the typed fields and a single isinstance map.
+    get_typed = operator.itemgetter(*[key for key, _, _ in typed])
+    kinds = tuple(str if kind is UUID else kind for _, kind, _ in typed)
+    uuid_keys = [key for key, kind, _ in typed if kind is UUID]
+
+    def errors_of(obj):
+        errors = ["'%s' is missing" % key for key, _ in fields if key not in obj]
+        for key, kind, name in typed:
+            if key not in obj:
+                continue
+            value = obj[key]
+            if kind is UUID:
+                if not isinstance(value, str):
+                    errors.append("'%s' is not a str" % key)
+                elif not _is_uuid(value):
+                    errors.append("'%s' cannot be converted to UUID" % key)
+            elif not isinstance(value, kind):
+                errors.append("'%s' is not a %s" % (key, name))
+        return errors
+
+    def validate(obj):
+        if keys.issubset(obj.keys()) and all(map(isinstance, get_typed(obj), kinds)) and all(
+                _is_uuid(obj[key]) for key in uuid_keys):
+            errors = []
+        else:
+            errors = errors_of(obj)
+        for rule in rules:
+            error = rule(obj)
+            if error:
+                errors.append(error)
+        return errors
+    return validate
+
+
+_validators = {'v0.1': _compile(_fields['v0.1'], []),
+               'v0.2': _compile(_fields['v0.2'], [_check_id_prefix]),
+               'v0.3': _compile(_fields['v0.3'], [_check_id_prefix])}
+
+
+def validate_example(obj, version):
+    """
+    Returns the list of problems of a JSON type QA object under schema
+    version, empty when it is valid.
+    """
+    if version not in _validators:
+        raise ValueError("validate_example received invalid version %s" % version)
+    if not isinstance(obj, dict):
+        return ["example is not a JSON object"]
+    return _validators[version](obj)
+
+
+def check_example(idx, obj, version):
+    """
+    Raises AssertionError listing every problem of the idx-th example.
+    """
+    errors = validate_example(obj, version)
+    assert not errors, "the %d example: %s" % (idx, "; ".join(errors))
     return True
 
 
-def test_schema_v2(path):
-    data = []
+def validate_file(path, version):
+    """
+    Checks every line of a JSONL file against schema version.
+
+    Parameters:
+    1. path: the JSONL file
+    2. version: schema version, e.g. 'v0.3'
+
+    Returns: list of (line index, list of problems) for each invalid line, empty when the file is valid
+    """
+    if version not in _validators:
+        raise ValueError("validate_file received invalid version %s" % version)
+    validate = _validators[version]
+    failures = []
     with open(path) as fp:
         for idx, line in enumerate(fp):
-            obj = json.loads(line.strip())
-            if not (check_keys_v2(idx, obj) and check_values_v2(idx, obj)):
-                return False
-    return True
+            try:
+                obj = json.loads(line)
+            except ValueError as e:
+                failures.append((idx, ["line is not valid JSON: %s" % e]))
+                continue
+            errors = validate(obj) if isinstance(obj, dict) else ["example is not a JSON object"]
+            if errors:
+                failures.append((idx, errors))
+    return failures
 
-def test_schema_v3(path):
-    data = []
+
+def _scan_file(args):
+    path, version = args
+    validate = _validators[version]
+    failures = []
+    keys = []
+    examples = 0
     with open(path) as fp:
         for idx, line in enumerate(fp):
-            obj = json.loads(line.strip())
-            if not (check_keys_v3(idx, obj) and check_values_v3(idx, obj)):
-                return False
-    return True
+            examples += 1
+            try:
+                obj = json.loads(line)
+            except ValueError as e:
+                failures.append((idx, ["line is not valid JSON: %s" % e]))
+                continue
+            if not isinstance(obj, dict):
+                failures.append((idx, ["example is not a JSON object"]))
+                continue
+            errors = validate(obj)
+            if errors:
+                failures.append((idx, errors))
+            keys.append((idx, obj.get('ID'), obj.get('questionUUID')))
+    return path, examples, failures, keys
+
+
+def validate_corpus(paths, version, workers=None):
+    """
+    Checks many JSONL files at once, each in a pool process, and then checks
+    that no ID or questionUUID appears twice anywhere in them.
+
+    Parameters:
+    1. paths: the JSONL files
+    2. version: schema version, e.g. 'v0.3'
+    3. workers: number of processes, None for one per core
+
+    Returns: summary dict with 'valid', the 'examples' count, the per file
+    'files' with their 'examples' and invalid lines, and 'duplicateIDs' and
+    'duplicateQuestionUUIDs' mapping each repeated value to its 'path:line' places
+    """
+    if version not in _validators:
+        raise ValueError("validate_corpus received invalid version %s" % version)
+    paths = sorted(paths)
+    with multiprocessing.Pool(workers) as pool:
+        scanned = pool.map(_scan_file, [(path, version) for path in paths], chunksize=1)
+    files = {}
+    places = {'ID': collections.defaultdict(list), 'questionUUID': collections.defaultdict(list)}
+    for path, examples, failures, keys in scanned:
+        files[path] = {'examples': examples,
+                       'failures': [{'line': idx, 'errors': errors} for idx, errors in failures]}
+        for idx, example_id, question_uuid in keys:
+            place = '%s:%d' % (path, idx)
+            if example_id is not None:
+                places['ID'][example_id].append(place)
+            if question_uuid is not None:
+                places['questionUUID'][question_uuid].append(place)
+    duplicates = {key: {value: where for value, where in values.items() if len(where) > 1}
+                  for key, values in places.items()}
+    return {'version': version,
+            'valid': not duplicates['ID'] and not duplicates['questionUUID'] and not any(
+                f['failures'] for f in files.values()),
+            'examples': sum(f['examples'] for f in files.values()),
+            'files': files,
+            'duplicateIDs': duplicates['ID'],
+            'duplicateQuestionUUIDs': duplicates['questionUUID']}
+
 
 def test_jsonlines(path, version='v0.1'):
-    if 'v0.1' == version:
-        return test_schema_v1(path)
-    elif 'v0.2' == version:
-        return test_schema_v2(path)
-    elif 'v0.3' == version:
-        return test_schema_v3(path)
-    else:
+    if version not in _validators:
         print("test_jsonlines received invalid version")
         return False
+    failures = validate_file(path, version)
+    assert not failures, "\n".join(
+        "the %d example: %s" % (idx, "; ".join(errors)) for idx, errors in failures)
+    return True
 
 
 if __name__ == '__main__':
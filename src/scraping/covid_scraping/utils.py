@@ -3,7 +3,7 @@
 # LICENSE file in the root directory of this source tree.
 """
 Utils.py
-_remove_links, _clean_element, _tokenize_element borrowed directly from Darius Irani's cleaning script.
+_clean_element borrowed directly from Darius Irani's cleaning script.
 """
 __author__ = "Milind Agarwal, Adam Poliak"
 __copyright__ = "Copyright 2020, Johns Hopkins University"
@@ -14,52 +14,170 @@ __maintainer__ = "JHU-COVID-QA"
 __email__ = "covidqa@jhu.edu"
 __status__ = "Development"
 
-import jsonlines
 import json
-from bs4 import BeautifulSoup
-from spacy.tokenizer import Tokenizer
-from spacy.lang.en import English
-from spacy.matcher import PhraseMatcher
-from fuzzywuzzy import fuzz
+import hashlib
+import multiprocessing
+import unicodedata
+from lxml import etree
+from covid_scraping import instrument
+from covid_scraping.test_dump_to_schema import check_example
 import os
 import time
 import uuid
 import warnings
-import pandas as pd
 
 fuzz_threshold_ques = 80
 fuzz_threshold_ans = 80
 
+# Number of hash buckets used by _FuzzyIndex for characters and character bigrams.
+_index_char_buckets = 256
+_index_bigram_buckets = 1024
+
 
 # CLEANING
-def _remove_links(str, tokens):
-    nlp = English()
-    soup = BeautifulSoup(str, 'lxml')
-    matcher = PhraseMatcher(tokens.vocab)
-    link_dict = {}
-    if soup.find('a'):
-        for link in soup.find_all('a'):
-            matcher = PhraseMatcher(tokens.vocab)
-            matcher.add('HYPERLINK', None, *[nlp.make_doc(link.text)])
-            matches = matcher(str)
-            for _, start, end in matches:
-                link_dict[str((start, end))] = link.get('href')
-    return link_dict
+# spaCy, BeautifulSoup, fuzzywuzzy, numpy and pandas are imported where they are
+# used, so importing covid_scraping stays cheap for code that never cleans or merges.
+# Built on first use by _spacy_nlp(), spaCy is slow to set up.
+_nlp = None
+# Built on first use by _bs4_tag_sets(): get_text() leaves out the strings BeautifulSoup
+# files under the first tags (script, style, ...) and keeps whitespace as is inside
+# the second ones (pre, textarea).
+_tag_sets = None
+_ascii_spaces = '\x20\x0a\x09\x0c\x0d'
+# clean_texts cleans fewer strings than this in the calling process, starting a pool would take longer.
+_parallel_min_strings = 256
 
 
-def _clean_element(str):
-    return BeautifulSoup(str, 'lxml').get_text().strip()
+def _spacy_nlp():
+    global _nlp
+    if _nlp is None:
+        from spacy.lang.en import English
+        _nlp = English()
+    return _nlp
+
+
+def _bs4_tag_sets():
+    global _tag_sets
+    if _tag_sets is None:
+        from bs4.builder import HTMLTreeBuilder
+        _tag_sets = (frozenset(getattr(HTMLTreeBuilder, 'DEFAULT_STRING_CONTAINERS', {})),
+                     frozenset(HTMLTreeBuilder.DEFAULT_PRESERVE_WHITESPACE_TAGS))
+    return _tag_sets
+
+
+class _TextTarget(object):
+    """
+    lxml parser target that collects the text BeautifulSoup's get_text()
+    returns for the same markup, and the character span of every <a> in it.
+    """
+
+    def __init__(self):
+        self.parts = []
+        self.length = 0
+        self.links = []
+        self._data = []
+        self._open_links = []
+        self._non_text = 0
+        self._preserve = 0
+        self._non_text_tags, self._preserve_whitespace_tags = _bs4_tag_sets()
+
+    def _end_data(self):
+        # BeautifulSoup turns a string of only whitespace into a single space or newline.
+        if not self._data:
+            return
+        data = ''.join(self._data)
+        self._data = []
+        if not self._preserve and not data.strip(_ascii_spaces):
+            data = '\n' if '\n' in data else ' '
+        if not self._non_text:
+            self.parts.append(data)
+            self.length += len(data)
+
+    def start(self, tag, attrib):
+        self._end_data()
+        if tag in self._non_text_tags:
+            self._non_text += 1
+        if tag in self._preserve_whitespace_tags:
+            self._preserve += 1
+        if tag == 'a':
+            self._open_links.append((self.length, attrib.get('href')))
+
+    def end(self, tag):
+        self._end_data()
+        if tag in self._non_text_tags:
+            self._non_text -= 1
+        if tag in self._preserve_whitespace_tags:
+            self._preserve -= 1
+        if tag == 'a' and self._open_links:
+            start, href = self._open_links.pop()
+            self.links.append((start, self.length, href))
+
+    def data(self, data):
+        self._data.append(data)
+
+    def comment(self, text):
+        self._end_data()
 
+    def pi(self, target, data):
+        self._end_data()
 
-def _tokenize_element(str):
+    def doctype(self, *args):
+        self._end_data()
+
+    def close(self):
+        self._end_data()
+        return ''.join(self.parts)
+
+
+# Example call: text, links = html_to_text(example['answer'])
+def html_to_text(string):
     """
-    Opting to create tokenizer that includes English punctuation rules and exceptions.
-    If tokenizer with just English vocab desired, use:
-    tokenizer = Tokenizer(nlp.vocab)
+    Converts a html str to the same clean text as _clean_element, in a single
+    pass over the markup that also records where each hyperlink ends up.
+
+    Parameters:
+    1. string: html str
+
+    Returns: the stripped text and a list of (start, end, href) character spans of the links in it, in document order
     """
-    nlp = English()
-    tokenizer = nlp.Defaults.create_tokenizer(nlp)
-    return tokenizer(str)
+    if string.startswith('\ufeff'):
+        string = string[1:]
+    target = _TextTarget()
+    parser = etree.HTMLParser(target=target, recover=True)
+    try:
+        parser.feed(string)
+        text = parser.close()
+    except (ValueError, etree.LxmlError):
+        # Markup lxml refuses as a str, BeautifulSoup retries it as bytes.
+        return _clean_element(string), []
+    stripped = text.lstrip()
+    offset = len(text) - len(stripped)
+    stripped = stripped.rstrip()
+    links = []
+    for start, end, href in sorted(target.links, key=lambda link: link[0]):
+        start = min(max(start - offset, 0), len(stripped))
+        end = min(max(end - offset, 0), len(stripped))
+        links.append((start, end, href))
+    return stripped, links
+
+
+def _link_token_spans(tokens, links):
+    """
+    Returns a dict of the '(start, end)' token span of every link with text
+    in tokens to the link's href.
+    """
+    link_dict = {}
+    for start, end, href in links:
+        covered = [token.i for token in tokens
+                   if token.idx < end and token.idx + len(token.text) > start]
+        if covered:
+            link_dict[str((covered[0], covered[-1] + 1))] = href
+    return link_dict
+
+
+def _clean_element(str):
+    from bs4 import BeautifulSoup
+    return BeautifulSoup(str, 'lxml').get_text().strip()
 
 def _remove_duplicates(data):
     """
@@ -69,6 +187,7 @@ def _remove_duplicates(data):
 
     Returns: list of dictionaries where the examples with the same id are removed and only the latest is kept.
     """
+    import pandas as pd
     df = pd.DataFrame(data)
     df.sort_values("dateLastChanged", inplace = True)
     df.drop_duplicates(subset='ID', keep='last', inplace=True)
@@ -81,19 +200,349 @@ def clean_text(string, tokenize=False):
     """
     Cleans a html str and returns clean str and tokenized links.
     """
-    string = _clean_element(string)
+    return clean_texts([string], tokenize)[0]
+
+
+def _warm_cleaner(tokenize):
+    # Runs once in each pool process, so no chunk pays for building spaCy.
     if tokenize:
-        tokens = _tokenize_element(string)
-        link_dict = _remove_links(string, tokens)
-        return ' '.join(token.text for token in tokens), link_dict
+        _spacy_nlp()
+
+
+def _clean_chunk(args):
+    strings, tokenize = args
+    return clean_texts(strings, tokenize)
+
+
+# Example call: clean_texts([example['answer'] for example in examples])
+def clean_texts(strings, tokenize=False, workers=1):
+    """
+    Cleans many html strs at once, tokenizing them in one batch.
+
+    Parameters:
+    1. strings: iterable of html str
+    2. tokenize: True to return the texts as space separated tokens with the token spans of their links
+    3. workers: number of processes to clean in, batches smaller than _parallel_min_strings are always cleaned here
+
+    Returns: list of (clean str, link dict) in the same order as strings, as clean_text returns them
+    """
+    strings = list(strings)
+    if workers > 1 and len(strings) >= _parallel_min_strings:
+        size = -(-len(strings) // (workers * 4))
+        chunks = [(strings[i:i + size], tokenize) for i in range(0, len(strings), size)]
+        with multiprocessing.Pool(workers, initializer=_warm_cleaner, initargs=(tokenize,)) as pool:
+            return [cleaned for chunk in pool.map(_clean_chunk, chunks) for cleaned in chunk]
+    converted = [html_to_text(string) for string in strings]
+    if not tokenize:
+        return [(text, {}) for text, _ in converted]
+    cleaned = []
+    texts = [text for text, _ in converted]
+    for (text, links), tokens in zip(converted, _spacy_nlp().pipe(texts)):
+        link_dict = _link_token_spans(tokens, links)
+        cleaned.append((' '.join(token.text for token in tokens), link_dict))
+    return cleaned
+
+
+def _char_codes(text):
+    import numpy as np
+    return np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32).astype(np.int64)
+
+
+def _char_buckets(codes):
+    return codes % _index_char_buckets
+
+
+def _bigram_buckets(codes):
+    return (codes[:-1] * 31 + codes[1:]) % _index_bigram_buckets
+
+
+class _FuzzyIndex():
+    """
+    Candidate-blocking index over the gold questions used by merge.
+
+    fuzz.partial_ratio aligns the shorter string against windows of the longer
+    one, so a score can only be high when the two strings share enough
+    characters and adjacent character pairs. Those shared counts are computed
+    against every gold question at once from hashed count tables and turned
+    into an upper bound on each partial_ratio score. Questions are then scored
+    best bound first, and scoring stops as soon as no remaining question can
+    beat the best match. The bounds are never below the real score, so the
+    result is the same as scoring every gold question.
+    """
+
+    def __init__(self, texts, threshold):
+        import numpy as np
+        self._texts = texts
+        self._threshold = threshold
+        self._lengths = np.array([len(text) for text in texts], dtype=np.int64)
+        self._chars = np.zeros((_index_char_buckets, len(texts)), dtype=np.int32)
+        self._bigrams = np.zeros((_index_bigram_buckets, len(texts)), dtype=np.int32)
+        for col, text in enumerate(texts):
+            codes = _char_codes(text)
+            np.add.at(self._chars[:, col], _char_buckets(codes), 1)
+            np.add.at(self._bigrams[:, col], _bigram_buckets(codes), 1)
+
+    @staticmethod
+    def _overlap(table, buckets, minlength):
+        import numpy as np
+        counts = np.bincount(buckets, minlength=minlength)
+        rows = np.flatnonzero(counts)
+        return np.minimum(table[rows], counts[rows][:, None]).sum(axis=0)
+
+    def upper_bounds(self, text):
+        """
+        Returns an upper bound on fuzz.partial_ratio(text, gold) for every gold question.
+        """
+        import numpy as np
+        codes = _char_codes(text)
+        n = np.minimum(self._lengths, len(text))
+        shared_chars = self._overlap(self._chars, _char_buckets(codes), _index_char_buckets)
+        shared_bigrams = self._overlap(self._bigrams, _bigram_buckets(codes), _index_bigram_buckets)
+        # partial_ratio scores windows of m <= n characters as 2 * LCS / (n + m).
+        # The LCS can use at most the shared characters, and every gap in it
+        # breaks a bigram, so at least 3 * LCS - n - m - 1 bigrams are shared.
+        # The bound is largest at the window length m where these limits meet.
+        m = np.minimum(np.minimum(n, shared_chars), (shared_bigrams + n + 1) / 2)
+        lcs = np.minimum(np.minimum(m, shared_chars), (shared_bigrams + n + m + 1) / 3)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = np.where(n + m > 0, 2 * lcs / (n + m), 1.0)
+        return np.rint(100 * ratio + 1e-6).astype(np.int64)
+
+    def best_match(self, text):
+        """
+        Returns (index, score) of the first highest scoring gold question, or
+        None when no gold question reaches the threshold.
+        """
+        import numpy as np
+        from fuzzywuzzy import fuzz
+        bounds = self.upper_bounds(text)
+        candidates = np.flatnonzero(bounds >= self._threshold)
+        # Highest bound first, ties in gold order so the first best match wins.
+        candidates = candidates[np.lexsort((candidates, -bounds[candidates]))]
+        best, best_score = None, self._threshold - 1
+        for i in candidates:
+            if bounds[i] < best_score or (bounds[i] == best_score and best is not None and i > best):
+                break
+            score = fuzz.partial_ratio(text, self._texts[i])
+            instrument.count('comparisons')
+            if score > best_score or (score == best_score and best is not None and i < best):
+                best, best_score = int(i), score
+        if best is None:
+            return None
+        return best, best_score
+
+
+def _normalize_question(text):
+    return ' '.join(unicodedata.normalize('NFC', text).split())
+
+
+def _question_key(text):
+    return hashlib.blake2b(_normalize_question(text).encode('utf-8'), digest_size=16).hexdigest()
+
+
+def example_id(source_name, question):
+    """
+    Returns the ID of an example, the source name and a truncated BLAKE2 digest
+    of the normalized question joined by '|||'. Unlike hash() the digest is the
+    same in every run.
+    """
+    digest = hashlib.blake2b(_normalize_question(question).encode('utf-8'), digest_size=8).hexdigest()
+    return source_name + '|||' + digest
+
+
+def _merge_index_path(gold_jsonl_path):
+    """
+    The sidecar for <prefix>_v0.3.jsonl is <prefix>_v0.3.index.json in the same directory.
+    """
+    return os.path.splitext(gold_jsonl_path)[0] + '.index.json'
+
+
+def _line_offsets(data):
+    offsets = []
+    start = 0
+    while start < len(data):
+        end = data.find(b'\n', start)
+        if end == -1:
+            end = len(data)
+        if data[start:end].strip():
+            offsets.append(start)
+        start = end + 1
+    return offsets
+
+
+class _LazyRows():
+    """
+    The rows of a gold JSONL file, each parsed from the raw bytes the first time it is used.
+    Rows appended after loading are kept as they are.
+    """
+
+    def __init__(self, data, offsets):
+        self._data = data
+        self._offsets = offsets
+        self._rows = [None] * len(offsets)
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __getitem__(self, i):
+        if self._rows[i] is None:
+            start = self._offsets[i]
+            end = self._data.find(b'\n', start)
+            self._rows[i] = json.loads(self._data[start:end if end != -1 else len(self._data)])
+        return self._rows[i]
+
+    def append(self, row):
+        self._rows.append(row)
+
+
+def _merge_index(digest, offsets, rows):
+    questions = {}
+    for i in range(len(rows)):
+        questions.setdefault(_question_key(rows[i]['questionText']), i)
+    return {'digest': digest,
+            'offsets': offsets,
+            'questions': questions}
+
+
+def _build_merge_index(data, rows):
+    return _merge_index(hashlib.blake2b(data).hexdigest(), _line_offsets(data), rows)
+
+
+def _load_merge_index(gold_jsonl_path, data):
+    """
+    Returns the sidecar index for the gold file contents in data, rebuilding it
+    from data when the sidecar is missing or was written for other contents.
+    """
+    try:
+        with open(_merge_index_path(gold_jsonl_path)) as fp:
+            index = json.load(fp)
+        if index.get('digest') == hashlib.blake2b(data).hexdigest():
+            return index
+    except (OSError, ValueError):
+        pass
+    return _build_merge_index(data, _LazyRows(data, _line_offsets(data)))
+
+
+def write_merge_index(gold_jsonl_path, gold_data, fingerprint=None, written=None):
+    """
+    Writes the merge index sidecar for a gold JSONL file that was just written
+    from gold_data, so the next merge can skip parsing and hashing the file.
+
+    Parameters:
+    1. gold_jsonl_path: path to the gold JSONL file
+    2. gold_data: the list of JSON type QA objects written to the file, in order
+    3. fingerprint: examples_fingerprint of the scraped examples the file was written from
+    4. written: the (digest, offsets) write_jsonlines returned for the file, saves reading it again
+    """
+    if written is None:
+        with open(gold_jsonl_path, 'rb') as fp:
+            index = _build_merge_index(fp.read(), gold_data)
     else:
-        return string, {}
+        index = _merge_index(written[0], written[1], gold_data)
+    if len(index['offsets']) != len(gold_data):
+        raise ValueError("%s does not contain the %d given examples" % (gold_jsonl_path, len(gold_data)))
+    if fingerprint is not None:
+        index['examples'] = fingerprint
+    with open(_merge_index_path(gold_jsonl_path), 'w') as fp:
+        json.dump(index, fp)
+
+
+class _HashingFile():
+    """
+    Binary file wrapper that hashes everything written through it and keeps
+    count of the bytes written.
+    """
+
+    def __init__(self, fp):
+        self._fp = fp
+        self.digest = hashlib.blake2b()
+        self.position = 0
+
+    def write(self, data):
+        if not isinstance(data, bytes):
+            raise TypeError("_HashingFile only writes bytes")
+        self._fp.write(data)
+        self.digest.update(data)
+        self.position += len(data)
+        return len(data)
+
+
+def write_jsonlines(path, examples, version):
+    """
+    Writes examples to a JSONL file, checking each one against the schema
+    version before it is written. The lines go to a temporary file next to
+    path, which replaces path only once every example is written and synced
+    to disk. An invalid example or a crash leaves the old file as it was.
+
+    Parameters:
+    1. path: the JSONL file to write
+    2. examples: iterable of JSON type QA objects
+    3. version: schema version the examples are checked against, e.g. 'v0.3'
+
+    Returns: (digest, offsets) of the new file contents, to pass on to write_merge_index
+    """
+    import jsonlines
+    tmp_path = '%s.%d.tmp' % (path, os.getpid())
+    offsets = []
+    try:
+        # os.open rather than mkstemp, so the file gets the usual permissions.
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+        with os.fdopen(fd, 'wb') as fp:
+            out = _HashingFile(fp)
+            writer = jsonlines.Writer(out)
+            for idx, example in enumerate(examples):
+                check_example(idx, example, version)
+                offsets.append(out.position)
+                writer.write(example)
+            fp.flush()
+            os.fsync(fp.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    directory = os.open(os.path.dirname(path) or '.', os.O_RDONLY)
+    try:
+        os.fsync(directory)
+    finally:
+        os.close(directory)
+    return out.digest.hexdigest(), offsets
+
+
+def examples_fingerprint(examples, version):
+    """
+    Returns a digest of a scraper's examples as a whole, in order. version
+    should change whenever the same examples would be converted differently.
+    """
+    digest = hashlib.blake2b(str(version).encode('utf-8'))
+    for example in examples:
+        digest.update(json.dumps(example, sort_keys=True, default=str).encode('utf-8'))
+        digest.update(b'\n')
+    return digest.hexdigest()
+
+
+def is_unchanged(gold_jsonl_path, fingerprint):
+    """
+    Returns True when the sidecar records that the gold JSONL file, as it is
+    now on disk, was written from examples with this fingerprint.
+    """
+    try:
+        with open(_merge_index_path(gold_jsonl_path)) as fp:
+            index = json.load(fp)
+        if index.get('examples') != fingerprint:
+            return False
+        with open(gold_jsonl_path, 'rb') as fp:
+            return index.get('digest') == hashlib.blake2b(fp.read()).hexdigest()
+    except (OSError, ValueError):
+        return False
+
 
-# MERGING
 # Example call: merge('../../../data/scraping/schema_v0.2/AVMA_v0.2.jsonl', listVar )
 def merge(gold_jsonl_path, list_of_qa_objects):
     """
     Uses fuzzy matching on the questions and answers from a list of QA objects to merge with an existing JSONL file.
+    Questions whose normalized text is already in the gold file are matched
+    through the merge index sidecar without any fuzzy scoring.
 
     Parameters:
     1. gold_jsonl_path: path to the gold JSONL file
@@ -102,25 +551,44 @@ def merge(gold_jsonl_path, list_of_qa_objects):
     Returns:
     goldData: modified list of JSON type QA objects after merge
     """
-    goldData = []
-    goldQues = []
-    mergeTime = time.time()
-    seenThisScrape = []
     try:
-        with jsonlines.open(gold_jsonl_path) as q:
-            for line in q.iter():
-                goldData.append(line)
-                goldQues.append(line['questionText'])
-    except:
+        with open(gold_jsonl_path, 'rb') as fp:
+            data = fp.read()
+    except OSError:
+        data = b''
         warnings.warn("File not found when for merging " + str(list_of_qa_objects[0]['sourceName'])+ ". This should only happen on the first time the scraper is run", UserWarning ,stacklevel=4)
+    index = _load_merge_index(gold_jsonl_path, data)
+    return _merge_rows(_LazyRows(data, index['offsets']), index['questions'], list_of_qa_objects)
+
+
+def _merge_rows(goldData, questions, list_of_qa_objects):
+    """
+    The merge itself, over gold rows from any storage.
+
+    Parameters:
+    1. goldData: the gold rows, supporting len, indexing and append
+    2. questions: dict from the _question_key of a gold question to the index of its first row
+    3. list_of_qa_objects: a list of JSON type QA objects produced after rescraping and cleaning.
+
+    Returns: modified list of JSON type QA objects after merge
+    """
+    from fuzzywuzzy import fuzz
+    mergeTime = time.time()
+    seenThisScrape = []
+    numGold = len(goldData)
+    goldIndex = None
     for entry in list_of_qa_objects:
         ques = entry['questionText']
         ans = entry['answerText']
-        def fuzzy_PR_ques(x): return fuzz.partial_ratio(ques, x)
-
-        goldQuesScores = list(map(fuzzy_PR_ques, goldQues))
-        found = (sum(i >= fuzz_threshold_ques for i in goldQuesScores) > 0)
-        if not found:
+        exact = questions.get(_question_key(ques))
+        if exact is not None:
+            match = (exact, 100)
+        else:
+            if goldIndex is None:
+                goldQues = [goldData[i]['questionText'] for i in range(numGold)]
+                goldIndex = _FuzzyIndex(goldQues, fuzz_threshold_ques)
+            match = goldIndex.best_match(ques)
+        if match is None:
             # print('Not found. Adding this json object to the gold data')
             goldData.append(entry)
             # When an new entry is found it needs to be assigned question/answer/example UUIDs
@@ -131,10 +599,11 @@ def merge(gold_jsonl_path, list_of_qa_objects):
 
 
         else:
-            maxix = goldQuesScores.index(max(goldQuesScores))
+            maxix, _ = match
             seenThisScrape.append(maxix)
             goldA = goldData[maxix]['answerText']
             ansScore = fuzz.partial_ratio(ans, goldA)
+            instrument.count('comparisons')
             # check if the new answer matches the existing answer for
             # that question:
             if ansScore <= fuzz_threshold_ans:
@@ -161,6 +630,7 @@ def remove_unanswered_examples(input_f, output_f):
     2. output_f: new jsonl file with just questions
     These files must be different
     """
+    import jsonlines
     if input_f == output_f:
         raise Exception("The input and output files are the same, they need to be different")
     output_data = []
@@ -0,0 +1,52 @@
+# Copyright (c) Johns Hopkins University and its affiliates.
+# This source code is licensed under the Apache 2 license found in the
+# LICENSE file in the root directory of this source tree.
+"""
+Moves gold data between the SQLite gold store and the schema_v0.3 JSONL
+files. 'import' loads every JSONL file of the directory into the store,
+'export' writes the JSONL files of every source in the store for release.
+"""
+__author__ = "JHU-COVID-QA"
+__copyright__ = "Copyright 2020, Johns Hopkins University"
+__credits__ = ["JHU-COVID-QA"]
+__license__ = "Apache 2.0"
+__version__ = "0.1"
+__maintainer__ = "JHU-COVID-QA"
+__email__ = "covidqa@jhu.edu"
+__status__ = "Development"
+
+import argparse
+import os
+from covid_scraping.gold_store import GoldStore
+
+
+def get_args():
+    parser = argparse.ArgumentParser(
+        description='Import the JSONL gold files into the gold store or export them from it')
+    parser.add_argument('action', choices=['import', 'export'])
+    parser.add_argument('--store', type=str, required=True,
+                        help='Path to the SQLite gold store')
+    parser.add_argument('--path', type=str, default="../../data/scraping/schema_v0.3/",
+                        help='Directory holding the JSONL files')
+    args = parser.parse_args()
+    return args
+
+
+def main():
+    args = get_args()
+    store = GoldStore(args.store)
+    suffix = '_v0.3.jsonl'
+    if args.action == 'import':
+        for filename in sorted(os.listdir(args.path)):
+            if filename.endswith(suffix):
+                counts = store.import_file(filename[:-len(suffix)], os.path.join(args.path, filename))
+                print("%s: %d rows written, %d deleted, %d unchanged" % (
+                    filename, counts['written'], counts['deleted'], counts['unchanged']))
+    else:
+        for path in store.export(args.path):
+            print("Wrote " + path)
+    store.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -12,14 +12,31 @@ __status__ = "Development"
 
 import sys
 import json
+from covid_scraping import instrument
 
 def main():
-    text = ""
-    with open(sys.argv[1]) as fp:
-        text = fp.read()
+    """
+    Usage: log_to_json.py log_file [metrics.json ...]
+    Writes tmp.json for the slack bot. With metrics files from scrape_all.py
+    and deepsetAI_scraper.py it carries their combined aggregate and a
+    summary of it, otherwise the raw log text.
+    """
+    records = []
+    for metrics_path in sys.argv[2:]:
+        try:
+            with open(metrics_path) as fp:
+                records.extend(json.load(fp)['records'])
+        except (OSError, ValueError, KeyError):
+            print("Could not read metrics from " + metrics_path, file=sys.stderr)
 
     contents = {}
-    contents['text'] = text
+    if records:
+        summary = instrument.aggregate(records)
+        contents['text'] = instrument.format_summary(summary)
+        contents['metrics'] = summary
+    else:
+        with open(sys.argv[1]) as fp:
+            contents['text'] = fp.read()
     with open('tmp.json', 'w+') as fp:
         json.dump(contents, fp)
 
@@ -0,0 +1,85 @@
+# Copyright (c) Johns Hopkins University and its affiliates.
+# This source code is licensed under the Apache 2 license found in the
+# LICENSE file in the root directory of this source tree.
+"""
+One-shot migration from the per-process hash() example IDs to the stable
+digest IDs from covid_scraping.utils.example_id. Every v0.2 and v0.3 JSONL
+file under --path is rewritten with the new IDs, and the blocked ID list is
+re-keyed with the same mapping.
+"""
+__author__ = "JHU-COVID-QA"
+__copyright__ = "Copyright 2020, Johns Hopkins University"
+__credits__ = ["JHU-COVID-QA"]
+__license__ = "Apache 2.0"
+__version__ = "0.1"
+__maintainer__ = "JHU-COVID-QA"
+__email__ = "covidqa@jhu.edu"
+__status__ = "Development"
+
+import argparse
+import os
+import jsonlines
+from covid_scraping import utils
+
+
+def get_args():
+    parser = argparse.ArgumentParser(
+        description='Re-key example IDs in the scraped data with stable digests')
+    parser.add_argument('--path', type=str, default="../../data/scraping/",
+                        help='Path to the data/scraping directory')
+    parser.add_argument('--blocked', type=str, default="blocked_QA_IDs.tsv",
+                        help='Blocked ID list, relative to --path')
+    args = parser.parse_args()
+    return args
+
+
+def migrate_file(path, id_map):
+    """
+    Rewrites the IDs in one JSONL file and records old ID -> new ID in id_map.
+    Returns the number of rows whose ID changed.
+    """
+    with jsonlines.open(path) as reader:
+        rows = list(reader.iter())
+    changed = 0
+    for row in rows:
+        new_id = utils.example_id(row['sourceName'], row['questionOriginal'])
+        id_map[row['ID']] = new_id
+        if row['ID'] != new_id:
+            row['ID'] = new_id
+            changed += 1
+    if changed:
+        with jsonlines.open(path, 'w') as writer:
+            writer.write_all(rows)
+    return changed
+
+
+def migrate_blocked(path, id_map):
+    """
+    Re-keys a blocked ID list, keeping IDs that are not in id_map as they are.
+    Returns the IDs that could not be mapped.
+    """
+    with open(path) as fp:
+        lines = fp.read().splitlines()
+    unmapped = [line for line in lines if line.strip() and line.strip() not in id_map]
+    with open(path, 'w') as fp:
+        for line in lines:
+            fp.write(id_map.get(line.strip(), line) + '\n')
+    return unmapped
+
+
+def main():
+    args = get_args()
+    id_map = {}
+    for version in ['v0.2', 'v0.3']:
+        directory = os.path.join(args.path, 'schema_' + version)
+        for filename in sorted(os.listdir(directory)):
+            if filename.endswith('_' + version + '.jsonl'):
+                changed = migrate_file(os.path.join(directory, filename), id_map)
+                print("%s: %d IDs changed" % (filename, changed))
+    unmapped = migrate_blocked(os.path.join(args.path, args.blocked), id_map)
+    for old_id in unmapped:
+        print("Blocked ID not found in the data, left unchanged: " + old_id)
+
+
+if __name__ == '__main__':
+    main()
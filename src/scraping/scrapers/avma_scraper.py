@@ -15,16 +15,18 @@ __maintainer__ = "JHU-COVID-QA"
 __email__ = "covidqa@jhu.edu"
 __status__ = "Development"
 
-import requests
 import time
 from bs4 import BeautifulSoup
-from covid_scraping import Scraper, Conversion
+from covid_scraping import Scraper, Conversion, fetch
 
 class AVMAScraper(Scraper):
+    prefix = 'AVMA'
+    hosts = ['www.avma.org']
+    cost = 'light'
 
     def scrape(self):
         url = 'https://www.avma.org/resources-tools/animal-health-and-welfare/covid-19/covid-19-faqs-pet-owners'
-        html = requests.get(url).text
+        html = fetch.get(url).text
         soup = BeautifulSoup(html, 'lxml')
         faq = soup.find('h3', {'id' : '1'})
         questions = []
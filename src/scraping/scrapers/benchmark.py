@@ -0,0 +1,109 @@
+# Copyright (c) Johns Hopkins University and its affiliates.
+# This source code is licensed under the Apache 2 license found in the
+# LICENSE file in the root directory of this source tree.
+"""
+Runs the scrapers of scrape_all.py against recorded responses and reports
+the time each one spends to fetch, parse, convert, merge and write.
+
+Record the fixtures once with network access:
+    python benchmark.py --record
+then benchmark offline as often as needed:
+    python benchmark.py --repeat 3
+
+Every run merges into a fresh copy of the gold files in a temporary
+directory, so the data under data/scraping is never touched.
+
+Scrapers of the browser cost class, e.g. OregonGovScraper, drive Chrome
+through Selenium instead of fetch.get. Nothing of theirs is recorded or
+replayed, so they are left out. Asking for one with --only is an error.
+"""
+__author__ = "JHU-COVID-QA"
+__copyright__ = "Copyright 2020, Johns Hopkins University"
+__credits__ = ["JHU-COVID-QA"]
+__license__ = "Apache 2.0"
+__version__ = "0.1"
+__maintainer__ = "JHU-COVID-QA"
+__email__ = "covidqa@jhu.edu"
+__status__ = "Development"
+
+import argparse
+import json
+import os
+import shutil
+import tempfile
+from covid_scraping import fetch, instrument, registry
+from scrape_all import select_scrapers
+
+
+def get_args():
+    parser = argparse.ArgumentParser(
+        description='Benchmark the scrapers offline against recorded responses')
+    parser.add_argument('--record', action='store_true',
+                        help='Run the scrapers live and record their responses instead')
+    parser.add_argument('--fixtures', type=str, default=fetch.fixture_dir,
+                        help='Directory of the fixture store')
+    parser.add_argument('--gold', type=str, default='../../../data/scraping/',
+                        help='Directory whose schema_v0.3 gold files the runs merge with')
+    parser.add_argument('--repeat', type=int, default=1,
+                        help='Runs per scraper, the fastest one is reported')
+    parser.add_argument('--only', type=str, nargs='*', default=None,
+                        help='Class names, file prefixes or cost classes of the scrapers to run')
+    parser.add_argument('--output', type=str, default=None,
+                        help='Also write the results as JSON here')
+    args = parser.parse_args()
+    return args
+
+
+def _copy_gold(gold, path):
+    # Only the JSONL files, without their sidecars every run does the full merge and write.
+    source = os.path.join(gold, 'schema_v0.3')
+    target = os.path.join(path, 'schema_v0.3')
+    shutil.rmtree(target, ignore_errors=True)
+    os.makedirs(target)
+    if os.path.isdir(source):
+        for filename in os.listdir(source):
+            if filename.endswith('.jsonl'):
+                shutil.copyfile(os.path.join(source, filename), os.path.join(target, filename))
+
+
+def format_results(results):
+    columns = ['fetch', 'parse', 'convert', 'merge', 'write', 'total']
+    lines = ["%-32s %-8s" % ('scraper', 'status') + "".join("%9s" % column for column in columns)]
+    for name, result in sorted(results.items(), key=lambda item: item[1]['seconds']['total'], reverse=True):
+        lines.append("%-32s %-8s" % (name, result['status']) +
+                     "".join("%9.3f" % result['seconds'][column] for column in columns))
+    return "\n".join(lines)
+
+
+def main():
+    args = get_args()
+    fetch.fixture_dir = args.fixtures
+    fetch.mode = 'record' if args.record else 'replay'
+    infos = select_scrapers(only=args.only)
+    browsers = [info.name for info in infos if info.cost == 'browser']
+    if browsers and args.only is not None:
+        raise SystemExit("%s use a web browser instead of fetch.get and cannot be benchmarked offline"
+                         % ", ".join(browsers))
+    if browsers:
+        print("Leaving out %s, they use a web browser instead of fetch.get" % ", ".join(browsers))
+        infos = [info for info in infos if info.cost != 'browser']
+    path = tempfile.mkdtemp()
+    results = {}
+    try:
+        for info in infos:
+            scraper = registry.load(info, path)
+            runs = []
+            for _ in range(1 if args.record else args.repeat):
+                _copy_gold(args.gold, path)
+                runs.append(instrument.run(scraper))
+            results[info.name] = min(runs, key=lambda run: run['seconds']['total'])
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+    print(format_results(results))
+    if args.output:
+        with open(args.output, 'w') as fp:
+            json.dump(results, fp, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -15,16 +15,41 @@ __maintainer__ = "JHU-COVID-QA"
 __email__ = "covidqa@jhu.edu"
 __status__ = "Development"
 
+import concurrent.futures
 import datetime
 import time
 import dateparser
-import requests
 from bs4 import BeautifulSoup
-from covid_scraping import Conversion, Scraper
+from covid_scraping import Conversion, Scraper, fetch
 
 
 class CanadaPublicHealthScraper(Scraper):
-    def _link_to_responce(self, link):
+    prefix = 'CanadaPublicHealth'
+    hosts = ['www.canada.ca']
+    cost = 'heavy'
+    # Answer pages downloaded at the same time.
+    max_page_requests = 8
+
+    def _fetch_page(self, page):
+        try:
+            html = fetch.get('https://www.canada.ca' + page)
+            return BeautifulSoup(html.content, 'lxml')
+        except Exception:
+            return None
+
+    def _fetch_pages(self, links):
+        """
+        Downloads and parses every distinct page the answer links point into,
+        a few at a time. Most links are anchors into the same few pages.
+
+        Returns: dict of page path (link without its #anchor) to parsed page, None if it failed
+        """
+        pages = sorted({link.split('#')[0] for link in links
+                        if link and link[0] == '/' and '#' in link})
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_page_requests) as executor:
+            return dict(zip(pages, executor.map(self._fetch_page, pages)))
+
+    def _link_to_responce(self, link, pages):
         """
         We only want to scrap Canada's public health.
         Many other links go to responses for financial aid an other public sites.
@@ -32,8 +57,7 @@ class CanadaPublicHealthScraper(Scraper):
         if link[0] is not '/':
             return None
         try:
-            html = requests.get('https://www.canada.ca' + link)
-            soup = BeautifulSoup(html.content, 'lxml').find(
+            soup = pages[link.split('#')[0]].find(
                 ['h2', 'h3'], {'id': link.split('#')[1]}).find_next_sibling()
             responce = str(soup)
             while soup.find_next_sibling() is not None and soup.find_next_sibling(
@@ -46,7 +70,7 @@ class CanadaPublicHealthScraper(Scraper):
 
     def scrape(self):
         url = 'https://www.canada.ca/en/public-health/services/diseases/coronavirus-disease-covid-19.html#faq'
-        html = requests.get(url).text
+        html = fetch.get(url).text
         soup = BeautifulSoup(
             html, 'lxml').find(
             'ul', {
@@ -55,7 +79,8 @@ class CanadaPublicHealthScraper(Scraper):
             'p', {'class': 'text-right h3 mrgn-tp-sm'}).getText()).timetuple())
         questions = [str(x) for x in soup]
         response_links = [x['href'] for x in soup]
-        responses = list(map(self._link_to_responce, response_links))
+        pages = self._fetch_pages(response_links)
+        responses = [self._link_to_responce(link, pages) for link in response_links]
         converter = Conversion(
             self._filename,
             self._path)
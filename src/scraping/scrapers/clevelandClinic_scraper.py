@@ -18,19 +18,22 @@ __status__ = "Development"
 import datetime
 import time
 import dateparser
-import requests
 from bs4 import BeautifulSoup, NavigableString, CData, Tag
 
-from covid_scraping import Conversion, Scraper
+from covid_scraping import Conversion, Scraper, fetch
 
 
 class ClevelandClinicScraper(Scraper):
+    prefix = 'ClevelandClinic'
+    hosts = ['newsroom.clevelandclinic.org']
+    cost = 'light'
+
     def scrape(self):
         name = 'Cleveland Clinic'
         url = 'https://newsroom.clevelandclinic.org/2020/03/18/frequently-asked-questions-about-coronavirus-disease-2019-covid-19/'
         headers = {
             'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_10_1) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/39.0.2171.95 Safari/537.36'}
-        r = requests.get(url, headers=headers)
+        r = fetch.get(url, headers=headers)
         soup = BeautifulSoup(r.text, "lxml")
 
         faq = soup.find("div", {"class": "entry-content"})
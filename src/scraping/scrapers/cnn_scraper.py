@@ -16,21 +16,23 @@ __email__ = "covidqa@jhu.edu"
 __status__ = "Development"
 
 import time
-import requests
 import dateparser
 from bs4 import BeautifulSoup
 from collections import namedtuple
-from covid_scraping import Conversion, Scraper
+from covid_scraping import Conversion, Scraper, fetch
 
 
 class CNNScraper(Scraper):
+    prefix = 'CNN'
+    hosts = ['www.cnn.com']
+    cost = 'light'
 
     def scrape(self):
         Block = namedtuple('Block', 'content tags')
         extra_data = {}
 
         url = 'https://www.cnn.com/interactive/2020/health/coronavirus-questions-answers/'
-        page = requests.get(url)
+        page = fetch.get(url)
         soup = BeautifulSoup(page.content, 'html.parser')
 
         lastUpdatedTime = time.mktime(dateparser.parse(' '.join(soup.find(
@@ -16,11 +16,13 @@ __maintainer__ = "JHU-COVID-QA"
 __email__ = "covidqa@jhu.edu"
 __status__ = "Development"
 
+import argparse
+import json
 import logging
+import os
 import time
-import pandas as pd
 from scrapy.crawler import CrawlerProcess
-from covid_scraping import Scraper, Conversion
+from covid_scraping import Scraper, Conversion, instrument
 from deepset_ai.Arbeitsagentur_scraper import CovidScraper as Arbeitsagentur
 from deepset_ai.BAUA_scraper import CovidScraper as BAUA
 from deepset_ai.BMAS_scraper import CovidScraper as BMAS
@@ -45,16 +47,93 @@ from deepset_ai.Salute_IT_scraper import CovidScraper as Salute_IT
 from deepset_ai.UNICEF_scraper import CovidScraper as UNICEF
 from deepset_ai.WHO_scraper import CovidScraper as WHO
 
-RESULTS = []
+# Scrapy stores every downloaded page here, so a later crawl can be replayed from disk.
+http_cache_dir = os.path.join(os.path.expanduser('~'), '.cache', 'covid_scraping', 'scrapy')
+# Error and throttling responses, never cached: a replay must not serve an outage as data.
+http_cache_ignore_codes = [403, 404, 408, 429, 500, 502, 503, 504]
+# Scrapy settings of each crawl profile.
+# live: polite crawl of the real sites, each page is downloaded again and cached for replay.
+# replay: pages come from the cache without revalidation, only uncached pages are downloaded.
+crawl_profiles = {
+    'live': {
+        'HTTPCACHE_ENABLED': True,
+        'HTTPCACHE_DIR': http_cache_dir,
+        'HTTPCACHE_STORAGE': 'scrapy.extensions.httpcache.FilesystemCacheStorage',
+        'HTTPCACHE_POLICY': 'scrapy.extensions.httpcache.DummyPolicy',
+        'HTTPCACHE_EXPIRATION_SECS': 1,
+        'HTTPCACHE_IGNORE_HTTP_CODES': http_cache_ignore_codes,
+        'AUTOTHROTTLE_ENABLED': True,
+        'AUTOTHROTTLE_START_DELAY': 1,
+        'AUTOTHROTTLE_MAX_DELAY': 30,
+        'AUTOTHROTTLE_TARGET_CONCURRENCY': 1.0,
+        'CONCURRENT_REQUESTS': 16,
+        'CONCURRENT_REQUESTS_PER_DOMAIN': 2,
+        'DOWNLOAD_TIMEOUT': 60,
+        'RETRY_TIMES': 2,
+    },
+    'replay': {
+        'HTTPCACHE_ENABLED': True,
+        'HTTPCACHE_DIR': http_cache_dir,
+        'HTTPCACHE_STORAGE': 'scrapy.extensions.httpcache.FilesystemCacheStorage',
+        'HTTPCACHE_POLICY': 'scrapy.extensions.httpcache.DummyPolicy',
+        'HTTPCACHE_EXPIRATION_SECS': 0,
+        'HTTPCACHE_IGNORE_HTTP_CODES': http_cache_ignore_codes,
+        'AUTOTHROTTLE_ENABLED': False,
+        'CONCURRENT_REQUESTS': 32,
+        'CONCURRENT_REQUESTS_PER_DOMAIN': 8,
+        'DOWNLOAD_TIMEOUT': 30,
+        'RETRY_TIMES': 1,
+    },
+}
 
 
 class Pipeline(object):
+    """
+    Adds every question answer pair of a spider item, a dict of equal length
+    column lists, to the converter passed to the spider as soon as the item
+    arrives. Scrapy only logs exceptions raised here, so they are kept in the
+    spider's errors list for scrape() to raise once the crawl is over.
+    """
+
     def process_item(self, item, spider):
-        df = pd.DataFrame.from_dict(item)
-        RESULTS.append(df)
+        try:
+            for i in range(len(item['question'])):
+                spider.converter.addExample({
+                    'sourceUrl': item['link'][i],
+                    'sourceName': item['source'][i],
+                    "needUpdate": True,
+                    "typeOfInfo": "QA",
+                    "isAnnotated": False,
+                    "responseAuthority": "",
+                    "question": item['question'][i],
+                    "answer": item['answer_html'][i],
+                    "hasAnswer": bool(item['answer'][i]),
+                    "targetEducationLevel": "NA",
+                    "topic": [],
+                    "extraData": {},
+                    "targetLocation": item['country'][i],
+                    "language": item['lang'][i],
+                })
+        except Exception as e:
+            spider.errors.append(e)
+        return item
 
 
 class DeepsetAIMasterScraper(Scraper):
+    prefix = 'DeepsetAI'
+    cost = 'crawl'
+
+    def __init__(self, *, path, filename, profile='live'):
+        """
+        profile is the name of the crawl profile in crawl_profiles to run with.
+        """
+        super().__init__(path=path, filename=filename)
+        if profile not in crawl_profiles:
+            raise ValueError("Unknown crawl profile '{}'".format(profile))
+        self._profile = profile
+        # Download counts of every spider of the last scrape(), from the Scrapy stats.
+        self.spiders = []
+
     def scrape(self):
         scraper_list = [
             Arbeitsagentur,
@@ -83,44 +162,62 @@ class DeepsetAIMasterScraper(Scraper):
         ]
         logger = logging.getLogger(__name__)
         logging.disable(logging.WARNING)
-        process = CrawlerProcess({
-            'USER_AGENT': 'Mozilla/4.0 (compatible; MSIE 7.0; Windows NT 5.1)',
-            'ITEM_PIPELINES': {'__main__.Pipeline': 1}
-        })
-        for crawler in scraper_list:
-            process.crawl(crawler)
-        process.start()
-        df = pd.concat(RESULTS)
         converter = Conversion(
             self._filename,
             self._path)
-        for _, row in df.iterrows():
-            converter.addExample({
-                'sourceUrl': row.link,
-                'sourceName': row.source,
-                "needUpdate": True,
-                "typeOfInfo": "QA",
-                "isAnnotated": False,
-                "responseAuthority": "",
-                "question": row.question,
-                "answer": row.answer_html,
-                "hasAnswer": bool(row.answer),
-                "targetEducationLevel": "NA",
-                "topic": [],
-                "extraData": {},
-                "targetLocation": row.country,
-                "language": row.lang,
-            })
+        errors = []
+        settings = dict(crawl_profiles[self._profile])
+        settings.update({
+            'USER_AGENT': 'Mozilla/4.0 (compatible; MSIE 7.0; Windows NT 5.1)',
+            'ITEM_PIPELINES': {__name__ + '.Pipeline': 1}
+        })
+        process = CrawlerProcess(settings)
+        for crawler in scraper_list:
+            process.crawl(crawler, converter=converter, errors=errors)
+        # Scrapy downloads and parses in one event loop, the whole crawl counts as fetch.
+        with instrument.timed('fetch'):
+            process.start()
+        self.spiders = []
+        for crawler in process.crawlers:
+            stats = crawler.stats.get_stats()
+            self.spiders.append({'spider': crawler.spidercls.__module__.split('.')[-1],
+                                 'finishReason': stats.get('finish_reason'),
+                                 'bytes': stats.get('downloader/response_bytes', 0),
+                                 'pages': stats.get('response_received_count', 0),
+                                 'items': stats.get('item_scraped_count', 0)})
+            instrument.count('bytes', stats.get('downloader/response_bytes', 0))
+            instrument.count('pages', stats.get('response_received_count', 0))
+        if errors:
+            raise errors[0]
         return converter.write()
 
 
+def get_args():
+    parser = argparse.ArgumentParser(
+        description='Run the deepset-ai spiders')
+    parser.add_argument('--profile', choices=sorted(crawl_profiles), default='live',
+                        help='live crawls the sites politely, replay serves pages cached by an earlier crawl')
+    parser.add_argument('--metrics', type=str, default=None,
+                        help='Write the instrument record of the run and its aggregate here as JSON')
+    args = parser.parse_args()
+    return args
+
+
 def main():
+    args = get_args()
     scraper = DeepsetAIMasterScraper(
         path='../../../data/scraping/',
-        filename='DeepsetAI')
-    success = scraper.scrape()
+        filename='DeepsetAI',
+        profile=args.profile)
+    record = instrument.run(scraper)
+    record['spiders'] = scraper.spiders
     success_to_string = lambda x: "Success" if x else "Failure"
-    print(success_to_string(success) + " " + str(scraper.__class__.__name__))
+    print(success_to_string(record['status'] == 'ok') + " " + str(scraper.__class__.__name__))
+    summary = instrument.aggregate([record])
+    print(instrument.format_summary(summary))
+    if args.metrics:
+        with open(args.metrics, 'w') as fp:
+            json.dump(summary, fp, indent=2)
 
 
 if __name__ == "__main__":
@@ -17,16 +17,19 @@ __status__ = "Development"
 
 import datetime
 import time
-import requests
 from bs4 import BeautifulSoup, NavigableString, CData, Tag
-from covid_scraping import Conversion, Scraper
+from covid_scraping import Conversion, Scraper, fetch
 
 
 class DelawareGovScraper(Scraper):
+    prefix = 'Delaware'
+    hosts = ['coronavirus.delaware.gov']
+    cost = 'light'
+
     def scrape(self):
         name = 'Delaware State Government'
         url = 'https://coronavirus.delaware.gov/what-delawareans-can-do/#faqs'
-        html = requests.get(url).text
+        html = fetch.get(url).text
         soup = BeautifulSoup(html, "lxml")
 
         questions = [str(q)
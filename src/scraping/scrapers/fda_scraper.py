@@ -16,16 +16,19 @@ __email__ = "covidqa@jhu.edu"
 __status__ = "Development"
 
 import time
-from urllib.request import urlopen
 from bs4 import BeautifulSoup
-from covid_scraping import Conversion, Scraper
+from covid_scraping import Conversion, Scraper, fetch
 
 
 class FDAScraper(Scraper):
+    prefix = 'FDA'
+    hosts = ['www.fda.gov']
+    cost = 'light'
+
     def scrape(self):
         name = 'FDA'
         url = 'https://www.fda.gov/emergency-preparedness-and-response/mcm-issues/coronavirus-disease-2019-covid-19-frequently-asked-questions'
-        html = urlopen(url)
+        html = fetch.get(url).content
         soup = BeautifulSoup(html, "lxml")
         questions, answers = [], []
 
@@ -18,16 +18,19 @@ __status__ = "Development"
 import datetime
 import time
 import dateparser
-import requests
 from bs4 import BeautifulSoup, NavigableString, CData, Tag
-from covid_scraping import Conversion, Scraper
+from covid_scraping import Conversion, Scraper, fetch
 
 
 class FloridaGovScraper(Scraper):
+    prefix = 'Florida'
+    hosts = ['floridahealthcovid19.gov']
+    cost = 'light'
+
     def scrape(self):
         name = 'FloridaGov'
         url = 'https://floridahealthcovid19.gov/frequently-asked-questions/'
-        html = requests.get(url).text
+        html = fetch.get(url).text
         soup = BeautifulSoup(html, "lxml")
 
         questions = [str(q)
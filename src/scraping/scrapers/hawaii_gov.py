@@ -17,17 +17,20 @@ __status__ = "Development"
 
 import datetime
 import time
-import requests
 import dateparser
 from bs4 import BeautifulSoup, NavigableString, CData, Tag
-from covid_scraping import Conversion, Scraper
+from covid_scraping import Conversion, Scraper, fetch
 
 
 class HawaiiGovScraper(Scraper):
+    prefix = 'Hawaii'
+    hosts = ['health.hawaii.gov']
+    cost = 'light'
+
     def scrape(self):
         name = 'Hawaii State Government'
         url = 'https://health.hawaii.gov/coronavirusdisease2019/what-you-should-know/faqs/'
-        html = requests.get(url).text
+        html = fetch.get(url).text
         soup = BeautifulSoup(html, "lxml")
 
         questions = [str(q)
@@ -21,6 +21,8 @@ from covid_scraping import Conversion, Scraper
 
 
 class InternalQAScraper(Scraper):
+    prefix = 'internalCOVIDinfosheet'
+    cost = 'light'
 
     def _prepare_data(self, row):
         data = {
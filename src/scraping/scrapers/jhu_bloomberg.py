@@ -17,12 +17,14 @@ __status__ = "Development"
 
 import datetime
 import time
-import requests
 from bs4 import BeautifulSoup
-from covid_scraping import Conversion, Scraper
+from covid_scraping import Conversion, Scraper, fetch
 
 
 class JHUBloombergScraper(Scraper):
+    prefix = 'JHU-bloomberg'
+    hosts = ['www.globalhealthnow.org']
+    cost = 'light'
 
     def _valid_responce(self, x):
         return (x.find_next_sibling().name is 'p' or x.find_next_sibling().name is 'ul')\
@@ -75,7 +77,7 @@ class JHUBloombergScraper(Scraper):
 
     def scrape(self):
         url = 'https://www.globalhealthnow.org/2020-02/coronavirus-expert-reality-check'
-        html = requests.get(url).text
+        html = fetch.get(url).text
         lastUpdateTime = time.mktime(
             time.strptime(
                 BeautifulSoup(
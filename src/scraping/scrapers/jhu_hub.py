@@ -17,14 +17,17 @@ __status__ = "Development"
 
 import datetime
 import time
-import requests
 from bs4 import BeautifulSoup
-from covid_scraping import Conversion, Scraper
+from covid_scraping import Conversion, Scraper, fetch
 
 
 class JHUHubScraper(Scraper):
+    prefix = 'JHU_hub'
+    hosts = ['hub.jhu.edu']
+    cost = 'light'
+
     def _scrape(self, url):
-        html = requests.get(url).text
+        html = fetch.get(url).text
         lastUpdateTime = float(BeautifulSoup(html, 'lxml').find(
             'span', {'class': 'publish-date convert-pubdate'})['data-timestamp'])
         soup = BeautifulSoup(
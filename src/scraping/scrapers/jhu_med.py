@@ -18,17 +18,19 @@ __status__ = "Development"
 import datetime
 import time
 import dateparser
-import requests
 import copy
 from bs4 import BeautifulSoup
-from covid_scraping import Conversion, Scraper
+from covid_scraping import Conversion, Scraper, fetch
 
 
 class JHUMedicineScraper(Scraper):
+    prefix = 'JHU_Medicine'
+    hosts = ['www.hopkinsmedicine.org']
+    cost = 'light'
 
     def scrape(self):
         url = "https://www.hopkinsmedicine.org/health/conditions-and-diseases/coronavirus/coronavirus-frequently-asked-questions"
-        html = requests.get(url).text
+        html = fetch.get(url).text
         soup = BeautifulSoup(html, 'lxml').find_all('div', {'class': 'rtf'})
         lastUpdateTime = time.mktime(
             dateparser.parse(
@@ -17,12 +17,14 @@ __status__ = "Development"
 
 import datetime
 import time
-import requests
 from bs4 import BeautifulSoup, NavigableString, CData, Tag
-from covid_scraping import Conversion, Scraper
+from covid_scraping import Conversion, Scraper, fetch
 
 
 class KansasGovScraper(Scraper):
+    prefix = 'Kansas'
+    hosts = ['ks-kdhecovid19.civicplus.com']
+    cost = 'light'
 
     def _extract_question(self, x):
         return str(x.find('a'))
@@ -33,7 +35,7 @@ class KansasGovScraper(Scraper):
     def scrape(self):
         name = 'Kansas Department of Health and Enviroment'
         url = 'https://ks-kdhecovid19.civicplus.com/faq.aspx'
-        html = requests.get(url).text
+        html = fetch.get(url).text
         soup = BeautifulSoup(html, "lxml").find('div', {'id' : 'modulecontent'}).findAll('dl')
 
         questions = list(map(self._extract_question, soup))
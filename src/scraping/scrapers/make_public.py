@@ -1,7 +1,13 @@
 import os
 import argparse
 import json
-import pandas as pd
+from covid_scraping import release
+from covid_scraping import test_dump_to_schema
+
+# Stored as dictionaries in the columnar release, a handful of values repeat on every row.
+dictionary_columns = {'sourceName', 'sourceUrl'}
+# Rows per Parquet row group.
+parquet_batch_size = 10000
 
 
 def get_args():
@@ -9,11 +15,104 @@ def get_args():
         description='Make one public tsv file for release')
     parser.add_argument('--path', type=str, default="",
                         help='Path to directory of jsonl files to release')
+    parser.add_argument('--parquet', action='store_true',
+                        help='Also write scraped.parquet, needs pyarrow')
 
     args = parser.parse_args()
     return args
 
 
+def _json_text(value):
+    # Lists and dicts have no column type of their own, they are released as JSON text.
+    if value is None or isinstance(value, str):
+        return value
+    return json.dumps(value) if isinstance(value, (list, dict)) else str(value)
+
+
+def _column_types():
+    # Python type of every column that has the same bool, float or int type in
+    # every schema version declaring it. Untyped and mixed columns are strings.
+    types = {}
+    for version in test_dump_to_schema.versions:
+        for column, kind in test_dump_to_schema.field_types(version):
+            types.setdefault(column, set()).add(kind)
+    return {column: kinds.pop() for column, kinds in types.items()
+            if len(kinds) == 1 and next(iter(kinds)) in (bool, float, int)}
+
+
+class _ParquetWriter():
+    """
+    Writes released rows to a Parquet file in row groups, with sourceName and
+    sourceUrl dictionary encoded. The column types come from the schema versions
+    in test_dump_to_schema.
+    """
+
+    def __init__(self, path, columns):
+        import pyarrow
+        import pyarrow.parquet
+        self._pa = pyarrow
+        arrow_types = {bool: pyarrow.bool_(), float: pyarrow.float64(), int: pyarrow.int64()}
+        column_types = _column_types()
+        fields = []
+        for column in columns:
+            if column in dictionary_columns:
+                kind = pyarrow.dictionary(pyarrow.int32(), pyarrow.string())
+            elif column in column_types:
+                kind = arrow_types[column_types[column]]
+            else:
+                kind = pyarrow.string()
+            fields.append(pyarrow.field(column, kind))
+        self._schema = pyarrow.schema(fields)
+        self._writer = pyarrow.parquet.ParquetWriter(path, self._schema)
+        self._rows = []
+
+    def write(self, row):
+        self._rows.append(row)
+        if len(self._rows) >= parquet_batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self._rows:
+            return
+        arrays = []
+        for i, field in enumerate(self._schema):
+            if self._pa.types.is_dictionary(field.type):
+                values = [_json_text(row[i]) for row in self._rows]
+                arrays.append(self._pa.array(values, type=self._pa.string()).dictionary_encode())
+            elif self._pa.types.is_string(field.type):
+                arrays.append(self._pa.array([_json_text(row[i]) for row in self._rows], type=field.type))
+            else:
+                arrays.append(self._pa.array([row[i] for row in self._rows], type=field.type))
+        self._writer.write_table(self._pa.Table.from_arrays(arrays, schema=self._schema))
+        self._rows = []
+
+    def close(self):
+        self.flush()
+        self._writer.close()
+
+
+def write_parquet(paths, parquet_path):
+    """
+    Streams the released columns of every example in paths to a Parquet file.
+    """
+    rows = release.read_released(paths)
+    columns = next(rows, None)
+    if columns is None:
+        return
+    # Written aside, a failed run must not leave a truncated scraped.parquet behind.
+    tmp_path = parquet_path + '.tmp'
+    parquet = _ParquetWriter(tmp_path, columns)
+    try:
+        for row in rows:
+            parquet.write(row)
+    except BaseException:
+        parquet.close()
+        os.remove(tmp_path)
+        raise
+    parquet.close()
+    os.replace(tmp_path, parquet_path)
+
+
 def main():
     args = get_args()
     # dict_keys(['sourceUrl', 'sourceName', 'dateScraped', 'sourceDate',
@@ -26,24 +125,24 @@ def main():
     #   'answerOriginal', 'answerText', 'questionUUID', 'answerUUID', 'ID',
     #   'answerContainsURLs', 'answerToks2URL'],
 
-    data = []
-    for filename in os.listdir(args.path):
-        if filename.endswith("jsonl"):
-            if "internal" in filename:
-                continue
-            for line in open(args.path + "/" + filename):
-                data.append(json.loads(line))
-
-    df = pd.DataFrame(data)
-    df['question'] = df['questionText']
-    df['answer'] = df['answerText']
-    df = df.drop(columns=['needUpdate', 'extraData', 'isAnnotated', 'typeOfInfo',
-                          'responseAuthority', 'topic', 'targetEducationLevel', 'answerOriginal', 'questionOriginal',
-                          'questionText', 'answerText', 'answerToks2URL', 'answerContainsURLs', 'answerUUID', 'questionUUID'])
-    print("%d unique urls" % len(set(df['sourceUrl'])))
-    print("%d number of questions" % df.shape[0])
-    print("%d number of answers" % sum(df['hasAnswer']))
-    df.to_csv(args.path + "/scraped.tsv", sep="\t")
+    if args.parquet:
+        try:
+            import pyarrow.parquet
+        except ImportError:
+            raise SystemExit("--parquet needs pyarrow, install it with pip install pyarrow")
+    # Only the sources that changed since the last release are read again.
+    manifest = release.update_manifest(args.path)
+    release.write_tsv(args.path, manifest, os.path.join(args.path, "scraped.tsv"))
+    if args.parquet:
+        paths = [os.path.join(args.path, filename) for filename in sorted(manifest['sources'])
+                 if release.is_released(filename)]
+        write_parquet(paths, os.path.join(args.path, "scraped.parquet"))
+    urls, questions, answers = release.release_counts(manifest)
+    print("%d sources read, %d unchanged" % (len(manifest['changed']),
+                                            len(manifest['sources']) - len(manifest['changed'])))
+    print("%d unique urls" % urls)
+    print("%d number of questions" % questions)
+    print("%d number of answers" % answers)
 
 
 if __name__ == '__main__':
@@ -16,22 +16,24 @@ __email__ = "covidqa@jhu.edu"
 __status__ = "Development"
 
 import time
-import requests
 from bs4 import BeautifulSoup
 import re
 import pandas as pd
 import time
 
-from covid_scraping import Conversion, Scraper
+from covid_scraping import Conversion, Scraper, fetch
 
 
 class NFIDScraper(Scraper):
+    prefix = 'NFID'
+    hosts = ['www.nfid.org']
+    cost = 'light'
 
     def _crawl_common(self):
         faq = []
         name = 'National Foundation for Infectious Diseases'
         url = 'https://www.nfid.org/infectious-diseases/frequently-asked-questions-about-novel-coronavirus-2019-ncov/'
-        html = requests.get(url).text
+        html = fetch.get(url).text
         # All faq is in the entry-content
         soup = BeautifulSoup(html, 'lxml').find(
             'div', {'class': 'entry-content'})
@@ -83,7 +85,7 @@ class NFIDScraper(Scraper):
         faq = []
         name = 'National Foundation for Infectious Diseases'
         url = 'https://www.nfid.org/infectious-diseases/common-questions-and-answers-about-covid-19-for-older-adults-and-people-with-chronic-health-conditions/'
-        html = requests.get(url).text
+        html = fetch.get(url).text
         # All faq is in the entry-content
         soup = BeautifulSoup(html, 'lxml').find(
             'div', {'class': 'entry-content'})
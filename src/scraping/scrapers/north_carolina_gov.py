@@ -17,13 +17,15 @@ __status__ = "Development"
 
 import dateparser
 import time
-import requests
 import os
 from bs4 import BeautifulSoup, NavigableString, CData, Tag
-from covid_scraping import Conversion, Scraper
+from covid_scraping import Conversion, Scraper, fetch
 
 
 class NorthCarolinaGovScraper(Scraper):
+    prefix = 'NorthCarolina'
+    hosts = ['www.ncdhhs.gov']
+    cost = 'light'
 
     def _extract_question(self, soup):
         return str(soup.find('h2', {'class': 'visuallyhidden'}).text)
@@ -42,7 +44,7 @@ class NorthCarolinaGovScraper(Scraper):
     def scrape(self):
         name = 'North Carolina Public Health Division'
         url = 'https://www.ncdhhs.gov/divisions/public-health/covid19/frequently-asked-questions-about-covid-19'
-        html = requests.get(url).text
+        html = fetch.get(url).text
         soup = BeautifulSoup(html, 'lxml')
         sections = soup.findAll('section', {'class': 'entity entity-paragraphs-item paragraphs-item-accordion band no-gutter clearfix'})
 
@@ -16,13 +16,15 @@ __email__ = "covidqa@jhu.edu"
 __status__ = "Development"
 
 import time
-import requests
 from bs4 import BeautifulSoup, NavigableString, CData, Tag
-from covid_scraping import Conversion, Scraper
+from covid_scraping import Conversion, Scraper, fetch
 import itertools
 
 
 class NorthDakotaGovScraper(Scraper):
+    prefix = 'North_Dakota'
+    hosts = ['ndresponse.gov']
+    cost = 'light'
 
     def _extract_question(self, x):
         return str(x.find('a'))
@@ -33,7 +35,7 @@ class NorthDakotaGovScraper(Scraper):
     def scrape(self):
         name = 'North Dakota Stake Government'
         url = 'https://ndresponse.gov/covid-19-resources/covid-19-faqs'
-        html = requests.get(url).text
+        html = fetch.get(url).text
 
         soup = BeautifulSoup(html, "lxml").findAll(
             'div', {'class': 'view-content'})[4].findAll('div', {'class': 'views-row'})
@@ -16,16 +16,19 @@ __email__ = "covidqa@jhu.edu"
 __status__ = "Development"
 
 import time
-from urllib.request import urlopen
 from bs4 import BeautifulSoup, NavigableString, CData, Tag
-from covid_scraping import Conversion, Scraper
+from covid_scraping import Conversion, Scraper, fetch
 
 
 class NewYorkTimesScraper(Scraper):
+    prefix = 'NYT'
+    hosts = ['www.nytimes.com']
+    cost = 'light'
+
     def scrape(self):
         name = 'NYTimes'
         url = 'https://www.nytimes.com/interactive/2020/world/coronavirus-tips-advice.html'
-        html = urlopen(url)
+        html = fetch.get(url).content
         soup = BeautifulSoup(html, "lxml")
 
         questions, answers = [], []
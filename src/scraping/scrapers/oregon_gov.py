@@ -29,6 +29,9 @@ from covid_scraping import Conversion, Scraper
 
 
 class OregonGovScraper(Scraper):
+    prefix = 'Oregon'
+    hosts = ['www.oregon.gov']
+    cost = 'browser'
 
     def _extract_question(self, soup):
         return str(soup.text)
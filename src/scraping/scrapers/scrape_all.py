@@ -11,67 +11,124 @@ __maintainer__ = "JHU-COVID-QA"
 __email__ = "covidqa@jhu.edu"
 __status__ = "Development"
 
-from internalQAs_scraper import InternalQAScraper
-from canada_public_health_scraper import CanadaPublicHealthScraper
-from jhu_bloomberg import JHUBloombergScraper
-from jhu_hub import JHUHubScraper
-from nfid_scraper import NFIDScraper
-from whomyth_scraper import WhoMythScraper
-from texasHumanResources_scraper import TexasHumanResourceScraper
-from clevelandClinic_scraper import ClevelandClinicScraper
-from fda_scraper import FDAScraper
-from nyt_scraper import NewYorkTimesScraper
-from whomyth_scraper import WhoMythScraper
-from deepsetAI_scraper import DeepsetAIMasterScraper
-from floridaGov_scraper import FloridaGovScraper
-from cnn_scraper import CNNScraper
-from avma_scraper import AVMAScraper
-from jhu_med import JHUMedicineScraper
-from vermont_gov import VermontGovScraper
-from kansas_gov import KansasGovScraper
-from north_dakota import NorthDakotaGovScraper
-from delaware_gov import DelawareGovScraper
-from oregon_gov import OregonGovScraper
-from north_carolina_gov import NorthCarolinaGovScraper
-from hawaii_gov import HawaiiGovScraper
+import argparse
+import json
+import os
+import subprocess
+from covid_scraping import distributed, instrument, registry
+from covid_scraping.jobqueue import open_queue
+from covid_scraping.scheduler import run_scrapers, format_report
+
+# Directory of the scraper modules.
+scraper_dir = os.path.dirname(os.path.abspath(__file__))
+
+
+def _positive_int(text):
+    try:
+        value = int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError("expected a whole number, got '%s'" % text)
+    if value < 1:
+        raise argparse.ArgumentTypeError("must be at least 1, got %d" % value)
+    return value
+
+
+def _shard(text):
+    try:
+        index, count = [int(part) for part in text.split('/')]
+    except ValueError:
+        raise argparse.ArgumentTypeError("expected I/N, e.g. 0/4")
+    if not 0 <= index < count:
+        raise argparse.ArgumentTypeError("I must be at least 0 and less than N")
+    return index, count
+
+
+def get_args():
+    parser = argparse.ArgumentParser(
+        description='Run all of the scrapers')
+    parser.add_argument('--workers', type=_positive_int, default=8,
+                        help='Maximum number of scrapers running at once')
+    parser.add_argument('--timeout', type=float, default=1800,
+                        help='Seconds a scraper may run before it is stopped')
+    parser.add_argument('--per-host', type=_positive_int, default=1,
+                        help='Maximum number of scrapers running against one host')
+    parser.add_argument('--metrics', type=str, default=None,
+                        help='Write the per scraper instrument records and their aggregate here as JSON')
+    parser.add_argument('--only', type=str, nargs='*', default=None,
+                        help='Class names, file prefixes or cost classes of the scrapers to run')
+    parser.add_argument('--exclude', type=str, nargs='*', default=[],
+                        help='Class names, file prefixes or cost classes of scrapers not to run')
+    parser.add_argument('--changed-since', type=str, default=None,
+                        help='Run only the scrapers whose module differs from this git revision')
+    parser.add_argument('--shard', type=_shard, default=None,
+                        help='I/N, run the I-th of N disjoint shards of the scrapers, I counts from 0')
+    parser.add_argument('--list', action='store_true',
+                        help='Print the chosen scrapers instead of running them')
+    parser.add_argument('--queue', type=str, default=None,
+                        help='Hand the scrapers to the workers of this queue, a directory or a .sqlite file, '
+                             'see scrape_worker.py')
+    parser.add_argument('--staging', type=str, default=None,
+                        help='Directory the workers scrape into, shared by all machines, by default the '
+                             'queue location with .staging appended')
+    parser.add_argument('--claim-timeout', type=float, default=600,
+                        help='With --queue, seconds a scraper may wait for a worker before it fails')
+    parser.add_argument('--run-timeout', type=float, default=4 * 3600,
+                        help='With --queue, seconds after which the scrapers still out fail')
+    args = parser.parse_args()
+    if args.changed_since is not None:
+        try:
+            registry.changed_modules(scraper_dir, args.changed_since)
+        except subprocess.CalledProcessError as e:
+            parser.error("unknown revision '%s' for --changed-since: %s" % (args.changed_since, e.stderr.strip()))
+    return args
+
+
+def select_scrapers(only=None, exclude=(), changed_since=None, shard=None):
+    """
+    Chooses scrapers from the registry, see covid_scraping.registry.select. Scrapy
+    crawls are left out unless asked for by only, deepsetAI_scraper.py runs them.
+
+    Returns: the ScraperInfos of the chosen scrapers
+    """
+    if only is None:
+        exclude = list(exclude) + ['crawl']
+    modules = None
+    if changed_since is not None:
+        modules = registry.changed_modules(scraper_dir, changed_since)
+    return registry.select(registry.discover(scraper_dir), only=only, exclude=exclude,
+                           modules=modules, shard=shard)
 
 
 def main():
+    args = get_args()
     path = '../../../data/scraping/'
 
-    scrapers = [
-                InternalQAScraper(path=path, filename='internalCOVIDinfosheet'),
-                CanadaPublicHealthScraper(path=path, filename='CanadaPublicHealth'),
-                JHUBloombergScraper(path=path, filename="JHU-bloomberg"),
-                JHUHubScraper(path=path, filename="JHU_hub"),
-                NFIDScraper(path=path, filename="NFID"),
-                TexasHumanResourceScraper(path=path, filename="TexasHR"),
-                ClevelandClinicScraper(path=path, filename="ClevelandClinic"),
-                FDAScraper(path=path, filename="FDA"),
-                NewYorkTimesScraper(path=path, filename="NYT"),
-                WhoMythScraper(path=path, filename="WhoMyth"),
-                FloridaGovScraper(path=path, filename='Florida'),
-                CNNScraper(path=path, filename='CNN'),
-                AVMAScraper(path=path, filename='AVMA'),
-                JHUMedicineScraper(path=path, filename="JHU_Medicine"),
-                VermontGovScraper(path=path, filename='Vermont'),
-                KansasGovScraper(path=path, filename='Kansas'),
-                NorthDakotaGovScraper(path=path, filename='North_Dakota'),
-                DelawareGovScraper(path=path, filename="Delaware"),
-                OregonGovScraper(path=path, filename='Oregon'),
-                NorthCarolinaGovScraper(path=path, filename='NorthCarolina'),
-                HawaiiGovScraper(path=path, filename='Hawaii')
-                ]
-    success = []
-    for scraper in scrapers:
-        try:
-            success.append(scraper.scrape())
-        except:
-            success.append(False)
+    infos = select_scrapers(args.only, args.exclude, args.changed_since, args.shard)
+    if args.list:
+        for info in infos:
+            print("%-32s %-24s %s" % (info.name, info.prefix, info.cost))
+        return
+    if args.queue:
+        # The workers import and run the scrapers, this process only commits their files.
+        results = distributed.coordinate(open_queue(args.queue), infos, path,
+                                         args.staging or args.queue + '.staging',
+                                         timeout=args.timeout, per_host=args.per_host,
+                                         claim_timeout=args.claim_timeout, run_timeout=args.run_timeout)
+    else:
+        # Only the chosen scrapers are imported.
+        scrapers = [registry.load(info, path) for info in infos]
+        results = run_scrapers(scrapers, max_workers=args.workers,
+                               timeout=args.timeout, per_host=args.per_host)
 
     success_to_string = lambda x: "Success" if x else "Failure"
-    for success, scraper in zip(success, scrapers):
-        print(success_to_string(success) + " " + str(scraper.__class__.__name__))
+    for result in results:
+        print(success_to_string(result.success) + " " + result.name)
+    print(format_report(results))
+    summary = instrument.aggregate([result.record for result in results])
+    print(instrument.format_summary(summary))
+    if args.metrics:
+        with open(args.metrics, 'w') as fp:
+            json.dump(summary, fp, indent=2)
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,44 @@
+# Copyright (c) Johns Hopkins University and its affiliates.
+# This source code is licensed under the Apache 2 license found in the
+# LICENSE file in the root directory of this source tree.
+"""
+Runs the scrape jobs scrape_all.py --queue hands out, on any machine that
+sees the queue and the staging directory, e.g. on a shared file system:
+    python scrape_worker.py --queue /shared/scrape-queue
+    python scrape_all.py --queue /shared/scrape-queue
+Start as many workers as wanted, each runs one scraper at a time. A worker
+that is stopped or dies loses its lease and its job goes to another worker.
+"""
+__author__ = "JHU-COVID-QA"
+__copyright__ = "Copyright 2020, Johns Hopkins University"
+__credits__ = ["JHU-COVID-QA"]
+__license__ = "Apache 2.0"
+__version__ = "0.1"
+__maintainer__ = "JHU-COVID-QA"
+__email__ = "covidqa@jhu.edu"
+__status__ = "Development"
+
+import argparse
+from covid_scraping import distributed
+
+
+def get_args():
+    parser = argparse.ArgumentParser(
+        description='Run the scrape jobs of a queue')
+    parser.add_argument('--queue', type=str, required=True,
+                        help='The queue scrape_all.py --queue submits to, a directory or a .sqlite file')
+    parser.add_argument('--lease', type=float, default=60,
+                        help='Seconds without renewal after which a job goes to another worker')
+    parser.add_argument('--until-empty', action='store_true',
+                        help='Stop once no job is waiting instead of waiting for more')
+    args = parser.parse_args()
+    return args
+
+
+def main():
+    args = get_args()
+    distributed.work(args.queue, lease=args.lease, until_empty=args.until_empty)
+
+
+if __name__ == '__main__':
+    main()
@@ -16,16 +16,19 @@ __email__ = "covidqa@jhu.edu"
 __status__ = "Development"
 
 import time
-import requests
 from bs4 import BeautifulSoup
-from covid_scraping import Conversion, Scraper
+from covid_scraping import Conversion, Scraper, fetch
 
 
 class TexasHumanResourceScraper(Scraper):
+    prefix = 'TexasHR'
+    hosts = ['www.dshs.state.tx.us']
+    cost = 'light'
+
     def scrape(self):
         name = 'Texas Human Resources'
         url = 'https://www.dshs.state.tx.us/coronavirus/faq.aspx'
-        html = requests.get(url, verify=False).text
+        html = fetch.get(url, verify=False).text
         soup = BeautifulSoup(html, "lxml")
 
         # faq is in the second div
@@ -17,12 +17,14 @@ __status__ = "Development"
 
 import dateparser
 import time
-import requests
 from bs4 import BeautifulSoup, NavigableString, CData, Tag
-from covid_scraping import Conversion, Scraper
+from covid_scraping import Conversion, Scraper, fetch
 
 
 class VermontGovScraper(Scraper):
+    prefix = 'Vermont'
+    hosts = ['apps.health.vermont.gov']
+    cost = 'light'
 
     def _extract_question(self, x):
         return str(x.find('h4'))
@@ -33,7 +35,7 @@ class VermontGovScraper(Scraper):
     def scrape(self):
         name = 'Vermont Department of Health'
         url = 'https://apps.health.vermont.gov/COVID/faq/'
-        html = requests.get(url).text
+        html = fetch.get(url).text
 
         lastUpdateTime = time.mktime(dateparser.parse(BeautifulSoup(html, "lxml").find('p', {'class' : 'subtitle'})\
                         .getText().split('Updated:')[1].strip()).timetuple())
@@ -20,11 +20,10 @@ import time
 import pprint
 import uuid
 from urllib import request, response, error, parse
-from urllib.request import urlopen
 from bs4 import BeautifulSoup, NavigableString, CData, Tag
 import json
 import jsonlines
-from covid_scraping import Conversion, Scraper
+from covid_scraping import Conversion, Scraper, fetch
 
 '''
 <div class="sf-content-block content-block" >
@@ -46,9 +45,13 @@ Originally written by @KentonMurray so direct questions to him
 
 
 class WhoMythScraper(Scraper):
+    prefix = 'WhoMyth'
+    hosts = ['www.who.int']
+    cost = 'light'
+
     def scrape(self):
         url = 'https://www.who.int/emergencies/diseases/novel-coronavirus-2019/advice-for-public/myth-busters'
-        html = urlopen(url)
+        html = fetch.get(url).content
         soup = BeautifulSoup(html, "lxml")
         qas_plus_some = soup.find_all(
             'div', class_='sf-content-block content-block')
@@ -2,6 +2,8 @@ from covid_scraping import Conversion, test_jsonlines
 import subprocess
 import jsonlines
 import unittest
+from unittest import mock
+from covid_scraping import utils
 import time
 
 class TestConversion(unittest.TestCase):
@@ -147,7 +149,7 @@ class TestConversion(unittest.TestCase):
         self.assertEqual(q_uuid, new_q_uuid)
         self.assertEqual(a_uuid, new_a_uuid)
         subprocess.run(
-            ['rm', './schema_v0.3/test_uuid_preservation_v0.3.jsonl'])
+            ['rm', '-f', './schema_v0.3/test_uuid_preservation_v0.3.jsonl', './schema_v0.3/test_uuid_preservation_v0.3.index.json'])
 
     def test_uuid_preservation_new_responce(self):
         subprocess.run(
@@ -200,7 +202,7 @@ class TestConversion(unittest.TestCase):
         self.assertEqual(q_uuid, new_q_uuid)
         self.assertNotEqual(a_uuid, new_a_uuid)
         subprocess.run(
-            ['rm', './schema_v0.3/test_uuid_preservation_v0.3.jsonl'])
+            ['rm', '-f', './schema_v0.3/test_uuid_preservation_v0.3.jsonl', './schema_v0.3/test_uuid_preservation_v0.3.index.json'])
 
     def test_id_preservation_no_change(self):
         subprocess.run(
@@ -249,7 +251,7 @@ class TestConversion(unittest.TestCase):
             new_id = line['ID']
         self.assertEqual(id, new_id)
         subprocess.run(
-            ['rm', './schema_v0.3/test_id_preservation_v0.3.jsonl'])
+            ['rm', '-f', './schema_v0.3/test_id_preservation_v0.3.jsonl', './schema_v0.3/test_id_preservation_v0.3.index.json'])
 
     def test_id_preservation_fuzzy_change(self):
         subprocess.run(
@@ -298,7 +300,7 @@ class TestConversion(unittest.TestCase):
             new_id = line['ID']
         self.assertEqual(id, new_id)
         subprocess.run(
-            ['rm', './schema_v0.3/test_id_preservation_v0.3.jsonl'])
+            ['rm', '-f', './schema_v0.3/test_id_preservation_v0.3.jsonl', './schema_v0.3/test_id_preservation_v0.3.index.json'])
 
     def test_time_consistency(self):
         subprocess.run(
@@ -344,7 +346,7 @@ class TestConversion(unittest.TestCase):
             dateLastChanged_1 = line['dateLastChanged']
         self.assertEqual(dateLastChanged_0, dateLastChanged_1)
         subprocess.run(
-            ['rm', './schema_v0.3/test_time_consistency_v0.3.jsonl'])
+            ['rm', '-f', './schema_v0.3/test_time_consistency_v0.3.jsonl', './schema_v0.3/test_time_consistency_v0.3.index.json'])
 
     def test_remove_unseen(self):
         subprocess.run(
@@ -388,5 +390,43 @@ class TestConversion(unittest.TestCase):
         with open('./schema_v0.3/test_remove_unseen_v0.3.jsonl') as reader:
             self.assertEqual(len(reader.readlines()), 1)
 
+    def test_skip_unchanged_examples(self):
+        example = {
+            'sourceUrl': 'skip.com',
+            'sourceName': "skip",
+            "needUpdate": True,
+            "typeOfInfo": "QA",
+            "isAnnotated": False,
+            "responseAuthority": "",
+            "question": 'Is this question written only once?',
+            "answer": 'Yes, the second write is skipped.',
+            "hasAnswer": True,
+            "targetEducationLevel": "NA",
+            "topic": ['topic1', 'topic2'],
+            "extraData": {'hello': 'goodbye'},
+            "targetLocation": "US",
+            "language": 'en',
+        }
+        subprocess.run(
+            ['rm', '-f', './schema_v0.3/test_skip_unchanged_v0.3.jsonl', './schema_v0.3/test_skip_unchanged_v0.3.index.json'])
+        converter = Conversion('test_skip_unchanged', '.')
+        converter.addExample(example)
+        self.assertEqual(converter.write(), True)
+        with mock.patch.object(utils, 'merge', wraps=utils.merge) as merge:
+            converter = Conversion('test_skip_unchanged', '.')
+            converter.addExample(dict(example))
+            self.assertEqual(converter.write(), True)
+            self.assertEqual(merge.call_count, 0)
+            # An edited gold file is merged again even if the examples are the same.
+            with open('./schema_v0.3/test_skip_unchanged_v0.3.jsonl', 'a') as fp:
+                fp.write('\n')
+            converter = Conversion('test_skip_unchanged', '.')
+            converter.addExample(dict(example))
+            self.assertEqual(converter.write(), True)
+            self.assertEqual(merge.call_count, 1)
+        subprocess.run(
+            ['rm', '-f', './schema_v0.3/test_skip_unchanged_v0.3.jsonl', './schema_v0.3/test_skip_unchanged_v0.3.index.json'])
+
+
 if __name__ == '__main__':
     unittest.main()
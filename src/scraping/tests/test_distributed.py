@@ -0,0 +1,186 @@
+from covid_scraping import distributed, registry
+from covid_scraping.jobqueue import open_queue
+import multiprocessing
+import os
+import shutil
+import signal
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+_scrapers = '''
+import os
+import time
+from covid_scraping import Scraper
+
+
+class _Writer(Scraper):
+    def _write(self, text):
+        with open(os.path.join(self._path, 'schema_v0.3', self._filename + '_v0.3.jsonl'), 'a') as fp:
+            fp.write(text)
+
+
+class AppendingScraper(_Writer):
+    prefix = 'Appending'
+    hosts = ['one.example.com']
+
+    def scrape(self):
+        self._write('{"new": 1}\\n')
+        return True
+
+
+class UnchangedScraper(_Writer):
+    prefix = 'Unchanged'
+    hosts = ['one.example.com']
+
+    def scrape(self):
+        return True
+
+
+class HangingScraper(_Writer):
+    prefix = 'Hanging'
+
+    def scrape(self):
+        marker = os.environ['DISTRIBUTED_TEST_MARKER']
+        if not os.path.exists(marker):
+            open(marker, 'w').close()
+            time.sleep(10)
+        self._write('{"second": 1}\\n')
+        return True
+
+
+class FailingScraper(_Writer):
+    prefix = 'Failing'
+    hosts = ['two.example.com']
+
+    def scrape(self):
+        self._write('{"half": 1}\\n')
+        raise ValueError('the page layout changed')
+'''
+
+
+def _work(location, lease=2):
+    distributed.work(location, lease=lease, interval=0.1)
+
+
+class TestDistributed(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        with open(os.path.join(self.directory, 'distributed_scrapers.py'), 'w') as fp:
+            fp.write(_scrapers)
+        sys.path.insert(0, self.directory)
+        self.path = os.path.join(self.directory, 'data')
+        os.makedirs(os.path.join(self.path, 'schema_v0.3'))
+        for prefix in ['Appending', 'Unchanged', 'Failing', 'Hanging']:
+            with open(os.path.join(self.path, 'schema_v0.3', prefix + '_v0.3.jsonl'), 'w') as fp:
+                fp.write('{"old": 1}\n')
+
+    def tearDown(self):
+        sys.path.remove(self.directory)
+        shutil.rmtree(self.directory)
+
+    def _gold(self, prefix):
+        with open(os.path.join(self.path, 'schema_v0.3', prefix + '_v0.3.jsonl')) as fp:
+            return fp.read()
+
+    def test_coordinate(self):
+        location = os.path.join(self.directory, 'queue')
+        infos = registry.select(registry.discover(self.directory), exclude=['Hanging'])
+        workers = [multiprocessing.Process(target=_work, args=(location,)) for _ in range(2)]
+        for worker in workers:
+            worker.start()
+        try:
+            results = distributed.coordinate(open_queue(location), infos, self.path,
+                                             os.path.join(self.directory, 'staging'), interval=0.1)
+        finally:
+            for worker in workers:
+                worker.terminate()
+                worker.join()
+        self.assertEqual([(r.name, r.status) for r in results],
+                         [('AppendingScraper', 'ok'), ('FailingScraper', 'failed'), ('UnchangedScraper', 'ok')])
+        self.assertIn('the page layout changed', results[1].record['error'])
+        # Only the successful jobs are committed.
+        self.assertEqual(self._gold('Appending'), '{"old": 1}\n{"new": 1}\n')
+        self.assertEqual(self._gold('Failing'), '{"old": 1}\n')
+        self.assertEqual(self._gold('Unchanged'), '{"old": 1}\n')
+        self.assertEqual(os.listdir(os.path.join(self.directory, 'staging')), [])
+
+    def test_no_workers(self):
+        location = os.path.join(self.directory, 'queue')
+        infos = registry.select(registry.discover(self.directory), only=['Appending', 'Failing'])
+        start = time.time()
+        results = distributed.coordinate(open_queue(location), infos, self.path,
+                                         os.path.join(self.directory, 'staging'), interval=0.1,
+                                         claim_timeout=0.5)
+        self.assertLess(time.time() - start, 10)
+        self.assertEqual([r.status for r in results], ['lost', 'lost'])
+        self.assertIn('no worker claimed', results[0].record['error'])
+        self.assertEqual(self._gold('Appending'), '{"old": 1}\n')
+        # No claim timeout, the run timeout ends it.
+        results = distributed.coordinate(open_queue(location), infos, self.path,
+                                         os.path.join(self.directory, 'staging'), interval=0.1,
+                                         run_timeout=0.5)
+        self.assertEqual([r.status for r in results], ['timeout', 'timeout'])
+        with self.assertRaises(ValueError):
+            distributed.coordinate(open_queue(location), infos, self.path,
+                                   os.path.join(self.directory, 'staging'), per_host=0)
+
+    def test_dead_worker(self):
+        # The job of a worker that dies goes to another worker once the lease runs out.
+        location = os.path.join(self.directory, 'queue.sqlite')
+        marker = os.path.join(self.directory, 'first_attempt')
+        os.environ['DISTRIBUTED_TEST_MARKER'] = marker
+        infos = registry.select(registry.discover(self.directory), only=['Hanging'])
+        first = multiprocessing.Process(target=_work, args=(location, 0.5))
+        second = multiprocessing.Process(target=_work, args=(location, 0.5))
+
+        def kill_first():
+            while not os.path.exists(marker):
+                time.sleep(0.05)
+            os.kill(first.pid, signal.SIGKILL)
+            second.start()
+
+        first.start()
+        killer = threading.Thread(target=kill_first)
+        killer.start()
+        try:
+            results = distributed.coordinate(open_queue(location), infos, self.path,
+                                             os.path.join(self.directory, 'staging'), interval=0.1)
+        finally:
+            killer.join()
+            for worker in [first, second]:
+                if worker.is_alive():
+                    worker.terminate()
+                worker.join()
+            del os.environ['DISTRIBUTED_TEST_MARKER']
+        self.assertEqual(results[0].status, 'ok')
+        self.assertEqual(self._gold('Hanging'), '{"old": 1}\n{"second": 1}\n')
+
+    def test_lost_lease(self):
+        # A worker whose claim was taken over stops its scraper and reports nothing.
+        location = os.path.join(self.directory, 'queue')
+        os.environ['DISTRIBUTED_TEST_MARKER'] = os.path.join(self.directory, 'first_attempt')
+        queue = open_queue(location)
+        info = registry.select(registry.discover(self.directory), only=['Hanging'])[0]
+        staging = os.path.join(self.directory, 'staging')
+        distributed._stage_input(info, self.path, None, os.path.join(staging, 'input'))
+        job_id = queue.submit({'kind': 'scrape', 'scraper': dict(info._asdict()),
+                               'input': os.path.join(staging, 'input'), 'staging': staging, 'timeout': 60})
+        claimed_id, job = queue.claim(lease=0.1)
+        # The lease runs out before the first renewal, after a second.
+        threading.Timer(0.5, queue.expire).start()
+        start = time.time()
+        try:
+            self.assertIsNone(distributed.run_job(location, claimed_id, job, 3))
+        finally:
+            del os.environ['DISTRIBUTED_TEST_MARKER']
+        self.assertLess(time.time() - start, 5)
+        self.assertEqual(queue.state(job_id), 'new')
+        self.assertEqual(os.listdir(staging), ['input'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+from covid_scraping import fetch
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+PAGE = '<html><body><h3>Was ist COVID-19?</h3><p>Eine Krankheit.</p></body></html>'.encode('utf-8')
+
+
+class ETagHandler(BaseHTTPRequestHandler):
+    full_responses = 0
+
+    def do_GET(self):
+        if self.headers.get('If-None-Match') == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+        ETagHandler.full_responses += 1
+        self.send_response(200)
+        self.send_header('ETag', '"v1"')
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(PAGE)))
+        self.end_headers()
+        self.wfile.write(PAGE)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestFetch(unittest.TestCase):
+
+    def setUp(self):
+        self._cache_dir = fetch.cache_dir
+        fetch.cache_dir = tempfile.mkdtemp()
+        self.server = HTTPServer(('127.0.0.1', 0), ETagHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = 'http://127.0.0.1:%d/faq.html' % self.server.server_port
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(fetch.cache_dir)
+        fetch.cache_dir = self._cache_dir
+
+    def test_conditional_get(self):
+        ETagHandler.full_responses = 0
+        first = fetch.get(self.url)
+        not_modified = fetch.stats['not_modified']
+        second = fetch.get(self.url + '#question-2')
+        self.assertEqual(ETagHandler.full_responses, 1)
+        self.assertEqual(fetch.stats['not_modified'], not_modified + 1)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.content, PAGE)
+        self.assertEqual(second.text, first.text)
+
+    def test_without_cache(self):
+        ETagHandler.full_responses = 0
+        fetch.get(self.url)
+        fetch.get(self.url, use_cache=False)
+        self.assertEqual(ETagHandler.full_responses, 2)
+
+    def test_record_replay(self):
+        ETagHandler.full_responses = 0
+        fixture_dir, mode = fetch.fixture_dir, fetch.mode
+        fetch.fixture_dir = tempfile.mkdtemp()
+        try:
+            fetch.mode = 'record'
+            fetch.get(self.url, use_cache=False)
+            fetch.get(self.url + '?copy', use_cache=False)
+            fetch.mode = 'replay'
+            replayed = fetch.get(self.url + '#question-2')
+            self.assertEqual(ETagHandler.full_responses, 2)
+            self.assertEqual(replayed.status_code, 200)
+            self.assertEqual(replayed.text, PAGE.decode('utf-8'))
+            # Both urls got the same page, its body is stored once.
+            objects = [name for _, _, names in os.walk(os.path.join(fetch.fixture_dir, 'objects')) for name in names]
+            self.assertEqual(len(objects), 1)
+            with self.assertRaises(LookupError):
+                fetch.get(self.url + '?never-recorded')
+        finally:
+            shutil.rmtree(fetch.fixture_dir)
+            fetch.fixture_dir, fetch.mode = fixture_dir, mode
+
+
+if __name__ == '__main__':
+    unittest.main()
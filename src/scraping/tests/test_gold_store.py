@@ -0,0 +1,68 @@
+from covid_scraping import Conversion
+from covid_scraping.gold_store import GoldStore
+import subprocess
+import unittest
+from unittest import mock
+import uuid
+
+
+class TestGoldStore(unittest.TestCase):
+
+    def _example(self, question, answer):
+        return {
+            'sourceUrl': 'store.com',
+            'sourceName': "store",
+            "needUpdate": True,
+            "typeOfInfo": "QA",
+            "isAnnotated": False,
+            "responseAuthority": "",
+            "question": question,
+            "answer": answer,
+            "hasAnswer": True,
+            "targetEducationLevel": "NA",
+            "topic": ['topic1', 'topic2'],
+            "extraData": {'hello': 'goodbye'},
+            "targetLocation": "US",
+            "language": 'en',
+        }
+
+    def _write(self, examples, merge_time, store=None):
+        # The same UUIDs and time stamps for either backend, so their output can be compared.
+        uuids = (uuid.UUID(int=n) for n in range(1000))
+        with mock.patch('uuid.uuid1', side_effect=lambda: next(uuids)), \
+                mock.patch('time.time', return_value=merge_time):
+            converter = Conversion('test_store_file' if store is None else 'test_store', '.', store=store)
+            for example in examples:
+                converter.addExample(example)
+            return converter.write()
+
+    def test_store_matches_jsonl(self):
+        files = ['./schema_v0.3/test_store_file_v0.3.jsonl', './schema_v0.3/test_store_file_v0.3.index.json',
+                 './schema_v0.3/test_store_v0.3.jsonl', './schema_v0.3/test_store_v0.3.index.json',
+                 './test_gold_store.sqlite', './test_gold_store.sqlite-wal', './test_gold_store.sqlite-shm']
+        subprocess.run(['rm', '-f'] + files)
+        store = GoldStore('./test_gold_store.sqlite')
+        first = [self._example('What is COVID-19?', 'A disease caused by a coronavirus.'),
+                 self._example('How does it spread?', 'Mainly from person to person.')]
+        second = [self._example('What is COVID-19?', 'An illness that was first found in 2019.'),
+                  self._example('How does it spread?', 'Mainly from person to person.'),
+                  self._example('Should I wear a mask?', 'Yes, in public settings.')]
+        for examples, merge_time in [(first, 1.0), (second, 2.0)]:
+            self.assertTrue(self._write(examples, merge_time))
+            self.assertTrue(self._write(examples, merge_time, store))
+        self.assertEqual([row['questionText'] for row in store.rows('test_store')],
+                         ['How does it spread?', 'What is COVID-19?', 'Should I wear a mask?'])
+        self.assertEqual(store.export('./schema_v0.3'), ['./schema_v0.3/test_store_v0.3.jsonl'])
+        with open('./schema_v0.3/test_store_file_v0.3.jsonl', 'rb') as fp, \
+                open('./schema_v0.3/test_store_v0.3.jsonl', 'rb') as exported:
+            self.assertEqual(fp.read(), exported.read())
+        # Saving the same rows again writes nothing, dropping one only deletes it.
+        rows = store.rows('test_store')
+        self.assertEqual(store.save('test_store', rows), {'written': 0, 'deleted': 0, 'unchanged': 3})
+        self.assertEqual(store.save('test_store', rows[:2]), {'written': 0, 'deleted': 1, 'unchanged': 2})
+        store.close()
+        subprocess.run(['rm', '-f'] + files)
+
+
+if __name__ == '__main__':
+    unittest.main()
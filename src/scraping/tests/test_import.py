@@ -0,0 +1,33 @@
+import json
+import subprocess
+import sys
+import unittest
+
+# Seconds `import covid_scraping` may take in a fresh interpreter, the best of a few tries.
+import_budget = 0.5
+# Loaded on first use only, never by the import itself.
+heavy_modules = ['spacy', 'pandas', 'numpy', 'bs4', 'fuzzywuzzy', 'jsonlines', 'requests']
+
+_probe = '''
+import json, sys, time
+start = time.perf_counter()
+import covid_scraping
+seconds = time.perf_counter() - start
+print(json.dumps([seconds, [m for m in %r if m in sys.modules]]))
+''' % heavy_modules
+
+
+class TestImport(unittest.TestCase):
+
+    def test_import_budget(self):
+        runs = []
+        for _ in range(3):
+            out = subprocess.run([sys.executable, '-c', _probe], stdout=subprocess.PIPE,
+                                 universal_newlines=True, check=True).stdout
+            runs.append(json.loads(out))
+        self.assertEqual(runs[0][1], [])
+        self.assertLess(min(seconds for seconds, _ in runs), import_budget)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+from covid_scraping.jobqueue import open_queue
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+
+def _claim_all(location):
+    queue = open_queue(location)
+    claimed = []
+    while True:
+        job = queue.claim()
+        if job is None:
+            return claimed
+        claimed.append(job[1]['n'])
+        queue.finish(job[0], {'n': job[1]['n']})
+
+
+class TestJobQueue(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.location = self.directory
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_submit_claim_finish(self):
+        queue = open_queue(self.location)
+        first = queue.submit({'kind': 'validate', 'args': []})
+        second = queue.submit({'kind': 'release', 'args': ['--path', 'x']})
+        job_id, job = queue.claim()
+        self.assertEqual((job_id, job['kind']), (first, 'validate'))
+        self.assertIsNone(queue.result(first))
+        queue.finish(first, {'exitcode': 0})
+        self.assertEqual(queue.wait(first, timeout=1), {'exitcode': 0})
+        self.assertEqual(queue.claim()[0], second)
+        self.assertIsNone(queue.claim())
+        self.assertIsNone(queue.wait(second, timeout=0.1, interval=0.05))
+
+    def test_withdraw(self):
+        queue = open_queue(self.location)
+        first = queue.submit({'kind': 'scrape'})
+        second = queue.submit({'kind': 'scrape'})
+        self.assertEqual(queue.state(first), 'new')
+        self.assertEqual(queue.claim()[0], first)
+        self.assertEqual(queue.state(first), 'running')
+        self.assertFalse(queue.withdraw(first, {'status': 'lost'}))
+        self.assertTrue(queue.withdraw(second, {'status': 'lost'}))
+        self.assertEqual(queue.state(second), 'done')
+        self.assertEqual(queue.result(second), {'status': 'lost'})
+        self.assertIsNone(queue.claim())
+        self.assertIsNone(queue.state('unknown'))
+
+    def test_each_job_claimed_once(self):
+        queue = open_queue(self.location)
+        ids = [queue.submit({'n': n}) for n in range(40)]
+        with multiprocessing.Pool(4) as pool:
+            claimed = pool.map(_claim_all, [self.location] * 4)
+        self.assertEqual(sorted(n for part in claimed for n in part), list(range(40)))
+        self.assertEqual([queue.result(job_id)['n'] for job_id in ids], list(range(40)))
+
+    def test_leases(self):
+        queue = open_queue(self.location)
+        job_id = queue.submit({'kind': 'scrape'})
+        self.assertEqual(queue.claim(lease=0.2)[0], job_id)
+        self.assertEqual(queue.expire(), [])
+        time.sleep(0.3)
+        self.assertTrue(queue.renew(job_id, 0, 0.2))
+        self.assertEqual(queue.expire(), [])
+        time.sleep(0.3)
+        # The worker died, the job goes to the next one.
+        self.assertEqual(queue.expire(), [job_id])
+        self.assertFalse(queue.renew(job_id, 0, 0.2))
+        claimed = queue.claim(lease=0.1)
+        self.assertEqual((claimed[0], claimed[1]['attempts']), (job_id, 1))
+        time.sleep(0.2)
+        self.assertEqual(queue.expire(max_attempts=2), [job_id])
+        self.assertIsNone(queue.claim())
+        self.assertEqual(queue.result(job_id)['status'], 'lost')
+        # Without a lease a claim lasts until the job is finished.
+        job_id = queue.submit({'kind': 'scrape'})
+        queue.claim()
+        time.sleep(0.1)
+        self.assertEqual(queue.expire(), [])
+
+    def test_stale_claim(self):
+        queue = open_queue(self.location)
+        job_id = queue.submit({'kind': 'scrape'})
+        first = queue.claim(lease=0.1)[1].get('attempts', 0)
+        time.sleep(0.2)
+        self.assertEqual(queue.expire(), [job_id])
+        second = queue.claim(lease=60)[1]['attempts']
+        self.assertEqual((first, second), (0, 1))
+        # The first worker's lease ran out, the job is the second worker's.
+        self.assertFalse(queue.renew(job_id, first, 60))
+        self.assertFalse(queue.finish(job_id, {'worker': 'first'}, first))
+        self.assertEqual(queue.state(job_id), 'running')
+        self.assertTrue(queue.renew(job_id, second, 60))
+        self.assertTrue(queue.finish(job_id, {'worker': 'second'}, second))
+        self.assertEqual(queue.result(job_id), {'worker': 'second'})
+        self.assertFalse(queue.renew(job_id, second, 60))
+
+
+class TestSQLiteQueue(TestJobQueue):
+
+    def setUp(self):
+        super().setUp()
+        self.location = os.path.join(self.directory, 'queue.sqlite')
+
+
+if __name__ == '__main__':
+    unittest.main()
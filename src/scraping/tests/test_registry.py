@@ -0,0 +1,92 @@
+from covid_scraping import registry
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+_cheap = '''
+from covid_scraping import Scraper
+
+
+class CheapScraper(Scraper):
+    prefix = 'Cheap'
+    hosts = ['cheap.example.com']
+
+    def scrape(self):
+        return True
+
+
+class Helper():
+    pass
+'''
+
+# Importing this module fails, as a scraper with a missing dependency does.
+_browser = '''
+import a_browser_driver_that_is_not_installed
+from covid_scraping import Scraper
+
+
+class BrowserScraper(Scraper):
+    prefix = 'Browser'
+    hosts = ['browser.example.com']
+    cost = 'browser'
+'''
+
+
+class TestRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        for module, source in [('registry_cheap', _cheap), ('registry_browser', _browser)]:
+            with open(os.path.join(self.directory, module + '.py'), 'w') as fp:
+                fp.write(source)
+        sys.path.insert(0, self.directory)
+
+    def tearDown(self):
+        sys.path.remove(self.directory)
+        sys.modules.pop('registry_cheap', None)
+        shutil.rmtree(self.directory)
+
+    def test_discover(self):
+        infos = registry.discover(self.directory)
+        self.assertEqual(sorted(infos), ['BrowserScraper', 'CheapScraper'])
+        self.assertEqual(infos['CheapScraper'].prefix, 'Cheap')
+        self.assertEqual(infos['CheapScraper'].hosts, ['cheap.example.com'])
+        self.assertEqual(infos['CheapScraper'].cost, 'light')
+        self.assertEqual(infos['BrowserScraper'].module, 'registry_browser')
+        self.assertNotIn('registry_cheap', sys.modules)
+
+    def test_select_and_load(self):
+        infos = registry.discover(self.directory)
+        self.assertEqual([info.name for info in registry.select(infos)], ['BrowserScraper', 'CheapScraper'])
+        self.assertEqual([info.name for info in registry.select(infos, exclude=['browser'])], ['CheapScraper'])
+        self.assertEqual([info.name for info in registry.select(infos, only=['Cheap'])], ['CheapScraper'])
+        self.assertEqual(registry.select(infos, modules={'registry_other'}), [])
+        shards = [registry.select(infos, shard=(index, 2)) for index in range(2)]
+        self.assertEqual(sorted(info.name for shard in shards for info in shard), sorted(infos))
+        self.assertEqual([len(shard) for shard in shards], [1, 1])
+        # Only the chosen scraper is imported, the broken one never is.
+        scraper = registry.load(registry.select(infos, exclude=['BrowserScraper'])[0], path='.')
+        self.assertEqual(scraper._filename, 'Cheap')
+        self.assertTrue(scraper.scrape())
+
+    def test_unknown_cost(self):
+        with open(os.path.join(self.directory, 'registry_cheap.py'), 'a') as fp:
+            fp.write("\n\nclass PricyScraper(Scraper):\n    prefix = 'Pricy'\n    cost = 'pricy'\n")
+        with self.assertRaises(ValueError):
+            registry.discover(self.directory)
+
+    def test_scrapers(self):
+        infos = registry.discover('../scrapers')
+        prefixes = [info.prefix for info in infos.values()]
+        self.assertEqual(len(prefixes), len(set(prefixes)))
+        self.assertEqual(infos['OregonGovScraper'].cost, 'browser')
+        self.assertEqual(infos['NewYorkTimesScraper'].hosts, ['www.nytimes.com'])
+        with self.assertRaises(subprocess.CalledProcessError):
+            registry.changed_modules('../scrapers', 'no-such-revision')
+
+
+if __name__ == '__main__':
+    unittest.main()
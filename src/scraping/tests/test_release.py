@@ -0,0 +1,77 @@
+from covid_scraping import release
+import importlib.util
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import jsonlines
+import unittest
+
+
+class TestRelease(unittest.TestCase):
+
+    def test_incremental_release(self):
+        path = './release_test'
+        subprocess.run(['rm', '-rf', path])
+        subprocess.run(['mkdir', path])
+        with jsonlines.open('./schema_v0.2/test_v0.2.jsonl') as reader:
+            examples = list(reader)
+        other = dict(examples[0], questionText='Another question?', sourceUrl='https://example.org')
+        with jsonlines.open(path + '/a_v0.2.jsonl', 'w') as writer:
+            writer.write_all(examples)
+        with jsonlines.open(path + '/b_v0.2.jsonl', 'w') as writer:
+            writer.write_all([other, other])
+        manifest = release.update_manifest(path)
+        self.assertEqual(manifest['changed'], ['a_v0.2.jsonl', 'b_v0.2.jsonl'])
+        self.assertEqual(manifest['sources']['b_v0.2.jsonl']['rows'], 2)
+        self.assertEqual(release.update_manifest(path)['changed'], [])
+        examples[0]['answerText'] = 'A new answer.'
+        with jsonlines.open(path + '/a_v0.2.jsonl', 'w') as writer:
+            writer.write_all(examples)
+        manifest = release.update_manifest(path)
+        self.assertEqual(manifest['changed'], ['a_v0.2.jsonl'])
+        release.write_tsv(path, manifest, path + '/incremental.tsv')
+        # A build from scratch has to give the same file.
+        subprocess.run(['rm', '-rf', path + '/' + release.fragment_dir, path + '/' + release.manifest_name])
+        manifest = release.update_manifest(path)
+        self.assertEqual(len(manifest['changed']), 2)
+        release.write_tsv(path, manifest, path + '/scratch.tsv')
+        with open(path + '/incremental.tsv') as incremental, open(path + '/scratch.tsv') as scratch:
+            text = incremental.read()
+            self.assertEqual(text, scratch.read())
+        self.assertIn('A new answer.', text)
+        self.assertEqual(len(text.splitlines()), 1 + len(examples) + 2)
+        self.assertEqual(release.release_counts(manifest)[:2], (2, len(examples) + 2))
+        subprocess.run(['rm', '-rf', path])
+
+    @unittest.skipUnless(importlib.util.find_spec('pyarrow'), 'needs pyarrow')
+    def test_parquet(self):
+        import pyarrow.parquet
+        sys.path.insert(0, '../scrapers')
+        try:
+            import make_public
+        finally:
+            sys.path.remove('../scrapers')
+        directory = tempfile.mkdtemp()
+        try:
+            paths = ['./schema_v0.2/test_v0.2.jsonl']
+            make_public.write_parquet(paths, os.path.join(directory, 'scraped.parquet'))
+            self.assertEqual(os.listdir(directory), ['scraped.parquet'])
+            table = pyarrow.parquet.read_table(os.path.join(directory, 'scraped.parquet')).to_pydict()
+        finally:
+            shutil.rmtree(directory)
+        rows = release.read_released(paths)
+        columns = next(rows)
+        self.assertEqual(list(table), columns)
+        typed = make_public._column_types()
+        expected = {column: [] for column in columns}
+        for row in rows:
+            for column, value in zip(columns, row):
+                expected[column].append(value if column in typed else make_public._json_text(value))
+        self.assertEqual(table, expected)
+        self.assertIs(typed['hasAnswer'], bool)
+
+
+if __name__ == '__main__':
+    unittest.main()
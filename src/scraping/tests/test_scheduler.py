@@ -0,0 +1,121 @@
+from covid_scraping import Scraper, instrument
+from covid_scraping.scheduler import run_scrapers, format_report
+import unittest
+import threading
+import time
+
+
+class SleepScraper(Scraper):
+    hosts = ['example.com']
+
+    def __init__(self, seconds, result=True, **kwargs):
+        super().__init__(path='.', filename='sleep', **kwargs)
+        self._seconds = seconds
+        self._result = result
+
+    def scrape(self):
+        time.sleep(self._seconds)
+        return self._result
+
+
+class OtherHostScraper(SleepScraper):
+    hosts = ['other.example.com']
+
+
+class RaisingScraper(Scraper):
+
+    def scrape(self):
+        raise ValueError('the page layout changed')
+
+
+class MergingScraper(Scraper):
+
+    def scrape(self):
+        instrument.counts['examples'] += 3
+        with instrument.timed('merge'):
+            time.sleep(0.2)
+        return True
+
+
+class TestScheduler(unittest.TestCase):
+
+    def test_results_in_order(self):
+        scrapers = [SleepScraper(0), SleepScraper(0, result=False), RaisingScraper(path='.', filename='raise')]
+        results = run_scrapers(scrapers)
+        self.assertEqual([r.success for r in results], [True, False, False])
+        self.assertEqual([r.status for r in results], ['ok', 'failed', 'failed'])
+        self.assertEqual(results[2].name, 'RaisingScraper')
+        self.assertIn('RaisingScraper', format_report(results))
+
+    def test_records(self):
+        slow = OtherHostScraper(30)
+        slow.timeout = 0.5
+        results = run_scrapers([MergingScraper(path='.', filename='merging'), RaisingScraper(path='.', filename='raise'),
+                                slow])
+        records = [result.record for result in results]
+        self.assertEqual(records[0]['file'], 'merging')
+        self.assertEqual(records[0]['examples'], 3)
+        self.assertGreaterEqual(records[0]['seconds']['merge'], 0.2)
+        self.assertIn('the page layout changed', records[1]['error'])
+        self.assertEqual(records[2]['status'], 'timeout')
+        summary = instrument.aggregate(records)
+        self.assertEqual(summary['failed'], ['RaisingScraper', 'OtherHostScraper'])
+        self.assertEqual(summary['examples'], 3)
+        self.assertIn('2 failed', instrument.format_summary(summary))
+
+    def test_threads(self):
+        # Downloads running at once count as the wall time they cover, not the sum.
+        instrument.reset()
+
+        def download():
+            with instrument.timed('fetch'):
+                time.sleep(0.3)
+            for _ in range(1000):
+                instrument.count('pages')
+
+        threads = [threading.Thread(target=download) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertGreaterEqual(instrument.seconds['fetch'], 0.3)
+        self.assertLess(instrument.seconds['fetch'], 1.0)
+        self.assertEqual(instrument.counts['pages'], 8000)
+        instrument.reset()
+
+    def test_timeout(self):
+        slow = OtherHostScraper(30)
+        slow.timeout = 0.5
+        start = time.time()
+        results = run_scrapers([slow, SleepScraper(0)], timeout=60)
+        self.assertLess(time.time() - start, 10)
+        self.assertEqual(results[0].status, 'timeout')
+        self.assertFalse(results[0].success)
+        self.assertTrue(results[1].success)
+
+    def test_limits(self):
+        with self.assertRaises(ValueError):
+            run_scrapers([SleepScraper(0)], per_host=0)
+        with self.assertRaises(ValueError):
+            run_scrapers([SleepScraper(0)], max_workers=0)
+
+    def test_stop(self):
+        stop = threading.Event()
+        threading.Timer(0.5, stop.set).start()
+        start = time.time()
+        results = run_scrapers([SleepScraper(30), SleepScraper(0)], timeout=None, stop=stop)
+        self.assertLess(time.time() - start, 10)
+        self.assertEqual([r.status for r in results], ['stopped', 'stopped'])
+
+    def test_concurrency(self):
+        # Different hosts run side by side, the same host runs one at a time.
+        start = time.time()
+        run_scrapers([SleepScraper(1), OtherHostScraper(1)], per_host=1)
+        self.assertLess(time.time() - start, 1.9)
+        start = time.time()
+        run_scrapers([SleepScraper(1), SleepScraper(1)], per_host=1)
+        self.assertGreaterEqual(time.time() - start, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
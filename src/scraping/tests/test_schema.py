@@ -0,0 +1,68 @@
+from covid_scraping import test_dump_to_schema
+from covid_scraping.test_dump_to_schema import validate_corpus, validate_example, validate_file
+import subprocess
+import jsonlines
+import unittest
+
+
+class TestSchema(unittest.TestCase):
+
+    def _examples(self):
+        with jsonlines.open('./schema_v0.2/test_v0.2.jsonl') as reader:
+            return list(reader)
+
+    def test_validate_example(self):
+        example = self._examples()[0]
+        self.assertEqual(validate_example(example, 'v0.2'), [])
+        del example['sourceUrl']
+        example['hasAnswer'] = 'yes'
+        example['questionUUID'] = 'not a uuid'
+        example['ID'] = 'elsewhere|||' + example['ID']
+        self.assertEqual(validate_example(example, 'v0.2'),
+                         ["'sourceUrl' is missing",
+                          "'questionUUID' cannot be converted to UUID",
+                          "'hasAnswer' is not a boolean",
+                          "'ID' does not have sourceName as a prefix"])
+        with self.assertRaises(ValueError):
+            validate_example(example, 'v9')
+
+    def test_validate_file(self):
+        path = './schema_v0.2/test_validate_v0.2.jsonl'
+        examples = self._examples()
+        self.assertEqual(validate_file('./schema_v0.2/test_v0.2.jsonl', 'v0.2'), [])
+        self.assertTrue(test_dump_to_schema.test_jsonlines('./schema_v0.2/test_v0.2.jsonl', 'v0.2'))
+        examples[-1]['dateScraped'] = 1
+        with jsonlines.open(path, 'w') as writer:
+            writer.write_all(examples)
+        with open(path, 'a') as fp:
+            fp.write('{"truncated": \n')
+        failures = validate_file(path, 'v0.2')
+        self.assertEqual([idx for idx, _ in failures], [len(examples) - 1, len(examples)])
+        self.assertEqual(failures[0][1], ["'dateScraped' is not a float"])
+        with self.assertRaises(AssertionError):
+            test_dump_to_schema.test_jsonlines(path, 'v0.2')
+        subprocess.run(['rm', '-f', path])
+
+    def test_validate_corpus(self):
+        paths = ['./schema_v0.2/test_corpus_a_v0.2.jsonl', './schema_v0.2/test_corpus_b_v0.2.jsonl']
+        examples = self._examples()
+        with jsonlines.open(paths[0], 'w') as writer:
+            writer.write_all(examples)
+        summary = validate_corpus(paths[:1], 'v0.2', workers=2)
+        self.assertTrue(summary['valid'])
+        self.assertEqual(summary['examples'], len(examples))
+
+        examples[0]['needUpdate'] = 'no'
+        with jsonlines.open(paths[1], 'w') as writer:
+            writer.write_all(examples[:1])
+        summary = validate_corpus(paths, 'v0.2', workers=2)
+        self.assertFalse(summary['valid'])
+        self.assertEqual(summary['files'][paths[1]]['failures'],
+                         [{'line': 0, 'errors': ["'needUpdate' is not a boolean"]}])
+        self.assertEqual(summary['duplicateIDs'], {examples[0]['ID']: [paths[0] + ':0', paths[1] + ':0']})
+        self.assertEqual(list(summary['duplicateQuestionUUIDs']), [examples[0]['questionUUID']])
+        subprocess.run(['rm', '-f'] + paths)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,9 @@
 from covid_scraping import utils
+from fuzzywuzzy import fuzz
 import subprocess
+import jsonlines
 import json
+import os
 import unittest
 import time
 
@@ -17,6 +20,125 @@ class TestUtils(unittest.TestCase):
 
         self.assertGreater(len(data), len(set([example['ID'] for example in new_data])))
 
+    def test_fuzzy_index_matches_full_scan(self):
+        gold = ['What is COVID-19?',
+                'How does the virus spread?',
+                'Can my pet get COVID-19?',
+                'What are the symptoms of COVID-19?',
+                'Should I wear a mask?',
+                '']
+        queries = gold + ['What is COVID-19 ?',
+                          'How does this virus spread?',
+                          'Can I take my dog to the vet?',
+                          'COVID-19',
+                          'Where can I get tested?']
+        index = utils._FuzzyIndex(gold, utils.fuzz_threshold_ques)
+        for ques in queries:
+            scores = [fuzz.partial_ratio(ques, x) for x in gold]
+            expected = None
+            if max(scores) >= utils.fuzz_threshold_ques:
+                expected = (scores.index(max(scores)), max(scores))
+            self.assertEqual(index.best_match(ques), expected)
+            self.assertTrue(all(index.upper_bounds(ques) >= scores))
+
+    def test_example_id_is_stable(self):
+        example_id = utils.example_id('example', '<p>What is  COVID-19?</p>')
+        self.assertEqual(example_id, utils.example_id('example', '<p>What is COVID-19?</p>\n'))
+        self.assertEqual(example_id.split('|||')[0], 'example')
+        self.assertNotEqual(example_id, utils.example_id('example', '<p>What is SARS?</p>'))
+        # hash() is salted per process, the digest must not be.
+        ids = set()
+        for seed in ['1', '2']:
+            out = subprocess.run(
+                ['python', '-c', "from covid_scraping import utils; print(utils.example_id('example', '<p>What is COVID-19?</p>'))"],
+                env={**os.environ, 'PYTHONHASHSEED': seed}, stdout=subprocess.PIPE, universal_newlines=True)
+            ids.add(out.stdout.strip())
+        self.assertEqual(ids, {example_id})
+
+    def _gold_example(self, question, answer):
+        return {'ID': 'merge|||' + question,
+                'sourceName': 'merge',
+                'questionText': question,
+                'answerText': answer,
+                'hasAnswer': True,
+                'questionUUID': question + ' uuid',
+                'answerUUID': answer + ' uuid',
+                'dateLastChanged': 1.0}
+
+    def test_merge_index_sidecar(self):
+        path = './schema_v0.3/test_merge_index_v0.3.jsonl'
+        gold = [self._gold_example('What is COVID-19?', 'A disease.'),
+                self._gold_example('Should I wear a mask?', 'Yes.')]
+        with jsonlines.open(path, 'w') as writer:
+            writer.write_all(gold)
+        utils.write_merge_index(path, gold)
+        with open('./schema_v0.3/test_merge_index_v0.3.index.json') as fp:
+            index = json.load(fp)
+        self.assertEqual(len(index['offsets']), 2)
+        self.assertEqual(index['questions'][utils._question_key('Should I wear a mask?')], 1)
+
+        merged = utils.merge(path, [self._gold_example('Should  I wear a mask? ', 'Yes.')])
+        self.assertEqual(len(merged), 1)
+        self.assertEqual(merged[0]['questionUUID'], 'Should I wear a mask? uuid')
+
+        # A sidecar written for other contents is ignored and rebuilt.
+        with jsonlines.open(path, 'w') as writer:
+            writer.write_all(gold[::-1])
+        merged = utils.merge(path, [self._gold_example('What is COVID-19?', 'A disease.')])
+        self.assertEqual(merged[0]['questionUUID'], 'What is COVID-19? uuid')
+        subprocess.run(
+            ['rm', '-f', path, './schema_v0.3/test_merge_index_v0.3.index.json'])
+
+    def test_write_jsonlines(self):
+        path = './schema_v0.2/test_write_v0.2.jsonl'
+        with jsonlines.open('./schema_v0.2/test_v0.2.jsonl') as reader:
+            gold = list(reader)
+        written = utils.write_jsonlines(path, gold, 'v0.2')
+        with open(path, 'rb') as fp:
+            data = fp.read()
+        with jsonlines.open('./schema_v0.2/test_write_expected_v0.2.jsonl', 'w') as writer:
+            writer.write_all(gold)
+        with open('./schema_v0.2/test_write_expected_v0.2.jsonl', 'rb') as fp:
+            self.assertEqual(data, fp.read())
+        index = utils._build_merge_index(data, gold)
+        self.assertEqual(written, (index['digest'], index['offsets']))
+
+        # An invalid example leaves the file as it was.
+        invalid = [dict(gold[0])] + [{'question': 'no schema'}]
+        with self.assertRaises(AssertionError):
+            utils.write_jsonlines(path, invalid, 'v0.2')
+        with open(path, 'rb') as fp:
+            self.assertEqual(data, fp.read())
+        self.assertEqual([f for f in os.listdir('./schema_v0.2') if f.endswith('.tmp')], [])
+        subprocess.run(['rm', '-f', path, './schema_v0.2/test_write_expected_v0.2.jsonl'])
+
+    def test_clean_texts(self):
+        strings = ['<p>Wash your <b>hands</b>.</p>', '  plain text ', '<ul><li>one</li><li>two</li></ul>']
+        for tokenize in [False, True]:
+            self.assertEqual(utils.clean_texts(strings, tokenize),
+                             [utils.clean_text(string, tokenize) for string in strings])
+        self.assertEqual(utils.clean_texts(strings)[0], ('Wash your hands.', {}))
+        self.assertEqual(utils.clean_texts(strings, tokenize=True)[0], ('Wash your hands .', {}))
+
+    def test_clean_texts_in_parallel(self):
+        strings = ['<p>Answer <a href="#%d">number %d</a> of many.</p>' % (i, i)
+                   for i in range(utils._parallel_min_strings + 1)]
+        for tokenize in [False, True]:
+            self.assertEqual(utils.clean_texts(strings, tokenize, workers=2),
+                             utils.clean_texts(strings, tokenize))
+
+    def test_html_to_text(self):
+        strings = ['', ' <p>a</p>\n\n<p>b</p> ', 'a<!-- c -->b', '<script>x</script>y',
+                   '<pre>  \n </pre>', 'x &amp; y', '<div><p>unclosed <b>tags</div>']
+        for string in strings:
+            self.assertEqual(utils.html_to_text(string)[0], utils._clean_element(string))
+        html = ' <p>See <a href="https://www.cdc.gov">the CDC site</a> or <a href="tel:911">call</a>.</p>'
+        text, links = utils.html_to_text(html)
+        self.assertEqual(text, 'See the CDC site or call.')
+        self.assertEqual(links, [(4, 16, 'https://www.cdc.gov'), (20, 24, 'tel:911')])
+        self.assertEqual(utils.clean_text(html, tokenize=True),
+                         ('See the CDC site or call .', {'(1, 4)': 'https://www.cdc.gov', '(5, 6)': 'tel:911'}))
+
 
 if __name__ == '__main__':
     unittest.main()
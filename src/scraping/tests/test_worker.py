@@ -0,0 +1,131 @@
+from covid_scraping.jobqueue import FileQueue
+import json
+import multiprocessing
+import os
+import shutil
+import signal
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, '..')
+import worker
+sys.path.remove('..')
+
+_job_module = '''
+import os
+import sys
+from covid_scraping import conversion
+
+
+def main():
+    action = sys.argv[1]
+    if action == 'store':
+        sys.exit(0 if conversion.gold_store_path == sys.argv[2] else 3)
+    if action == 'unset':
+        sys.exit(0 if 'COVID_SCRAPING_WORKER_ONLY' not in os.environ else 3)
+    if action == 'exit':
+        sys.exit(int(sys.argv[2]))
+    if action == 'message':
+        sys.exit('bad arguments')
+    if action == 'raise':
+        raise ValueError('the page layout changed')
+'''
+
+
+def _run_job(job):
+    # The job's output goes to the file descriptors, not to pytest's capture.
+    sys.stdout, sys.stderr = sys.__stdout__, sys.__stderr__
+    worker._run_job(job)
+
+
+class TestWorker(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        with open(os.path.join(self.directory, 'worker_test_job.py'), 'w') as fp:
+            fp.write(_job_module)
+        sys.path.insert(0, self.directory)
+        worker.job_scripts['test'] = (self.directory, 'worker_test_job')
+        self.queue = os.path.join(self.directory, 'queue')
+
+    def tearDown(self):
+        del worker.job_scripts['test']
+        sys.path.remove(self.directory)
+        shutil.rmtree(self.directory)
+
+    def _run_job(self, args, env=None, log=None):
+        # _run_job ends its process, as it does in the worker.
+        process = multiprocessing.get_context('fork').Process(
+            target=_run_job, args=({'kind': 'test', 'args': args, 'env': env or {}, 'log': log},))
+        process.start()
+        process.join()
+        return process.exitcode
+
+    def test_run_job(self):
+        log = os.path.join(self.directory, 'job.log')
+        self.assertEqual(self._run_job(['exit', '0']), 0)
+        self.assertEqual(self._run_job(['exit', '5']), 5)
+        self.assertEqual(self._run_job(['message'], log=log), 1)
+        self.assertEqual(self._run_job(['raise'], log=log), 1)
+        with open(log) as fp:
+            text = fp.read()
+        self.assertIn('bad arguments', text)
+        self.assertIn('the page layout changed', text)
+
+    def test_environment(self):
+        # The job sees the submitter's COVID_SCRAPING_* settings, not the worker's.
+        os.environ['COVID_SCRAPING_WORKER_ONLY'] = '1'
+        try:
+            env = {'COVID_SCRAPING_GOLD_STORE': '/gold.sqlite'}
+            self.assertEqual(self._run_job(['store', '/gold.sqlite'], env=env), 0)
+            self.assertEqual(self._run_job(['store', ''], env={}), 0)
+            self.assertEqual(self._run_job(['unset']), 0)
+        finally:
+            del os.environ['COVID_SCRAPING_WORKER_ONLY']
+
+    def test_serve(self):
+        data = os.path.join(self.directory, 'data')
+        os.makedirs(data)
+        shutil.copyfile('./schema_v0.2/test_v0.2.jsonl', os.path.join(data, 'test_v0.2.jsonl'))
+        output = os.path.join(self.directory, 'validate.json')
+        server = multiprocessing.get_context('fork').Process(target=worker.serve, args=(self.queue,))
+        server.start()
+        try:
+            deadline = time.time() + 60
+            while not worker._worker_alive(self.queue) and time.time() < deadline:
+                time.sleep(0.1)
+            self.assertTrue(worker._worker_alive(self.queue))
+            self.assertEqual(worker.submit(self.queue, 'validate', ['--path', data, '--version', 'v0.2',
+                                                                   '--workers', '1', '--output', output]), 0)
+            with open(output) as fp:
+                self.assertTrue(json.load(fp)['valid'])
+            self.assertEqual(worker.submit(self.queue, 'test', ['exit', '4']), 4)
+            jobs = FileQueue(self.queue)
+            result = jobs.wait(jobs.submit({'kind': 'unknown', 'args': []}), timeout=30)
+            self.assertEqual((result['status'], result['exitcode']), ('failed', 2))
+        finally:
+            os.kill(server.pid, signal.SIGTERM)
+            server.join(30)
+        self.assertEqual(server.exitcode, 0)
+        self.assertFalse(os.path.exists(worker._pid_path(self.queue)))
+
+    def test_cold(self):
+        # Without a worker the script runs in a fresh interpreter.
+        data = os.path.join(self.directory, 'data')
+        os.makedirs(data)
+        with open(os.path.join(data, 'broken_v0.3.jsonl'), 'w') as fp:
+            fp.write('{"ID": 1}\n')
+        self.assertFalse(worker._worker_alive(self.queue))
+        self.assertEqual(worker.submit(self.queue, 'validate', ['--path', data, '--workers', '1',
+                                                               '--output', os.devnull]), 1)
+        self.assertEqual(worker.submit(self.queue, 'validate', ['--path', os.path.join(self.directory, 'missing'),
+                                                               '--output', os.devnull],
+                                       log=os.path.join(self.directory, 'cold.log')), 1)
+        with open(os.path.join(self.directory, 'cold.log')) as fp:
+            self.assertIn('FileNotFoundError', fp.read())
+
+
+if __name__ == '__main__':
+    unittest.main()
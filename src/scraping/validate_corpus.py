@@ -0,0 +1,61 @@
+# Copyright (c) Johns Hopkins University and its affiliates.
+# This source code is licensed under the Apache 2 license found in the
+# LICENSE file in the root directory of this source tree.
+"""
+Checks every scraped JSONL file of a schema version at once: each example
+against the schema, and the IDs and questionUUIDs across all files. Writes a
+JSON summary and exits with status 1 when anything is wrong, so autoscrape.sh
+can refuse to commit broken data.
+"""
+__author__ = "JHU-COVID-QA"
+__copyright__ = "Copyright 2020, Johns Hopkins University"
+__credits__ = ["JHU-COVID-QA"]
+__license__ = "Apache 2.0"
+__version__ = "0.1"
+__maintainer__ = "JHU-COVID-QA"
+__email__ = "covidqa@jhu.edu"
+__status__ = "Development"
+
+import argparse
+import json
+import os
+import sys
+from covid_scraping.test_dump_to_schema import validate_corpus
+
+
+def get_args():
+    parser = argparse.ArgumentParser(
+        description='Validate all of the scraped data of one schema version')
+    parser.add_argument('--path', type=str, default="../../data/scraping/schema_v0.3/",
+                        help='Directory holding the JSONL files')
+    parser.add_argument('--version', type=str, default="v0.3",
+                        help='Schema version of the files')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Number of processes, one per core by default')
+    parser.add_argument('--output', type=str, default=None,
+                        help='Write the JSON summary here instead of to stdout')
+    args = parser.parse_args()
+    return args
+
+
+def main():
+    args = get_args()
+    suffix = '_' + args.version + '.jsonl'
+    paths = [os.path.join(args.path, filename) for filename in os.listdir(args.path)
+             if filename.endswith(suffix)]
+    summary = validate_corpus(paths, args.version, args.workers)
+    if args.output:
+        with open(args.output, 'w') as fp:
+            json.dump(summary, fp, indent=2, sort_keys=True)
+    else:
+        json.dump(summary, sys.stdout, indent=2, sort_keys=True)
+        print()
+    invalid = sum(len(f['failures']) for f in summary['files'].values())
+    print("%s: %d files, %d examples, %d invalid, %d duplicate IDs, %d duplicate questionUUIDs" % (
+        "Valid" if summary['valid'] else "Invalid", len(summary['files']), summary['examples'], invalid,
+        len(summary['duplicateIDs']), len(summary['duplicateQuestionUUIDs'])), file=sys.stderr)
+    sys.exit(0 if summary['valid'] else 1)
+
+
+if __name__ == '__main__':
+    main()
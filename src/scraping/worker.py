@@ -0,0 +1,275 @@
+# Copyright (c) Johns Hopkins University and its affiliates.
+# This source code is licensed under the Apache 2 license found in the
+# LICENSE file in the root directory of this source tree.
+"""
+A resident worker that runs scrape, release and validate jobs with spaCy,
+pandas, Scrapy, lxml and every scraper module already imported.
+
+Start it once, e.g. from an @reboot cron entry:
+    python worker.py serve
+and hand it jobs, the same arguments the scripts take go after --:
+    python worker.py submit scrape --log run.log -- --metrics metrics.json
+
+submit waits for the job and exits with its exit status. Each job runs in a
+child forked from the warm worker, so it starts with everything imported but
+can never leave state behind for the next job. When no worker is running,
+submit runs the script in a fresh interpreter as before. The worker restarts
+itself when the code changes, e.g. after a git pull. Jobs see the environment
+the worker was started with, except for the COVID_SCRAPING_* variables,
+which are those of submit.
+"""
+__author__ = "JHU-COVID-QA"
+__copyright__ = "Copyright 2020, Johns Hopkins University"
+__credits__ = ["JHU-COVID-QA"]
+__license__ = "Apache 2.0"
+__version__ = "0.1"
+__maintainer__ = "JHU-COVID-QA"
+__email__ = "covidqa@jhu.edu"
+__status__ = "Development"
+
+import argparse
+import importlib
+import multiprocessing
+import os
+import signal
+import subprocess
+import sys
+import time
+import traceback
+from covid_scraping.jobqueue import FileQueue
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+# Job kinds, with the directory under base_dir each one runs in and the module whose main() it runs.
+job_scripts = {
+    'scrape': ('scrapers', 'scrape_all'),
+    'deepset': ('scrapers', 'deepsetAI_scraper'),
+    'release': ('scrapers', 'make_public'),
+    'export': ('.', 'gold_store'),
+    'validate': ('.', 'validate_corpus'),
+}
+# Imported by the worker before it takes the first job, on top of the job scripts.
+warm_modules = ['numpy', 'pandas', 'fuzzywuzzy.fuzz', 'bs4', 'lxml.etree', 'jsonlines', 'requests',
+                'spacy.lang.en', 'scrapy.crawler']
+# Directory of the job queue, shared by the worker and submit.
+queue_dir = os.environ.get('COVID_SCRAPING_WORKER_QUEUE',
+                           os.path.join(os.path.expanduser('~'), '.cache', 'covid_scraping', 'worker'))
+# Seconds between looks at an empty queue.
+poll_interval = 0.2
+
+
+def get_args():
+    parser = argparse.ArgumentParser(
+        description='Run scrape, release and validate jobs in a warm worker process')
+    parser.add_argument('--queue', type=str, default=queue_dir,
+                        help='Directory of the job queue')
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+    commands.add_parser('serve', help='Run the worker')
+    submit = commands.add_parser('submit', help='Run a job in the worker and wait for it')
+    submit.add_argument('kind', choices=sorted(job_scripts))
+    submit.add_argument('--log', type=str, default=None,
+                        help='Append the output of the job to this file')
+    submit.add_argument('--timeout', type=float, default=None,
+                        help='Seconds the job may run, no limit by default')
+    # Everything after -- belongs to the script.
+    argv = sys.argv[1:]
+    script_args = []
+    if '--' in argv:
+        script_args = argv[argv.index('--') + 1:]
+        argv = argv[:argv.index('--')]
+    args = parser.parse_args(argv)
+    args.args = script_args
+    return args
+
+
+def _pid_path(queue):
+    return os.path.join(queue, 'worker.pid')
+
+
+def _worker_alive(queue):
+    try:
+        with open(_pid_path(queue)) as fp:
+            pid = int(fp.read())
+        os.kill(pid, 0)
+    except (OSError, ValueError):
+        return False
+    return True
+
+
+def _code_stamp():
+    # Latest modification time of the code the jobs run.
+    stamp = 0
+    for directory in ['.', 'covid_scraping', 'scrapers', os.path.join('scrapers', 'deepset_ai')]:
+        path = os.path.join(base_dir, directory)
+        for filename in os.listdir(path):
+            if filename.endswith('.py'):
+                stamp = max(stamp, os.stat(os.path.join(path, filename)).st_mtime)
+    return stamp
+
+
+def _log(message):
+    print(time.strftime('%Y-%m-%d %H:%M:%S') + ' ' + message, flush=True)
+
+
+def warm_up():
+    """
+    Imports every module a job could need, every scraper included, so forked jobs
+    start with them loaded.
+    """
+    for directory in {directory for directory, _ in job_scripts.values()}:
+        path = os.path.normpath(os.path.join(base_dir, directory))
+        if path not in sys.path:
+            sys.path.insert(0, path)
+    from covid_scraping import registry
+    # scrape_all.py imports the scrapers it runs, import them all for it.
+    scrapers = sorted({info.module for info in registry.discover(os.path.join(base_dir, 'scrapers')).values()})
+    for module in warm_modules + [module for _, module in job_scripts.values()] + scrapers:
+        try:
+            importlib.import_module(module)
+        except Exception as e:
+            _log("Could not import %s, jobs needing it will fail: %s" % (module, e))
+    try:
+        from covid_scraping import utils
+        utils._spacy_nlp()
+    except Exception as e:
+        _log("Could not build the spaCy pipeline: %s" % e)
+
+
+def _submitter_environment():
+    # The settings the job would have seen run by hand, e.g. where to write the gold data.
+    return {name: value for name, value in os.environ.items() if name.startswith('COVID_SCRAPING_')}
+
+
+def _apply_environment(env):
+    # Replaces the worker's COVID_SCRAPING_* variables by the submitter's, and the
+    # module settings read from them when the worker imported the modules.
+    for name in [name for name in os.environ if name.startswith('COVID_SCRAPING_')]:
+        if name not in env:
+            del os.environ[name]
+    os.environ.update(env)
+    from covid_scraping import conversion, fetch
+    conversion.read_environment()
+    fetch.read_environment()
+
+
+def _run_job(job):
+    # Runs in the forked child, like `python <script>.py <args>` run from its directory.
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    directory, module = job_scripts[job['kind']]
+    os.chdir(os.path.join(base_dir, directory))
+    _apply_environment(job.get('env', {}))
+    if job.get('log'):
+        fd = os.open(job['log'], os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o666)
+        os.dup2(fd, 1)
+        os.dup2(fd, 2)
+        os.close(fd)
+    sys.argv = [module + '.py'] + job.get('args', [])
+    try:
+        importlib.import_module(module).main()
+        code = 0
+    except SystemExit as e:
+        code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        if e.code is not None and not isinstance(e.code, int):
+            # As the interpreter does, e.g. sys.exit('message').
+            print(e.code, file=sys.stderr)
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+    sys.stdout.flush()
+    sys.stderr.flush()
+    os._exit(code)
+
+
+def serve(queue):
+    """
+    Takes jobs from the queue one at a time until SIGTERM or SIGINT.
+    """
+    warm_up()
+    jobs = FileQueue(queue)
+    with open(_pid_path(queue), 'w') as fp:
+        fp.write(str(os.getpid()))
+    stamp = _code_stamp()
+    stopping = []
+    signal.signal(signal.SIGTERM, lambda *_: stopping.append(True))
+    signal.signal(signal.SIGINT, lambda *_: stopping.append(True))
+    # Forked explicitly, the point is that jobs inherit the imports.
+    context = multiprocessing.get_context('fork')
+    _log("Worker %d ready" % os.getpid())
+    while not stopping:
+        if _code_stamp() != stamp:
+            _log("Code changed, restarting")
+            os.execv(sys.executable, [sys.executable, os.path.abspath(__file__), '--queue', queue, 'serve'])
+        claimed = jobs.claim()
+        if claimed is None:
+            time.sleep(poll_interval)
+            continue
+        job_id, job = claimed
+        _log("Job %s: %s %s" % (job_id, job.get('kind'), ' '.join(job.get('args', []))))
+        start = time.time()
+        if job.get('kind') not in job_scripts:
+            jobs.finish(job_id, {'status': 'failed', 'exitcode': 2, 'seconds': 0.0,
+                                 'error': 'unknown job kind %r' % job.get('kind')})
+            continue
+        process = context.Process(target=_run_job, args=(job,))
+        process.start()
+        process.join(job.get('timeout'))
+        if process.is_alive():
+            process.terminate()
+            process.join()
+            result = {'status': 'timeout', 'exitcode': 1}
+        else:
+            result = {'status': 'ok' if process.exitcode == 0 else 'failed', 'exitcode': process.exitcode}
+        result['seconds'] = time.time() - start
+        jobs.finish(job_id, result)
+        _log("Job %s: %s after %.1f seconds" % (job_id, result['status'], result['seconds']))
+    os.remove(_pid_path(queue))
+
+
+def _run_cold(job):
+    # What autoscrape.sh did before the worker: a fresh interpreter per script.
+    directory, module = job_scripts[job['kind']]
+    log = open(job['log'], 'a') if job.get('log') else None
+    try:
+        process = subprocess.run([sys.executable, module + '.py'] + job['args'],
+                                 cwd=os.path.join(base_dir, directory), stdout=log,
+                                 stderr=subprocess.STDOUT if log else None, timeout=job.get('timeout'))
+        return process.returncode
+    except subprocess.TimeoutExpired:
+        return 1
+    finally:
+        if log is not None:
+            log.close()
+
+
+def submit(queue, kind, args, log=None, timeout=None):
+    """
+    Runs a job in the worker, or in a fresh interpreter when no worker is running.
+
+    Returns: the exit status of the job
+    """
+    job = {'kind': kind, 'args': args, 'log': os.path.abspath(log) if log else None, 'timeout': timeout,
+           'env': _submitter_environment()}
+    if not _worker_alive(queue):
+        return _run_cold(job)
+    jobs = FileQueue(queue)
+    job_id = jobs.submit(job)
+    while True:
+        result = jobs.wait(job_id, timeout=5, interval=poll_interval)
+        if result is not None:
+            return result['exitcode']
+        if not _worker_alive(queue):
+            print("The worker stopped before finishing job %s" % job_id, file=sys.stderr)
+            return 1
+
+
+def main():
+    args = get_args()
+    if args.command == 'serve':
+        serve(args.queue)
+    else:
+        sys.exit(submit(args.queue, args.kind, args.args, args.log, args.timeout))
+
+
+if __name__ == '__main__':
+    main()